@@ -0,0 +1,7 @@
+"""Performance baselines of supabase-py, measured against local servers.
+
+    python -m benchmarks --json results.json
+    python -m benchmarks --compare baseline.json
+
+See `benchmarks/__main__.py` for the options.
+"""
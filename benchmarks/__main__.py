@@ -0,0 +1,65 @@
+"""Run the benchmarks and report, store or compare their results.
+
+    python -m benchmarks [--only NAME ...] [--scale FRACTION]
+                         [--json PATH] [--compare BASELINE] [--threshold 0.1]
+
+`--compare` exits with status 1 when a result regressed by more than the
+threshold, so that it can gate a release.
+"""
+
+import argparse
+import json
+import logging
+import sys
+from typing import List, Optional
+
+from .results import Result, compare, load, to_json
+from .suite import BENCHMARKS
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS))
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="fraction of the full iteration counts to run, e.g. 0.1",
+    )
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="results of a previous run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="slow down, as a fraction, reported as a regression",
+    )
+    args = parser.parse_args(argv)
+    # keep the per-request logs of httpx and websockets out of the report
+    logging.disable(logging.INFO)
+
+    results: List[Result] = []
+    for name in args.only or BENCHMARKS:
+        for result in BENCHMARKS[name](args.scale):
+            print(f"{result.name:<28} {result.value:>14,.2f} {result.unit}")
+            results.append(result)
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(to_json(results), file, indent=2)
+
+    if not args.compare:
+        return 0
+    regressions = 0
+    print()
+    for result, change, regressed in compare(
+        results, load(args.compare), args.threshold
+    ):
+        regressions += regressed
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{result.name:<28} {change:>+8.1%}{flag}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""Throughput of the JSON codecs on result sets and insert bodies.
+
+Rows look like those of a typical table: ids, text, numbers, a timestamp
+and a small JSON column. Codecs whose library is not installed are left
+out:
+
+    python -m benchmarks.json_codecs
+"""
+
+import time
+from typing import Any, Dict, List
+
+from supabase.lib.json_codec import CODECS, JSONCodec
+
+from .results import Result
+
+MB = 1024 * 1024
+# a page of results, and a large export or bulk insert
+SIZES = (100, 10_000)
+
+
+def row(i: int) -> Dict[str, Any]:
+    return {
+        "id": i,
+        "user_id": "5f0c8c3e-3a1b-4d6e-9a77-2b1f0c1d2e3f",
+        "title": f"task {i}",
+        "description": "Write the quarterly report and send it for review.",
+        "priority": i % 5,
+        "score": i / 7,
+        "done": i % 2 == 0,
+        "created_at": "2024-03-01T12:30:45.123456+00:00",
+        "meta": {"source": "import", "attempt": 1, "tags": ["a", "b"]},
+    }
+
+
+def codecs() -> Dict[str, JSONCodec]:
+    available = {}
+    for name, codec in CODECS.items():
+        try:
+            available[name] = codec()
+        except ImportError:
+            continue
+    return available
+
+
+def measure(codec: JSONCodec, rows: List[Dict[str, Any]], repeat: int) -> tuple:
+    """Return the encode and decode throughput of `codec`, in MB/s."""
+    encoded = codec.dumps(rows)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        codec.dumps(rows)
+    encoding = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(repeat):
+        codec.loads(encoded)
+    decoding = time.perf_counter() - started
+    megabytes = len(encoded) * repeat / MB
+    return megabytes / encoding, megabytes / decoding
+
+
+def run(scale: float = 1.0) -> List[Result]:
+    results = []
+    for size in SIZES:
+        rows = [row(i) for i in range(size)]
+        # about 200 MB of JSON per codec and size at full scale
+        repeat = max(1, int(200_000 / size * scale))
+        for name, codec in codecs().items():
+            encoding, decoding = measure(codec, rows, repeat)
+            results += [
+                Result(f"json.{name}.encode.{size}", encoding, "MB/s"),
+                Result(f"json.{name}.decode.{size}", decoding, "MB/s"),
+            ]
+    return results
+
+
+if __name__ == "__main__":
+    for result in run():
+        print(f"{result.name:<28} {result.value:>10,.1f} {result.unit}")
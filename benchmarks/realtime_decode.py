@@ -0,0 +1,117 @@
+"""Events per second of realtime change decoding.
+
+Compares the enriched-dict path the realtime wrapper used to take with
+`PayloadDecoder`, on an UPDATE of a ten column row:
+
+    python -m benchmarks.realtime_decode
+"""
+
+import time
+from types import SimpleNamespace
+from typing import List
+
+from realtime.transformers import convert_change_data
+
+from supabase.lib.realtime_payload import PayloadDecoder
+
+from .results import Result
+
+EVENTS = 20_000
+COLUMNS = [
+    {"name": "id", "type": "int8"},
+    {"name": "user_id", "type": "uuid"},
+    {"name": "title", "type": "text"},
+    {"name": "priority", "type": "int4"},
+    {"name": "score", "type": "float8"},
+    {"name": "meta", "type": "jsonb"},
+    {"name": "created_at", "type": "timestamptz"},
+    {"name": "updated_at", "type": "timestamp"},
+    {"name": "tags", "type": "_text"},
+    {"name": "note", "type": "varchar"},
+]
+
+
+def record(i):
+    return {
+        "id": str(i),
+        "user_id": "5f0c8c3e-3a1b-4d6e-9a77-2b1f0c1d2e3f",
+        "title": f"task {i}",
+        "priority": "3",
+        "score": "0.75",
+        "meta": '{"source": "import", "attempt": 1}',
+        "created_at": "2024-03-01 12:30:45.123456+00",
+        "updated_at": "2024-03-01 12:31:00",
+        "tags": "{a,b,c}",
+        "note": "",
+    }
+
+
+def data(i):
+    return {
+        "schema": "public",
+        "table": "tasks",
+        "commit_timestamp": "2024-03-01T12:31:00Z",
+        "type": "UPDATE",
+        "columns": COLUMNS,
+        "record": record(i),
+        "old_record": record(i),
+    }
+
+
+def legacy(message):
+    # the enriched payload built by SupabaseRealtimeClient.on before PayloadDecoder
+    payload = SimpleNamespace(**message)
+    records = {"new": {}, "old": {}}
+    if payload.type in ["INSERT", "UPDATE"]:
+        records["new"] = payload.record
+        convert_change_data(payload.columns, payload.record)
+    if payload.type in ["UPDATE", "DELETE"]:
+        records["old"] = payload.record
+        convert_change_data(payload.columns, payload.old_record)
+    enriched = {
+        "schema": payload.schema,
+        "table": payload.table,
+        "commit_timestamp": payload.commit_timestamp,
+        "event_type": payload.type,
+        "new": {},
+        "old": {},
+    }
+    return {**enriched, **records}
+
+
+def decoded(decoder):
+    def decode(message):
+        change = decoder.decode(message)
+        change.new
+        return change
+
+    return decode
+
+
+def lazy(decoder):
+    # consumers that only look at the event metadata never pay for decoding
+    return decoder.decode
+
+
+def measure(decode, events=EVENTS):
+    messages = [data(i) for i in range(events)]
+    started = time.perf_counter()
+    for message in messages:
+        decode(message)
+    return events / (time.perf_counter() - started)
+
+
+def run(events=EVENTS) -> List[Result]:
+    return [
+        Result(f"decode.{name}", measure(decode, events), "events/s")
+        for name, decode in [
+            ("legacy", legacy),
+            ("decoded", decoded(PayloadDecoder())),
+            ("lazy", lazy(PayloadDecoder())),
+        ]
+    ]
+
+
+if __name__ == "__main__":
+    for result in run():
+        print(f"{result.name:<16} {result.value:>12,.0f} {result.unit}")
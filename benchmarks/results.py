@@ -0,0 +1,56 @@
+"""Benchmark results, their JSON form and their comparison to a baseline."""
+
+import json
+import platform
+import sys
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Tuple
+
+from supabase import __version__
+
+
+@dataclass
+class Result:
+    name: str
+    value: float
+    unit: str
+    higher_is_better: bool = True
+
+
+def to_json(results: Iterable[Result]) -> Dict[str, Any]:
+    return {
+        "supabase": __version__,
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "results": [asdict(result) for result in results],
+    }
+
+
+def load(path: str) -> List[Result]:
+    with open(path) as file:
+        return [Result(**result) for result in json.load(file)["results"]]
+
+
+def compare(
+    results: Iterable[Result], baseline: Iterable[Result], threshold: float
+) -> List[Tuple[Result, float, bool]]:
+    """Pair each result with its change from the baseline.
+
+    The change is positive when the result improved. A result is a
+    regression when it got worse by more than `threshold`, a fraction.
+    """
+    previous = {result.name: result for result in baseline}
+    changes = []
+    for result in results:
+        base = previous.get(result.name)
+        if base is None or not base.value:
+            continue
+        change = result.value / base.value - 1
+        if not result.higher_is_better:
+            change = base.value / result.value - 1 if result.value else 0.0
+        changes.append((result, change, change < -threshold))
+    return changes
@@ -0,0 +1,190 @@
+"""Local stand-ins for the Supabase services, each in its own process.
+
+The servers run outside the benchmarking process so that they do not
+compete with the client for the GIL. Their answers are fixed, which makes
+the measurements reflect the client rather than a database.
+"""
+
+import asyncio
+import json
+import multiprocessing
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+ROWS = 20
+TABLE = json.dumps(
+    [
+        {"id": i, "name": f"country {i}", "iso2": "CL", "population": 19_000_000}
+        for i in range(ROWS)
+    ]
+).encode()
+RANGE = re.compile(r"bytes=(\d+)-(\d+)")
+
+
+class SupabaseHandler(BaseHTTPRequestHandler):
+    """Answers PostgREST, storage and functions requests from memory."""
+
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately: without this, delayed ACKs
+    # add 40 ms to every response
+    disable_nagle_algorithm = True
+    objects: Dict[str, bytes] = {}
+
+    def do_GET(self) -> None:
+        self._body()
+        if self.path.startswith("/rest/v1/"):
+            return self._send(200, TABLE)
+        if self.path.startswith("/storage/v1/object/"):
+            return self._download(self.path[len("/storage/v1/object/") :])
+        self._send(404, b'{"message": "not found"}')
+
+    def do_POST(self) -> None:
+        body = self._body()
+        if self.path.startswith("/rest/v1/rpc/"):
+            return self._send(200, b"42")
+        if self.path.startswith("/rest/v1/"):
+            return self._send(201, b"")
+        if self.path.startswith("/functions/v1/"):
+            return self._send(200, body or b"{}")
+        if self.path.startswith("/storage/v1/object/"):
+            key = self.path[len("/storage/v1/object/") :]
+            self.objects[key] = body
+            return self._send(200, json.dumps({"Key": key}).encode())
+        self._send(404, b'{"message": "not found"}')
+
+    def _download(self, key: str) -> None:
+        data = self.objects.get(key)
+        if data is None:
+            return self._send(400, b'{"statusCode": "404", "error": "not_found"}')
+        match = RANGE.match(self.headers.get("Range", ""))
+        if not match:
+            return self._send(200, data, "application/octet-stream")
+        start, end = int(match.group(1)), min(int(match.group(2)), len(data) - 1)
+        content_range = f"bytes {start}-{end}/{len(data)}"
+        self._send(
+            206,
+            data[start : end + 1],
+            "application/octet-stream",
+            {"Content-Range": content_range},
+        )
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _send(
+        self,
+        status: int,
+        body: bytes,
+        content_type: str = "application/json",
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+def change(topic: str, i: int) -> str:
+    data = {
+        "schema": "public",
+        "table": "tasks",
+        "commit_timestamp": "2024-03-01T12:31:00Z",
+        "type": "INSERT",
+        "columns": [
+            {"name": "id", "type": "int8"},
+            {"name": "title", "type": "text"},
+            {"name": "done", "type": "bool"},
+        ],
+        "record": {"id": str(i), "title": f"task {i}", "done": "f"},
+    }
+    return json.dumps(
+        {
+            "topic": topic,
+            "event": "postgres_changes",
+            "ref": None,
+            "payload": {"ids": [1], "data": data},
+        }
+    )
+
+
+async def realtime_handler(ws: Any, path: str = "") -> None:
+    """Acknowledges joins; joining `bench-<n>` is answered with n changes."""
+    async for raw in ws:
+        message = json.loads(raw)
+        response: Dict[str, Any] = {}
+        if message["event"] == "phx_join":
+            changes = message["payload"]["config"]["postgres_changes"]
+            response = {"postgres_changes": [{**c, "id": 1} for c in changes]}
+        await ws.send(
+            json.dumps(
+                {
+                    "topic": message["topic"],
+                    "event": "phx_reply",
+                    "ref": message["ref"],
+                    "payload": {"status": "ok", "response": response},
+                }
+            )
+        )
+        _, _, count = message["topic"].partition(":bench-")
+        if message["event"] == "phx_join" and count:
+            for i in range(int(count)):
+                await ws.send(change(message["topic"], i))
+
+
+def _serve_http(port: Any) -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SupabaseHandler)
+    server.daemon_threads = True
+    port.send(server.server_port)
+    server.serve_forever()
+
+
+def _serve_realtime(port: Any) -> None:
+    import websockets
+
+    async def main() -> None:
+        async with websockets.serve(realtime_handler, "127.0.0.1", 0) as server:
+            port.send(server.sockets[0].getsockname()[1])
+            await asyncio.Future()
+
+    asyncio.run(main())
+
+
+class Server:
+    """Runs one of the servers above in a child process."""
+
+    def __init__(self, target: Any, scheme: str):
+        self._target = target
+        self._scheme = scheme
+        self._process: Optional[multiprocessing.Process] = None
+        self.url = ""
+
+    def __enter__(self) -> "Server":
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        self._process = multiprocessing.Process(
+            target=self._target, args=(sender,), daemon=True
+        )
+        self._process.start()
+        self.url = f"{self._scheme}://127.0.0.1:{receiver.recv()}"
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+
+
+def supabase_server() -> Server:
+    """PostgREST, storage and functions at `server.url`."""
+    return Server(_serve_http, "http")
+
+
+def realtime_server() -> Server:
+    """A realtime websocket at `server.url`."""
+    return Server(_serve_realtime, "ws")
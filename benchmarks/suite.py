@@ -0,0 +1,213 @@
+"""The benchmarks run by `python -m benchmarks`.
+
+Each one takes a scale, the fraction of its full number of iterations to
+run, and returns its results.
+"""
+
+import asyncio
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+from supabase import create_client
+from supabase._async.client import create_client as create_async_client
+from supabase._async.realtime_client import AsyncRealtimeClient
+from supabase.lib.instrumentation import LatencyHistogram
+
+from . import json_codecs, realtime_decode
+from .results import Result
+from .servers import realtime_server, supabase_server
+
+KEY = "xxxxxxxxxxxxxx.xxxxxxxxxxxxxxx.xxxxxxxxxxxxxxx"
+URL = "http://127.0.0.1:1"
+MB = 1024 * 1024
+
+
+def _count(full: int, scale: float) -> int:
+    return max(1, int(full * scale))
+
+
+def import_time(scale: float) -> List[Result]:
+    """Cumulative time of `import supabase` in a fresh interpreter."""
+    samples = []
+    for _ in range(_count(10, scale)):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import supabase"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        line = re.search(r"\|\s*(\d+) \| supabase$", completed.stderr, re.M)
+        assert line is not None, completed.stderr
+        samples.append(int(line.group(1)) / 1000)
+    return [Result("import.supabase", statistics.median(samples), "ms", False)]
+
+
+def client_construction(scale: float) -> List[Result]:
+    """Time to build a client, without sending any request."""
+    count = _count(500, scale)
+    started = time.perf_counter()
+    for _ in range(count):
+        create_client(URL, KEY).close()
+    sync = (time.perf_counter() - started) / count
+
+    async def build() -> float:
+        started = time.perf_counter()
+        for _ in range(count):
+            client = await create_async_client(URL, KEY)
+            await client.aclose()
+        return (time.perf_counter() - started) / count
+
+    return [
+        Result("create_client.sync", sync * 1e6, "us", False),
+        Result("create_client.async", asyncio.run(build()) * 1e6, "us", False),
+    ]
+
+
+def _query_results(
+    name: str, count: int, elapsed: float, latency: LatencyHistogram
+) -> List[Result]:
+    return [
+        Result(f"{name}.throughput", count / elapsed, "req/s"),
+        Result(f"{name}.p50", latency.percentile(50) * 1000, "ms", False),
+        Result(f"{name}.p99", latency.percentile(99) * 1000, "ms", False),
+    ]
+
+
+def queries(scale: float) -> List[Result]:
+    """Round trips of a 20 row select, by 1 and 8 concurrent callers."""
+    count = _count(2000, scale)
+    results: List[Result] = []
+    with supabase_server() as server:
+        for concurrency in (1, 8):
+            client = create_client(server.url, KEY)
+            latency = LatencyHistogram()
+            lock = threading.Lock()
+
+            def worker() -> None:
+                for _ in range(count // concurrency):
+                    started = time.perf_counter()
+                    client.table("countries").select("*").execute()
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        latency.record(elapsed)
+
+            threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            client.close()
+            results += _query_results(
+                f"query.sync.c{concurrency}", latency.count, elapsed, latency
+            )
+
+            async def run() -> None:
+                client = await create_async_client(server.url, KEY)
+                latency = LatencyHistogram()
+
+                async def worker() -> None:
+                    for _ in range(count // concurrency):
+                        started = time.perf_counter()
+                        await client.table("countries").select("*").execute()
+                        latency.record(time.perf_counter() - started)
+
+                started = time.perf_counter()
+                await asyncio.gather(*(worker() for _ in range(concurrency)))
+                elapsed = time.perf_counter() - started
+                await client.aclose()
+                results.extend(
+                    _query_results(
+                        f"query.async.c{concurrency}", latency.count, elapsed, latency
+                    )
+                )
+
+            asyncio.run(run())
+    return results
+
+
+def realtime_events(scale: float) -> List[Result]:
+    """Changes received per second by a postgres_changes callback."""
+    count = _count(20_000, scale)
+
+    async def run(url: str) -> float:
+        realtime = AsyncRealtimeClient(url, KEY)
+        done = asyncio.Event()
+        received = [0]
+
+        def on_change(change: Any) -> None:
+            received[0] += 1
+            if received[0] == count:
+                done.set()
+
+        channel = realtime.channel(f"bench-{count}")
+        channel.on_postgres_changes("INSERT", on_change, table="tasks")
+        started = time.perf_counter()
+        await channel.subscribe()
+        await asyncio.wait_for(done.wait(), 60)
+        elapsed = time.perf_counter() - started
+        await realtime.close()
+        return count / elapsed
+
+    with realtime_server() as server:
+        rate = asyncio.run(run(server.url))
+    return [Result("realtime.events", rate, "events/s")]
+
+
+def realtime_decoding(scale: float) -> List[Result]:
+    """Decoding of realtime change payloads, without any I/O."""
+    return realtime_decode.run(_count(realtime_decode.EVENTS, scale))
+
+
+def json_codecs_throughput(scale: float) -> List[Result]:
+    """Encoding and decoding of result sets by each installed JSON codec."""
+    return json_codecs.run(scale)
+
+
+def _timed(function: Callable[[], Any]) -> float:
+    started = time.perf_counter()
+    function()
+    return time.perf_counter() - started
+
+
+def storage_transfers(scale: float) -> List[Result]:
+    """Upload and download throughput of a single object."""
+    size = _count(32, scale) * MB
+    data = os.urandom(size)
+    with supabase_server() as server, tempfile.TemporaryDirectory() as directory:
+        client = create_client(server.url, KEY)
+        bucket = client.storage.from_("bench")
+        upload = _timed(lambda: bucket.upload("blob.bin", data))
+        download = _timed(lambda: bucket.download("blob.bin"))
+        manager = client.storage.transfer_manager(chunk_size=4 * MB, workers=4)
+        ranged = _timed(
+            lambda: manager.download(
+                "bench", "blob.bin", os.path.join(directory, "blob.bin")
+            )
+        )
+        client.close()
+    megabytes = size / MB
+    return [
+        Result("storage.upload", megabytes / upload, "MB/s"),
+        Result("storage.download", megabytes / download, "MB/s"),
+        Result("storage.download.ranged", megabytes / ranged, "MB/s"),
+    ]
+
+
+BENCHMARKS: Dict[str, Callable[[float], List[Result]]] = {
+    "import": import_time,
+    "client": client_construction,
+    "query": queries,
+    "realtime": realtime_events,
+    "decode": realtime_decoding,
+    "json": json_codecs_throughput,
+    "storage": storage_transfers,
+}
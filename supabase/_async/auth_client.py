@@ -1,4 +1,5 @@
-from typing import Dict, Optional
+from time import time
+from typing import Any, Dict, Optional, Union
 
 from gotrue import (
     AsyncGoTrueClient,
@@ -6,11 +7,35 @@ from gotrue import (
     AsyncSupportedStorage,
     AuthFlowType,
 )
+from gotrue.constants import EXPIRY_MARGIN
+from gotrue.errors import AuthSessionMissingError
+from gotrue.helpers import decode_jwt_payload
 from gotrue.http_clients import AsyncClient
+from gotrue.types import AuthChangeEvent, AuthResponse, Session
+
+from ..lib.concurrency import AsyncLock, AsyncRuntime
+from ..lib.file_lock import FileLock
+from ..lib.json_codec import JSONCodec
+from .transport import AsyncBaseTransport, AsyncCodecClient
+
+REFRESH_LOCK_POLL_INTERVAL = 0.05
 
 
 class AsyncSupabaseAuthClient(AsyncGoTrueClient):
-    """SupabaseAuthClient"""
+    """SupabaseAuthClient
+
+    The session is kept in memory, with the claims of its access token
+    decoded locally, and handed out without reading the storage until the
+    token is about to expire. Concurrent callers then share one storage
+    read and refresh. Auth events update the cached session.
+
+    Token refreshes are serialised within the process and, given a
+    `refresh_lock_path`, across the processes sharing the session storage.
+    A caller that obtains the lock after someone else refreshed the session
+    reuses the stored result instead of refreshing it again with a refresh
+    token that has already been used. Any other call refreshes the session,
+    however long it still has to live.
+    """
 
     def __init__(
         self,
@@ -22,11 +47,16 @@ class AsyncSupabaseAuthClient(AsyncGoTrueClient):
         persist_session: bool = True,
         storage: AsyncSupportedStorage = AsyncMemoryStorage(),
         http_client: Optional[AsyncClient] = None,
-        flow_type: AuthFlowType = "implicit"
+        flow_type: AuthFlowType = "implicit",
+        transport: Optional[AsyncBaseTransport] = None,
+        refresh_lock_path: Optional[str] = None,
+        json_codec: Optional[JSONCodec] = None,
     ):
         """Instantiate SupabaseAuthClient instance."""
         if headers is None:
             headers = {}
+        if http_client is None and transport is not None:
+            http_client = AsyncCodecClient(transport=transport, codec=json_codec)
 
         AsyncGoTrueClient.__init__(
             self,
@@ -39,3 +69,127 @@ class AsyncSupabaseAuthClient(AsyncGoTrueClient):
             http_client=http_client,
             flow_type=flow_type,
         )
+        self._cached_session: Optional[Session] = None
+        self._cached_claims: Dict[str, Any] = {}
+        self._cached_expires_at = 0.0
+        self._session_lock = AsyncLock()
+        self._refresh_lock = AsyncLock()
+        self._storage_lock = FileLock(refresh_lock_path) if refresh_lock_path else None
+        self.on_auth_state_change(self._cache_session)
+
+    async def get_session(self) -> Optional[Session]:
+        """Return the session, refreshing it if it is about to expire."""
+        if self._is_cached_session_fresh():
+            return self._cached_session
+        async with self._session_lock:
+            # another caller may have refreshed it while we were waiting
+            if not self._is_cached_session_fresh():
+                self._set_cached_session(await super().get_session())
+            return self._cached_session
+
+    async def get_claims(self) -> Optional[Dict[str, Any]]:
+        """Return the claims of the current access token.
+
+        They are decoded locally: the signature is not checked, which is safe
+        for a token this client received from the auth server itself.
+        """
+        session = await self.get_session()
+        return dict(self._cached_claims) if session is not None else None
+
+    async def refresh_session(
+        self, refresh_token: Union[str, None] = None
+    ) -> AuthResponse:
+        """Return a new session, even if the current one is still valid."""
+        if not refresh_token:
+            session = await self.get_session()
+            if session:
+                refresh_token = session.refresh_token
+        if not refresh_token:
+            raise AuthSessionMissingError()
+        session = await self._refresh(refresh_token, force=True)
+        return AuthResponse(session=session, user=session.user)
+
+    async def _call_refresh_token(self, refresh_token: str) -> Session:
+        return await self._refresh(refresh_token, force=False)
+
+    async def _refresh(self, refresh_token: str, force: bool) -> Session:
+        # the session the caller wants to replace, as it was before waiting
+        known = self._cached_session or self._in_memory_session
+        known_expires_at = known.expires_at if known is not None else None
+        async with self._refresh_lock:
+            session = await self._reusable_session(
+                refresh_token, force, known_expires_at
+            )
+            if session is not None:
+                return session
+            if self._storage_lock is None:
+                return await super()._call_refresh_token(refresh_token)
+            await self._lock_storage()
+            try:
+                # another process may have refreshed it while we were waiting
+                session = await self._reusable_session(
+                    refresh_token, force, known_expires_at
+                )
+                if session is None:
+                    session = await super()._call_refresh_token(refresh_token)
+                return session
+            finally:
+                self._storage_lock.release()
+
+    async def _lock_storage(self) -> None:
+        # the lock is released by the OS if its holder dies, so wait for it
+        while not self._storage_lock.acquire():
+            await AsyncRuntime.sleep(REFRESH_LOCK_POLL_INTERVAL)
+
+    async def _reusable_session(
+        self, refresh_token: str, force: bool, known_expires_at: Optional[int]
+    ) -> Optional[Session]:
+        """Return the stored session if someone else already refreshed it.
+
+        That is the case when its refresh token is not the one the caller
+        read, or, unless `force` is set, when it expires later than the
+        session the caller knew about. Otherwise the caller has to refresh,
+        even if the session has a little longer to live than the margin the
+        auto refresh timer fires at.
+        """
+        if self._persist_session:
+            raw_session = await self._storage.get_item(self._storage_key)
+            session = self._get_valid_session(raw_session)
+        else:
+            session = self._in_memory_session
+        if session is None:
+            return None
+        rotated = session.refresh_token != refresh_token
+        newer = known_expires_at is not None and (
+            (session.expires_at or 0) > known_expires_at
+        )
+        if not rotated and (force or not newer):
+            return None
+        if self._cached_session is None or (
+            session.access_token != self._cached_session.access_token
+        ):
+            # refreshed by another process: adopt it and schedule the next one
+            await self._save_session(session)
+            self._notify_all_subscribers("TOKEN_REFRESHED", session)
+        return session
+
+    def _is_cached_session_fresh(self) -> bool:
+        return self._cached_expires_at - time() > EXPIRY_MARGIN
+
+    def _set_cached_session(self, session: Optional[Session]) -> None:
+        self._cached_session = session
+        self._cached_claims = {}
+        self._cached_expires_at = 0.0
+        if session is None:
+            return
+        try:
+            self._cached_claims = decode_jwt_payload(session.access_token)
+            self._cached_expires_at = float(self._cached_claims["exp"])
+        except (KeyError, TypeError, ValueError):
+            # not a JWT we can read: fall back on the expiry sent with it
+            self._cached_expires_at = float(getattr(session, "expires_at", 0) or 0)
+
+    def _cache_session(
+        self, event: AuthChangeEvent, session: Optional[Session]
+    ) -> None:
+        self._set_cached_session(session)
@@ -1,21 +1,43 @@
+from __future__ import annotations
+
+import copy
+import dataclasses
 import re
-from typing import Any, Dict, Optional, Union
+import time
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Union
 
 from gotrue import AsyncMemoryStorage
 from gotrue.types import AuthChangeEvent, Session
-from httpx import Timeout
-from postgrest import (
-    AsyncPostgrestClient,
-    AsyncRequestBuilder,
-    AsyncRPCFilterRequestBuilder,
-)
+from httpx import NetworkError, Timeout, TimeoutException
+from postgrest import AsyncRequestBuilder, AsyncRPCFilterRequestBuilder
 from postgrest.constants import DEFAULT_POSTGREST_CLIENT_TIMEOUT
-from storage3 import AsyncStorageClient
-from storage3.constants import DEFAULT_TIMEOUT as DEFAULT_STORAGE_CLIENT_TIMEOUT
-from supafunc import AsyncFunctionsClient
-
-from ..lib.client_options import ClientOptions
+from postgrest.types import ReturnMethod
+
+from ..lib.batch import BatchResult, request_timeout
+from ..lib.bulk import BulkResult, ChunkOutcome, encode_chunk, iter_chunks
+from ..lib.cache import LRUCache
+from ..lib.client_options import DEFAULT_STORAGE_CLIENT_TIMEOUT, ClientOptions
+from ..lib.concurrency import AsyncRuntime
+from ..lib.errors import postgrest_error
+from ..lib.instrumentation import Instrumentation, pool_stats
+from ..lib.json_codec import JSONCodec, resolve_codec
+from ..lib.retry import RETRYABLE_STATUS_CODES, backoff_delay
+from ..lib.signed_url_cache import SignedURLCache
 from .auth_client import AsyncSupabaseAuthClient
+from .postgrest_client import AsyncSupabasePostgrestClient
+from .realtime_client import AsyncRealtimeChannel, AsyncRealtimeClient
+from .table_mirror import AsyncTableMirror
+from .transport import (
+    AsyncBaseTransport,
+    AsyncCachingTransport,
+    AsyncCoalescingTransport,
+    AsyncRetryTransport,
+    AsyncSupabaseTransport,
+    connection_pool,
+)
+
+if TYPE_CHECKING:
+    from storage3 import AsyncStorageClient
 
 
 # Create an exception class when user does not provide a valid url or key.
@@ -76,17 +98,21 @@ class AsyncClient:
         self.functions_url = f"{supabase_url}/functions/v1"
         self.schema = options.schema
 
-        # Instantiate clients.
+        # Instantiate clients. They all share one connection pool.
+        self.instrumentation = options.instrumentation
+        self.json_codec = resolve_codec(options.json_codec)
+        self._transport = self._init_transport(options, self.instrumentation)
         self.auth = self._init_supabase_auth_client(
             auth_url=self.auth_url,
             client_options=options,
+            transport=self._transport,
+            json_codec=self.json_codec,
+        )
+        self.realtime = self._init_realtime_client(
+            realtime_url=self.realtime_url,
+            supabase_key=self.supabase_key,
+            options=options.realtime,
         )
-        # TODO: Bring up to parity with JS client.
-        # self.realtime: SupabaseRealtimeClient = self._init_realtime_client(
-        #     realtime_url=self.realtime_url,
-        #     supabase_key=self.supabase_key,
-        # )
-        self.realtime = None
         self._postgrest = None
         self._storage = None
         self._functions = None
@@ -103,6 +129,34 @@ class AsyncClient:
         client._auth_token = await client._get_token_header()
         return client
 
+    async def __aenter__(self) -> AsyncClient:
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Return the request latencies, errors and connection pool usage.
+
+        See :class:`~supabase.lib.instrumentation.Instrumentation` for what
+        is measured. Requests are only measured when `instrumentation` is set
+        in the options; otherwise only the pool usage is reported. The result
+        is plain data, ready to be exported.
+        """
+        pool = pool_stats(self._transport)
+        if self.instrumentation is None:
+            return {"requests": [], "connections": None, "pool": pool}
+        return self.instrumentation.snapshot(pool=pool)
+
+    async def aclose(self) -> None:
+        """Close the realtime socket and the HTTP connections of the sub-clients."""
+        await self.realtime.close()
+        await self._transport.release()
+
+    async def close(self) -> None:
+        """Same as `aclose`."""
+        await self.aclose()
+
     def table(self, table_name: str) -> AsyncRequestBuilder:
         """Perform a table operation.
 
@@ -141,15 +195,158 @@ class AsyncClient:
             params = {}
         return self.postgrest.rpc(fn, params)
 
+    async def batch(
+        self,
+        requests: Iterable[Any],
+        concurrency: int = 10,
+        timeout: Optional[float] = None,
+    ) -> List[BatchResult]:
+        """Execute many independent requests concurrently.
+
+        Parameters
+        ----------
+        requests : iterable of request builders
+            Builders returned by `table`, `from_` or `rpc` that have not been
+            executed yet.
+        concurrency : int
+            Maximum number of requests in flight at once.
+        timeout : float, optional
+            Seconds each request may take before it fails with a timeout.
+
+        Returns
+        -------
+        list of BatchResult
+            One result per request, in the order the requests were given. A
+            failed request holds its exception in `error` instead of raising.
+        """
+
+        async def run(request: Any) -> BatchResult:
+            request_timeout.set(timeout)
+            try:
+                response = await AsyncRuntime.wait_for(request.execute(), timeout)
+            except Exception as exc:
+                return BatchResult(error=exc)
+            return BatchResult(response=response)
+
+        return await AsyncRuntime.map(run, requests, concurrency)
+
+    async def bulk_upsert(
+        self,
+        table_name: str,
+        rows: Iterable[Dict[str, Any]],
+        chunk_size: int = 500,
+        concurrency: int = 4,
+        on_conflict: str = "",
+        ignore_duplicates: bool = False,
+        retries: int = 3,
+    ) -> BulkResult:
+        """Upsert a large number of rows in concurrent chunks.
+
+        `rows` is read lazily, so it can be a generator over a file or a
+        cursor: only the chunks being sent are held in memory. Chunks that
+        fail with a timeout, a network error or a retryable status are sent
+        again after a backoff; upserts are idempotent, so a resent chunk
+        cannot duplicate rows.
+
+        Parameters
+        ----------
+        table_name : str
+            The table to write to.
+        rows : iterable of dict
+            The rows to upsert.
+        chunk_size : int
+            Number of rows sent per request.
+        concurrency : int
+            Maximum number of chunks in flight at once.
+        on_conflict : str
+            Comma-separated UNIQUE columns used to detect duplicates.
+        ignore_duplicates : bool
+            Whether rows that already exist are skipped instead of merged.
+        retries : int
+            How many times a failing chunk is sent again before giving up.
+
+        Returns
+        -------
+        BulkResult
+            Rows and bytes written, throughput, and the error of each chunk
+            that could not be written.
+        """
+        result = BulkResult()
+        started = time.perf_counter()
+
+        async def send(chunk: List[Dict[str, Any]]) -> ChunkOutcome:
+            try:
+                body = encode_chunk(chunk, self.json_codec)
+                retried = await self._upsert_chunk(
+                    table_name, body, on_conflict, ignore_duplicates, retries
+                )
+            except Exception as exc:
+                return ChunkOutcome(error=exc)
+            return ChunkOutcome(rows=len(chunk), bytes=len(body), retries=retried)
+
+        chunks = iter_chunks(rows, chunk_size)
+        outcomes = await AsyncRuntime.map(send, chunks, concurrency)
+        for index, outcome in enumerate(outcomes):
+            result.add(index, outcome)
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    async def _upsert_chunk(
+        self,
+        table_name: str,
+        body: bytes,
+        on_conflict: str,
+        ignore_duplicates: bool,
+        retries: int,
+    ) -> int:
+        """Send one encoded chunk and return how many retries it took."""
+        request = self.from_(table_name).upsert(
+            [],
+            returning=ReturnMethod.minimal,
+            on_conflict=on_conflict,
+            ignore_duplicates=ignore_duplicates,
+        )
+        headers = request.headers.copy()
+        headers["Content-Type"] = "application/json"
+        attempt = 0
+        while True:
+            try:
+                response = await request.session.request(
+                    request.http_method,
+                    request.path,
+                    params=request.params,
+                    headers=headers,
+                    content=body,
+                )
+                if response.is_success:
+                    return attempt
+                error: Exception = postgrest_error(response)
+                retryable = response.status_code in RETRYABLE_STATUS_CODES
+            except (TimeoutException, NetworkError) as exc:
+                error, retryable = exc, True
+            if not retryable or attempt >= retries:
+                raise error
+            attempt += 1
+            await AsyncRuntime.sleep(backoff_delay(attempt))
+
     @property
     def postgrest(self):
         if self._postgrest is None:
             self.options.headers.update(self._auth_token)
+            transport: AsyncBaseTransport = self._transport
+            if self.options.response_cache is not None:
+                transport = AsyncCachingTransport(
+                    transport, self.options.response_cache
+                )
+            if self.options.coalesce_reads:
+                transport = AsyncCoalescingTransport(transport)
             self._postgrest = self._init_postgrest_client(
                 rest_url=self.rest_url,
                 headers=self.options.headers,
                 schema=self.options.schema,
                 timeout=self.options.postgrest_client_timeout,
+                transport=transport,
+                json_codec=self.json_codec,
             )
 
         return self._postgrest
@@ -163,6 +360,9 @@ class AsyncClient:
                 storage_url=self.storage_url,
                 headers=headers,
                 storage_client_timeout=self.options.storage_client_timeout,
+                transport=self._transport,
+                signed_url_cache=self.options.signed_url_cache,
+                json_codec=self.json_codec,
             )
         return self._storage
 
@@ -171,56 +371,155 @@ class AsyncClient:
         if self._functions is None:
             headers = self._get_auth_headers()
             headers.update(self._auth_token)
-            self._functions = AsyncFunctionsClient(self.functions_url, headers)
+            # imported on first use so that `import supabase` stays cheap
+            from .functions_client import AsyncSupabaseFunctionsClient
+
+            self._functions = AsyncSupabaseFunctionsClient(
+                self.functions_url,
+                headers,
+                transport=self._transport,
+                timeout=self.options.function_client_timeout,
+                function_timeouts=self.options.function_timeouts,
+                json_codec=self.json_codec,
+            )
         return self._functions
 
-    #     async def remove_subscription_helper(resolve):
-    #         try:
-    #             await self._close_subscription(subscription)
-    #             open_subscriptions = len(self.get_subscriptions())
-    #             if not open_subscriptions:
-    #                 error = await self.realtime.disconnect()
-    #                 if error:
-    #                     return {"error": None, "data": { open_subscriptions}}
-    #         except Exception as e:
-    #             raise e
-    #     return remove_subscription_helper(subscription)
-
-    # async def _close_subscription(self, subscription):
-    #    """Close a given subscription
-
-    #    Parameters
-    #    ----------
-    #    subscription
-    #        The name of the channel
-    #    """
-    #    if not subscription.closed:
-    #        await self._closeChannel(subscription)
-
-    # def get_subscriptions(self):
-    #     """Return all channels the client is subscribed to."""
-    #     return self.realtime.channels
-
-    # @staticmethod
-    # def _init_realtime_client(
-    #     realtime_url: str, supabase_key: str
-    # ) -> SupabaseRealtimeClient:
-    #     """Private method for creating an instance of the realtime-py client."""
-    #     return SupabaseRealtimeClient(
-    #         realtime_url, {"params": {"apikey": supabase_key}}
-    #     )
+    def channel(
+        self, name: str, config: Optional[Dict[str, Any]] = None
+    ) -> AsyncRealtimeChannel:
+        """Return the realtime channel with the given name, creating it if needed.
+
+        Parameters
+        ----------
+        name : str
+            The name of the channel.
+        config : dict, optional
+            The `broadcast` and `presence` settings sent when joining.
+        """
+        return self.realtime.channel(name, config)
+
+    def get_channels(self) -> List[AsyncRealtimeChannel]:
+        """Return all channels of the realtime client."""
+        return list(self.realtime.channels.values())
+
+    async def remove_channel(self, channel: AsyncRealtimeChannel) -> None:
+        """Unsubscribe from a channel, closing the socket if it was the last one."""
+        await channel.unsubscribe()
+        if not self.realtime.channels:
+            await self.realtime.close()
+
+    async def remove_all_channels(self) -> None:
+        """Unsubscribe from every channel and close the realtime socket."""
+        for channel in self.get_channels():
+            await channel.unsubscribe()
+        await self.realtime.close()
+
+    async def mirror(
+        self,
+        table: str,
+        key: Union[str, Sequence[str]] = "id",
+        *,
+        indexes: Sequence[str] = (),
+        order_by: Optional[str] = None,
+        page_size: int = 1000,
+    ) -> AsyncTableMirror:
+        """Keep an in-memory copy of a table, updated by its realtime changes.
+
+        Reads of the returned mirror are dictionary lookups rather than
+        requests. It is meant for small lookup tables read far more often
+        than they change; see `AsyncTableMirror`.
+
+        Parameters
+        ----------
+        table : str
+            The table to mirror, in the client's schema.
+        key : str or sequence of str
+            The primary key column, or columns, rows are looked up by.
+        indexes : sequence of str
+            Columns to index, so that `find` looks them up instead of
+            scanning every row.
+        order_by : str, optional
+            A unique column the table is read in order of. Defaults to the
+            key, which must then be a single column.
+        page_size : int
+            Number of rows requested per page when reading the table.
+
+        Returns
+        -------
+        AsyncTableMirror
+            The mirror, once the table has been read. Close it with
+            `close()` or use it as an async context manager.
+        """
+        mirror = AsyncTableMirror(
+            self,
+            table,
+            key,
+            indexes=indexes,
+            order_by=order_by,
+            page_size=page_size,
+        )
+        return await mirror.start()
+
+    @staticmethod
+    def _init_realtime_client(
+        realtime_url: str,
+        supabase_key: str,
+        options: Optional[Dict[str, Any]] = None,
+        access_token: Optional[str] = None,
+    ) -> AsyncRealtimeClient:
+        """Private method for creating an instance of the realtime client."""
+        return AsyncRealtimeClient(
+            realtime_url, supabase_key, access_token=access_token, **(options or {})
+        )
+
     @staticmethod
     def _init_storage_client(
         storage_url: str,
         headers: Dict[str, str],
         storage_client_timeout: int = DEFAULT_STORAGE_CLIENT_TIMEOUT,
+        transport: Optional[AsyncBaseTransport] = None,
+        signed_url_cache: Optional[SignedURLCache] = None,
+        json_codec: Optional[JSONCodec] = None,
     ) -> AsyncStorageClient:
-        return AsyncStorageClient(storage_url, headers, storage_client_timeout)
+        # imported on first use so that `import supabase` stays cheap
+        from .storage_client import AsyncSupabaseStorageClient
+
+        return AsyncSupabaseStorageClient(
+            storage_url,
+            headers,
+            storage_client_timeout,
+            transport=transport,
+            signed_url_cache=signed_url_cache,
+            json_codec=json_codec,
+        )
+
+    @staticmethod
+    def _init_transport(
+        client_options: ClientOptions,
+        instrumentation: Optional[Instrumentation] = None,
+    ) -> AsyncSupabaseTransport:
+        """Private helper for creating the transport shared by all sub-clients."""
+        transport: AsyncBaseTransport
+        if client_options.http_transport is not None:
+            transport = client_options.http_transport
+        else:
+            transport = connection_pool(
+                client_options.http2, client_options.http_limits
+            )
+        if client_options.retry_policy is not None:
+            transport = AsyncRetryTransport(transport, client_options.retry_policy)
+        return AsyncSupabaseTransport(
+            transport,
+            owns_transport=client_options.http_transport is None,
+            instrumentation=instrumentation,
+        )
 
     @staticmethod
     def _init_supabase_auth_client(
         auth_url: str,
         client_options: ClientOptions,
+        transport: Optional[AsyncBaseTransport] = None,
+        json_codec: Optional[JSONCodec] = None,
     ) -> AsyncSupabaseAuthClient:
         """Creates a wrapped instance of the GoTrue Client."""
         return AsyncSupabaseAuthClient(
@@ -230,6 +529,9 @@ class AsyncClient:
             storage=client_options.storage,
             headers=client_options.headers,
             flow_type=client_options.flow_type,
+            transport=transport,
+            refresh_lock_path=client_options.refresh_lock_path,
+            json_codec=json_codec,
         )
 
     @staticmethod
@@ -238,10 +540,17 @@ class AsyncClient:
         headers: Dict[str, str],
         schema: str,
         timeout: Union[int, float, Timeout] = DEFAULT_POSTGREST_CLIENT_TIMEOUT,
-    ) -> AsyncPostgrestClient:
+        transport: Optional[AsyncBaseTransport] = None,
+        json_codec: Optional[JSONCodec] = None,
+    ) -> AsyncSupabasePostgrestClient:
         """Private helper for creating an instance of the Postgrest client."""
-        return AsyncPostgrestClient(
-            rest_url, headers=headers, schema=schema, timeout=timeout
+        return AsyncSupabasePostgrestClient(
+            rest_url,
+            headers=headers,
+            schema=schema,
+            timeout=timeout,
+            transport=transport,
+            json_codec=json_codec,
         )
 
     def _create_auth_header(self, token: str):
@@ -270,14 +579,23 @@ class AsyncClient:
     ):
         access_token = self.supabase_key
         if event in ["SIGNED_IN", "TOKEN_REFRESHED", "SIGNED_OUT"]:
-            # reset postgrest and storage instance on event change
-            self._postgrest = None
-            self._storage = None
-            self._functions = None
             access_token = session.access_token if session else self.supabase_key
+            # swap the token on the existing instances so their warm
+            # connections survive the event
+            self._set_sub_clients_auth(access_token)
 
         self._auth_token = self._create_auth_header(access_token)
 
+    def _set_sub_clients_auth(self, access_token: str):
+        """Update the Authorization header of the already created sub-clients."""
+        if self._postgrest is not None:
+            self._postgrest.auth(access_token)
+        if self._storage is not None:
+            self._storage.set_auth(access_token)
+        if self._functions is not None:
+            self._functions.set_auth(access_token)
+        self.realtime.set_auth(access_token)
+
 
 async def create_client(
     supabase_url: str,
@@ -313,3 +631,96 @@ async def create_client(
     return await AsyncClient.create(
         supabase_url=supabase_url, supabase_key=supabase_key, options=options
     )
+
+
+class AsyncClientFactory:
+    """Hands out clients for many end users from one shared configuration.
+
+    The URL and key are validated once and every client returned by
+    `for_user` sends its requests through the same connection pool. Clients
+    are cached by access token, so repeated requests from the same user reuse
+    their postgrest, storage and functions sub-clients.
+
+    The clients share the factory's `auth` client; use them for data access
+    and keep sign-in flows on a regular client.
+    """
+
+    def __init__(
+        self,
+        supabase_url: str,
+        supabase_key: str,
+        options: ClientOptions = ClientOptions(storage=AsyncMemoryStorage()),
+        cache_size: int = 1024,
+        cache_ttl: Optional[float] = 300.0,
+    ):
+        """Instantiate the factory.
+
+        Parameters
+        ----------
+        supabase_url: str
+            The URL to the Supabase instance that should be connected to.
+        supabase_key: str
+            The API key to the Supabase instance that should be connected to.
+        options: ClientOptions
+            Options shared by every client handed out by the factory.
+        cache_size: int
+            Maximum number of per-user clients kept around.
+        cache_ttl: float, optional
+            Seconds after which a cached per-user client is rebuilt.
+        """
+        self.client = AsyncClient(supabase_url, supabase_key, options)
+        self._transport = AsyncSupabaseTransport(
+            self.client._transport, owns_transport=False
+        )
+        self._clients: LRUCache[str, AsyncClient] = LRUCache(
+            cache_size, cache_ttl, on_evict=self._evict
+        )
+
+    async def __aenter__(self) -> AsyncClientFactory:
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the realtime sockets of the handed out clients and the pool."""
+        for client in self._clients.values():
+            await client.realtime.close()
+        self._clients.clear()
+        await self.client.aclose()
+
+    async def close(self) -> None:
+        """Same as `aclose`."""
+        await self.aclose()
+
+    def for_user(self, access_token: str) -> AsyncClient:
+        """Return a client that authenticates requests with `access_token`."""
+        client = self._clients.get(access_token)
+        if client is None:
+            client = self._create_user_client(access_token)
+            self._clients.set(access_token, client)
+        return client
+
+    @staticmethod
+    def _evict(access_token: str, client: AsyncClient) -> None:
+        # the client may still be in use, but it is no longer handed out, so
+        # its realtime socket would otherwise stay open until collected
+        AsyncRuntime.spawn(client.realtime.close())
+
+    def _create_user_client(self, access_token: str) -> AsyncClient:
+        client = copy.copy(self.client)
+        client.options = dataclasses.replace(
+            self.client.options, headers=self.client.options.headers.copy()
+        )
+        client._transport = self._transport
+        client._auth_token = client._create_auth_header(access_token)
+        client._postgrest = None
+        client._storage = None
+        client._functions = None
+        client.realtime = client._init_realtime_client(
+            realtime_url=client.realtime_url,
+            supabase_key=client.supabase_key,
+            options=client.options.realtime,
+            access_token=access_token,
+        )
+        return client
@@ -0,0 +1,255 @@
+import asyncio
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional, Union
+
+from httpx import AsyncBaseTransport, Headers, QueryParams, Timeout
+from postgrest import (
+    AsyncPostgrestClient,
+    AsyncRequestBuilder,
+    AsyncSelectRequestBuilder,
+)
+from postgrest.base_request_builder import CountMethod, pre_select
+from postgrest.constants import (
+    DEFAULT_POSTGREST_CLIENT_HEADERS,
+    DEFAULT_POSTGREST_CLIENT_TIMEOUT,
+)
+from postgrest.utils import sanitize_param
+
+from ..lib.columnar import read_arrow, read_pandas
+from ..lib.errors import postgrest_error
+from ..lib.json_codec import JSONCodec
+from .transport import AsyncCodecClient
+
+if TYPE_CHECKING:
+    import pandas
+    import pyarrow
+
+_TableT = Dict[str, Any]
+
+
+def _with_column(select: Optional[str], column: str) -> str:
+    """Return the `select` parameter with `column` added if it is missing."""
+    if not select:
+        return "*"
+    depth, start, fields = 0, 0, []
+    for i, char in enumerate(select):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            fields.append(select[start:i])
+            start = i + 1
+    fields.append(select[start:])
+    if "*" in fields or column in fields:
+        return select
+    return f"{select},{column}"
+
+
+class AsyncSupabaseSelectRequestBuilder(AsyncSelectRequestBuilder[_TableT]):
+    def stream(
+        self,
+        page_size: int = 1000,
+        order_by: str = "id",
+        ascending: bool = True,
+    ) -> AsyncIterator[_TableT]:
+        """Iterate over every matching row without loading them all at once.
+
+        Rows are fetched page by page with keyset pagination: each page asks
+        for the rows after the last `order_by` value seen, so deep pages cost
+        the same as the first one. The next page is requested while the
+        current one is being consumed, which keeps at most two pages in memory.
+
+        The `order_by` column is added to the selected columns when they do
+        not include it already. The order and size of the pages are set by
+        this method, so the query must not have its own `order`, `limit` or
+        `range`.
+
+        Args:
+            page_size: The number of rows requested per page.
+            order_by: A unique, non-null column the rows are ordered by.
+            ascending: Whether to walk the table in ascending order.
+        Raises:
+            ValueError: If the query is already ordered or limited.
+        """
+        paged = [name for name in ("order", "limit", "offset") if name in self.params]
+        if paged:
+            raise ValueError(
+                f"stream() pages the rows itself; remove the query's {paged[0]}"
+            )
+        direction, operator = ("asc", "gt") if ascending else ("desc", "lt")
+        params = self.params.set("order", f"{order_by}.{direction}").set(
+            "limit", str(page_size)
+        )
+        params = params.set("select", _with_column(params.get("select"), order_by))
+        return self._stream(params, page_size, order_by, operator)
+
+    async def _stream(
+        self, params: QueryParams, page_size: int, order_by: str, operator: str
+    ) -> AsyncIterator[_TableT]:
+        pending: Optional[asyncio.Future] = asyncio.ensure_future(
+            self._fetch_page(params)
+        )
+        try:
+            while pending is not None:
+                page = await pending
+                pending = None
+                if len(page) == page_size:
+                    cursor = f"{operator}.{sanitize_param(page[-1][order_by])}"
+                    pending = asyncio.ensure_future(
+                        self._fetch_page(params.add(order_by, cursor))
+                    )
+                for row in page:
+                    yield row
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def _fetch_page(self, params: QueryParams) -> List[_TableT]:
+        r = await self.session.request(
+            "GET", self.path, params=params, headers=self.headers
+        )
+        if not r.is_success:
+            raise postgrest_error(r)
+        return r.json()
+
+    async def execute_arrow(self, convert_options: Any = None) -> "pyarrow.Table":
+        """Run the query and return its rows as an Arrow table.
+
+        The rows are fetched as CSV and parsed by pyarrow into columns,
+        without building a dictionary per row. Requires pyarrow.
+
+        Args:
+            convert_options: A `pyarrow.csv.ConvertOptions` replacing the
+                default one, e.g. to set the types of some columns.
+        """
+        return read_arrow(await self._fetch_csv(), convert_options)
+
+    async def to_pandas(self, **read_csv: Any) -> "pandas.DataFrame":
+        """Run the query and return its rows as a DataFrame.
+
+        The rows are fetched as CSV and parsed by pandas, without building a
+        dictionary per row. Requires pandas.
+
+        Args:
+            **read_csv: Keyword arguments passed to `pandas.read_csv`.
+        """
+        return read_pandas(await self._fetch_csv(), **read_csv)
+
+    async def stream_csv(
+        self, chunk_size: Optional[int] = None
+    ) -> AsyncIterator[bytes]:
+        """Export the matching rows as CSV, yielded as they are received.
+
+        The export starts with a header line and is never held in memory as
+        a whole, which suits writing large results to a file.
+
+        Args:
+            chunk_size: The size of the chunks yielded, in bytes. Defaults to
+                whatever size the chunks arrive in.
+        """
+        async with self.session.stream(
+            self.http_method, self.path, params=self.params, headers=self._csv_headers()
+        ) as r:
+            if not r.is_success:
+                await r.aread()
+                raise postgrest_error(r)
+            async for chunk in r.aiter_bytes(chunk_size):
+                yield chunk
+
+    async def _fetch_csv(self) -> bytes:
+        r = await self.session.request(
+            self.http_method, self.path, params=self.params, headers=self._csv_headers()
+        )
+        if not r.is_success:
+            raise postgrest_error(r)
+        return r.content
+
+    def _csv_headers(self) -> Headers:
+        headers = self.headers.copy()
+        headers["Accept"] = "text/csv"
+        return headers
+
+
+class AsyncSupabaseRequestBuilder(AsyncRequestBuilder[_TableT]):
+    def select(
+        self,
+        *columns: str,
+        count: Optional[CountMethod] = None,
+    ) -> AsyncSupabaseSelectRequestBuilder:
+        """Run a SELECT query.
+
+        Args:
+            *columns: The names of the columns to fetch.
+            count: The method to use to get the count of rows returned.
+        Returns:
+            :class:`AsyncSupabaseSelectRequestBuilder`
+        """
+        method, params, headers, json = pre_select(*columns, count=count)
+        return AsyncSupabaseSelectRequestBuilder(
+            self.session, self.path, method, headers, params, json
+        )
+
+    def stream(
+        self,
+        *columns: str,
+        page_size: int = 1000,
+        order_by: str = "id",
+        ascending: bool = True,
+    ) -> AsyncIterator[_TableT]:
+        """Iterate over every row of the table, one page at a time.
+
+        Shorthand for `select(*columns).stream(...)`, selecting all columns by
+        default. See :meth:`AsyncSupabaseSelectRequestBuilder.stream`.
+        """
+        return self.select(*(columns or ("*",))).stream(
+            page_size=page_size, order_by=order_by, ascending=ascending
+        )
+
+
+class AsyncSupabasePostgrestClient(AsyncPostgrestClient):
+    """PostgREST client whose session can be bound to a shared transport."""
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        schema: str = "public",
+        headers: Dict[str, str] = DEFAULT_POSTGREST_CLIENT_HEADERS,
+        timeout: Union[int, float, Timeout] = DEFAULT_POSTGREST_CLIENT_TIMEOUT,
+        transport: Optional[AsyncBaseTransport] = None,
+        json_codec: Optional[JSONCodec] = None,
+    ):
+        """Instantiate SupabasePostgrestClient instance."""
+        self._transport = transport
+        self._json_codec = json_codec
+        AsyncPostgrestClient.__init__(
+            self,
+            base_url,
+            schema=schema,
+            headers=headers,
+            timeout=timeout,
+        )
+
+    def create_session(
+        self,
+        base_url: str,
+        headers: Dict[str, str],
+        timeout: Union[int, float, Timeout],
+    ) -> AsyncCodecClient:
+        return AsyncCodecClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            transport=self._transport,
+            codec=self._json_codec,
+        )
+
+    def from_(self, table: str) -> AsyncSupabaseRequestBuilder:
+        """Perform a table operation.
+
+        Args:
+            table: The name of the table
+        Returns:
+            :class:`AsyncSupabaseRequestBuilder`
+        """
+        return AsyncSupabaseRequestBuilder(self.session, f"/{table}")
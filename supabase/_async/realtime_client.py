@@ -0,0 +1,705 @@
+from __future__ import annotations
+
+import asyncio
+import inspect
+import json
+import logging
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Union,
+)
+from urllib.parse import urlencode
+
+from ..lib.realtime_payload import ChangePayload, PayloadDecoder
+from ..lib.retry import backoff_delay
+
+logger = logging.getLogger(__name__)
+
+PHOENIX_TOPIC = "phoenix"
+PROTOCOL_VERSION = "1.0.0"
+OVERFLOW_POLICIES = ("block", "drop_oldest", "coalesce")
+
+
+class RealtimeError(Exception):
+    """Raised when the realtime server refuses a channel operation."""
+
+
+@dataclass
+class QueueMetrics:
+    """A snapshot of the state of a `ChangeQueue`."""
+
+    depth: int
+    """Changes waiting to be consumed"""
+    max_depth: int
+    """Largest depth seen so far"""
+    received: int
+    """Changes handed to the queue"""
+    dropped: int
+    """Changes discarded because the queue was full"""
+    coalesced: int
+    """Changes that replaced a pending change to the same row"""
+
+
+class ChangeQueue:
+    """A bounded buffer between the socket reader and an `async for` consumer.
+
+    When `max_size` changes are waiting, `overflow` decides what happens to
+    the next one:
+
+    - `block` stops reading from the socket until the consumer catches up.
+      Heartbeat replies are not read either, so a consumer stalled for longer
+      than the client `timeout` makes the connection reconnect.
+    - `drop_oldest` discards the oldest waiting change.
+    - `coalesce` replaces the waiting change to the same row, identified by
+      the `key` columns of its table, and drops the oldest change when there
+      is none.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1000,
+        overflow: str = "block",
+        key: Union[str, Sequence[str]] = "id",
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"overflow must be one of {', '.join(OVERFLOW_POLICIES)}, "
+                f"not {overflow!r}"
+            )
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.overflow = overflow
+        self.key = (key,) if isinstance(key, str) else tuple(key)
+        self.max_depth = 0
+        self.received = 0
+        self.dropped = 0
+        self.coalesced = 0
+        # pending changes by arrival number, and the arrival number of the
+        # latest pending change of each row when coalescing
+        self._items: OrderedDict[int, ChangePayload] = OrderedDict()
+        self._rows: Dict[Hashable, int] = {}
+        self._seq = 0
+        self._getters: Deque[asyncio.Future] = deque()
+        self._putters: Deque[asyncio.Future] = deque()
+        self._closed = False
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __aiter__(self) -> ChangeQueue:
+        return self
+
+    async def __anext__(self) -> ChangePayload:
+        while not self._items:
+            if self._closed:
+                raise StopAsyncIteration
+            await self._wait(self._getters)
+        seq, change = self._items.popitem(last=False)
+        self._forget(seq, change)
+        self._wake(self._putters)
+        return change
+
+    def metrics(self) -> QueueMetrics:
+        return QueueMetrics(
+            depth=len(self._items),
+            max_depth=self.max_depth,
+            received=self.received,
+            dropped=self.dropped,
+            coalesced=self.coalesced,
+        )
+
+    async def put(self, change: ChangePayload) -> None:
+        self.received += 1
+        while len(self._items) >= self.max_size:
+            if self._closed:
+                self.dropped += 1
+                return
+            if self.overflow == "block":
+                await self._wait(self._putters)
+                continue
+            if self.overflow == "coalesce":
+                seq = self._rows.get(self._row(change))
+                if seq is not None:
+                    self._items[seq] = change
+                    self.coalesced += 1
+                    return
+            seq, dropped = self._items.popitem(last=False)
+            self._forget(seq, dropped)
+            self.dropped += 1
+        self._seq += 1
+        self._items[self._seq] = change
+        if self.overflow == "coalesce":
+            row = self._row(change)
+            if row is not None:
+                self._rows[row] = self._seq
+        self.max_depth = max(self.max_depth, len(self._items))
+        self._wake(self._getters)
+
+    def close(self) -> None:
+        """End iteration once the pending changes have been consumed."""
+        self._closed = True
+        self._wake(self._getters, every=True)
+        self._wake(self._putters, every=True)
+
+    def _row(self, change: ChangePayload) -> Optional[Hashable]:
+        record = change.new or change.old
+        try:
+            return (change.table, *(record[column] for column in self.key))
+        except KeyError:
+            return None
+
+    def _forget(self, seq: int, change: ChangePayload) -> None:
+        if self._rows:
+            row = self._row(change)
+            if self._rows.get(row) == seq:
+                del self._rows[row]
+
+    @staticmethod
+    async def _wait(waiters: Deque[asyncio.Future]) -> None:
+        waiter = asyncio.get_running_loop().create_future()
+        waiters.append(waiter)
+        try:
+            await waiter
+        finally:
+            if waiter in waiters:
+                waiters.remove(waiter)
+
+    @staticmethod
+    def _wake(waiters: Deque[asyncio.Future], every: bool = False) -> None:
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                if not every:
+                    return
+
+
+class _Batcher:
+    """Hands events to a callback `size` at a time, or every `interval` seconds."""
+
+    __slots__ = ("_channel", "_callback", "_size", "_interval", "_events", "_timer")
+
+    def __init__(
+        self,
+        channel: AsyncRealtimeChannel,
+        callback: Callable[[List[Any]], Any],
+        size: Optional[int],
+        interval: Optional[float],
+    ):
+        self._channel = channel
+        self._callback = callback
+        self._size = size
+        self._interval = interval
+        self._events: List[Any] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def add(self, event: Any) -> None:
+        self._events.append(event)
+        if self._size is not None and len(self._events) >= self._size:
+            self.flush()
+        elif self._timer is None and self._interval is not None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self._interval, self.flush)
+
+    def flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        events, self._events = self._events, []
+        if events:
+            self._channel.client._invoke(self._callback, events)
+
+
+class _Binding:
+    """A callback registered on a channel, with its optional batcher."""
+
+    __slots__ = ("type", "filter", "callback", "batcher")
+
+    def __init__(
+        self,
+        channel: AsyncRealtimeChannel,
+        type: str,
+        filter: Dict[str, str],
+        callback: Optional[Callable[..., Any]],
+        batch_size: Optional[int],
+        batch_interval: Optional[float],
+    ):
+        self.type = type
+        self.filter = filter
+        self.callback = callback
+        self.batcher: Optional[_Batcher] = None
+        if callback is not None and (
+            batch_size is not None or batch_interval is not None
+        ):
+            self.batcher = _Batcher(channel, callback, batch_size, batch_interval)
+
+    def deliver(self, client: AsyncRealtimeClient, event: Any) -> None:
+        if self.batcher is not None:
+            self.batcher.add(event)
+        else:
+            client._invoke(self.callback, event)
+
+
+class AsyncRealtimeChannel:
+    """A topic on the shared realtime socket.
+
+    Register callbacks with `on_postgres_changes` and `on_broadcast`, then
+    call `subscribe`. Callbacks receive the event payload as sent by the
+    server, or a list of payloads when batching is enabled; coroutine
+    functions are scheduled as tasks. Database changes are delivered as
+    `ChangePayload` objects.
+
+    Database changes registered without a callback go to the channel's
+    `queue` instead, and are consumed with `async for change in channel`.
+    """
+
+    def __init__(
+        self,
+        client: AsyncRealtimeClient,
+        topic: str,
+        config: Optional[Dict[str, Any]] = None,
+    ):
+        self.client = client
+        self.topic = topic
+        self.config = config or {}
+        self.state = "closed"
+        self._postgres_bindings: List[_Binding] = []
+        self._postgres_bindings_by_id: Dict[int, _Binding] = {}
+        self._broadcast_bindings: Dict[str, List[_Binding]] = {}
+        self._join_callbacks: List[Callable[[AsyncRealtimeChannel], Any]] = []
+        self.queue = ChangeQueue()
+
+    def on_postgres_changes(
+        self,
+        event: str,
+        callback: Optional[Callable[..., Any]] = None,
+        *,
+        schema: str = "public",
+        table: Optional[str] = None,
+        filter: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        batch_interval: Optional[float] = None,
+    ) -> AsyncRealtimeChannel:
+        """Listen to database changes.
+
+        Parameters
+        ----------
+        event : str
+            One of `INSERT`, `UPDATE`, `DELETE` or `*`.
+        callback : callable, optional
+            Called with each change, or with a list of changes when batching.
+            Without a callback, changes are put on the channel's `queue`.
+        schema : str
+            The schema to listen to.
+        table : str, optional
+            The table to listen to. Defaults to every table of the schema.
+        filter : str, optional
+            A PostgREST style row filter, e.g. `id=eq.1`.
+        batch_size : int, optional
+            Deliver changes in lists of this many events.
+        batch_interval : float, optional
+            Deliver the changes received so far at least this often, in
+            seconds, even if `batch_size` was not reached.
+        """
+        change_filter = {"event": event, "schema": schema}
+        if table is not None:
+            change_filter["table"] = table
+        if filter is not None:
+            change_filter["filter"] = filter
+        self._postgres_bindings.append(
+            _Binding(
+                self,
+                "postgres_changes",
+                change_filter,
+                callback,
+                batch_size,
+                batch_interval,
+            )
+        )
+        return self
+
+    def buffer(
+        self,
+        max_size: int = 1000,
+        overflow: str = "block",
+        key: Union[str, Sequence[str]] = "id",
+    ) -> AsyncRealtimeChannel:
+        """Configure the queue consumed by `async for change in channel`.
+
+        See `ChangeQueue` for the overflow policies.
+        """
+        self.queue = ChangeQueue(max_size, overflow, key)
+        return self
+
+    def __aiter__(self) -> ChangeQueue:
+        return self.queue
+
+    def on_broadcast(
+        self,
+        event: str,
+        callback: Callable[..., Any],
+        *,
+        batch_size: Optional[int] = None,
+        batch_interval: Optional[float] = None,
+    ) -> AsyncRealtimeChannel:
+        """Listen to broadcast messages sent with the given event name."""
+        binding = _Binding(
+            self, "broadcast", {"event": event}, callback, batch_size, batch_interval
+        )
+        self._broadcast_bindings.setdefault(event, []).append(binding)
+        return self
+
+    def on_join(
+        self, callback: Callable[[AsyncRealtimeChannel], Any]
+    ) -> AsyncRealtimeChannel:
+        """Call `callback` with the channel every time it is joined.
+
+        That includes the joins made again after a reconnection, across which
+        changes may have been missed. The callback runs before any event
+        that follows the join is dispatched.
+        """
+        self._join_callbacks.append(callback)
+        return self
+
+    async def subscribe(self) -> AsyncRealtimeChannel:
+        """Connect the socket if needed and join the channel."""
+        await self.client.connect()
+        await self._join()
+        return self
+
+    async def unsubscribe(self) -> None:
+        """Leave the channel and deliver any events still being batched."""
+        # closing the queue first releases a socket reader blocked on it
+        self.queue.close()
+        if self.state == "joined" and self.client.is_connected:
+            await self.client._push(self.topic, "phx_leave", {})
+        self.state = "closed"
+        self._flush()
+        self.client.channels.pop(self.topic, None)
+
+    async def send_broadcast(self, event: str, payload: Dict[str, Any]) -> None:
+        """Send a broadcast message to the other subscribers of the channel."""
+        await self.client._send(
+            self.topic,
+            "broadcast",
+            {"type": "broadcast", "event": event, "payload": payload},
+        )
+
+    async def _join(self) -> None:
+        self.state = "joining"
+        config = {
+            "broadcast": self.config.get("broadcast", {}),
+            "presence": self.config.get("presence", {"key": ""}),
+            "postgres_changes": [b.filter for b in self._postgres_bindings],
+        }
+        reply = await self.client._push(
+            self.topic,
+            "phx_join",
+            {"config": config, "access_token": self.client.access_token},
+        )
+        if reply.get("status") != "ok":
+            self.state = "errored"
+            raise RealtimeError(reply.get("response"))
+
+    def _joined(self, reply: Dict[str, Any]) -> None:
+        """Apply the reply to a join, before any message that follows it.
+
+        The server answers with the bindings in the order they were sent,
+        each tagged with the id it will use in change events. Those events
+        may arrive right behind the reply, so this is called by the socket
+        reader rather than by `_join`, which only resumes later.
+        """
+        if reply.get("status") != "ok":
+            return
+        changes = reply.get("response", {}).get("postgres_changes", [])
+        self._postgres_bindings_by_id = {
+            change["id"]: binding
+            for change, binding in zip(changes, self._postgres_bindings)
+        }
+        self.state = "joined"
+        for callback in self._join_callbacks:
+            self.client._invoke(callback, self)
+
+    async def _dispatch(self, event: str, payload: Dict[str, Any]) -> None:
+        if event == "postgres_changes":
+            try:
+                data = self.client._decoder.decode(payload["data"])
+            except Exception:
+                logger.warning(
+                    "Skipped a malformed change on %s", self.topic, exc_info=True
+                )
+                return
+            queued = False
+            for binding_id in payload.get("ids", ()):
+                binding = self._postgres_bindings_by_id.get(binding_id)
+                if binding is None:
+                    continue
+                if binding.callback is not None:
+                    binding.deliver(self.client, data)
+                elif not queued:
+                    queued = True
+                    await self.queue.put(data)
+        elif event == "broadcast":
+            for binding in self._broadcast_bindings.get(payload.get("event"), ()):
+                binding.deliver(self.client, payload)
+        elif event in ("phx_error", "phx_close"):
+            self.state = "errored" if event == "phx_error" else "closed"
+
+    def _flush(self) -> None:
+        bindings = self._postgres_bindings + [
+            binding
+            for bindings in self._broadcast_bindings.values()
+            for binding in bindings
+        ]
+        for binding in bindings:
+            if binding.batcher is not None:
+                binding.batcher.flush()
+
+
+class AsyncRealtimeClient:
+    """Supabase Realtime over a single, self-healing websocket.
+
+    Every channel is multiplexed on one connection. A heartbeat is sent every
+    `heartbeat_interval` seconds; when one goes unanswered or the connection
+    drops, the client reconnects with exponential backoff and joins its
+    channels again.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        api_key: str,
+        *,
+        access_token: Optional[str] = None,
+        heartbeat_interval: float = 25.0,
+        timeout: float = 10.0,
+        max_reconnect_delay: float = 30.0,
+        params: Optional[Dict[str, str]] = None,
+    ):
+        """Instantiate the realtime client.
+
+        Parameters
+        ----------
+        url : str
+            The realtime endpoint, e.g. `wss://<ref>.supabase.co/realtime/v1`.
+        api_key : str
+            The project API key.
+        access_token : str, optional
+            The JWT channels are joined with. Defaults to the API key.
+        heartbeat_interval : float
+            Seconds between heartbeats.
+        timeout : float
+            Seconds to wait for the server to acknowledge a message.
+        max_reconnect_delay : float
+            Upper bound of the backoff between reconnection attempts.
+        params : dict, optional
+            Extra query parameters sent when connecting.
+        """
+        query = {"apikey": api_key, **(params or {}), "vsn": PROTOCOL_VERSION}
+        self.url = url
+        self.endpoint = f"{url}/websocket?{urlencode(query)}"
+        self.access_token = access_token or api_key
+        self.heartbeat_interval = heartbeat_interval
+        self.timeout = timeout
+        self.max_reconnect_delay = max_reconnect_delay
+        self.channels: Dict[str, AsyncRealtimeChannel] = {}
+        self._decoder = PayloadDecoder()
+        self._ws: Any = None
+        self._ref = 0
+        self._replies: Dict[str, asyncio.Future] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._runner: Optional[asyncio.Task] = None
+        self._connected: Optional[asyncio.Event] = None
+        self._closing = False
+
+    @property
+    def is_connected(self) -> bool:
+        return self._ws is not None
+
+    def channel(
+        self, name: str, config: Optional[Dict[str, Any]] = None
+    ) -> AsyncRealtimeChannel:
+        """Return the channel with the given name, creating it if needed."""
+        topic = f"realtime:{name}"
+        if topic not in self.channels:
+            self.channels[topic] = AsyncRealtimeChannel(self, topic, config)
+        return self.channels[topic]
+
+    async def connect(self) -> None:
+        """Open the socket, waiting up to `timeout` seconds for it to be ready."""
+        if self._runner is None or self._runner.done():
+            self._closing = False
+            self._connected = asyncio.Event()
+            self._runner = asyncio.ensure_future(self._run())
+        assert self._connected is not None
+        await asyncio.wait_for(self._connected.wait(), self.timeout)
+
+    async def close(self) -> None:
+        """Leave every channel and close the socket."""
+        self._closing = True
+        for channel in list(self.channels.values()):
+            channel._flush()
+            channel.queue.close()
+            if channel.state == "joined" and self._ws is not None:
+                # the socket closes right after, so the replies are not awaited
+                try:
+                    await self._send(channel.topic, "phx_leave", {})
+                except Exception:
+                    logger.debug("Could not leave %s", channel.topic, exc_info=True)
+            channel.state = "closed"
+        if self._ws is not None:
+            await self._ws.close()
+        if self._runner is not None:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+            self._runner = None
+
+    def set_auth(self, access_token: str) -> None:
+        """Use a new JWT for the joined channels and future joins."""
+        self.access_token = access_token
+        if not self.is_connected:
+            return
+        for channel in self.channels.values():
+            if channel.state == "joined":
+                self._spawn(
+                    self._send(
+                        channel.topic, "access_token", {"access_token": access_token}
+                    )
+                )
+
+    async def _run(self) -> None:
+        """Own the socket: connect, read, and reconnect until closed."""
+        import websockets
+
+        attempt = 0
+        while not self._closing:
+            try:
+                async with websockets.connect(self.endpoint) as ws:
+                    self._ws = ws
+                    attempt = 0
+                    assert self._connected is not None
+                    self._connected.set()
+                    for channel in self.channels.values():
+                        if channel.state in ("joining", "joined", "errored"):
+                            self._spawn(self._rejoin(channel))
+                    heartbeat = asyncio.ensure_future(self._heartbeat(ws))
+                    try:
+                        await self._read(ws)
+                    finally:
+                        heartbeat.cancel()
+            except Exception:
+                # whatever went wrong, a new connection starts from a clean
+                # state
+                logger.warning("Realtime connection lost", exc_info=True)
+            finally:
+                self._ws = None
+                if self._connected is not None:
+                    self._connected.clear()
+                self._fail_pending_replies()
+            if self._closing:
+                break
+            await asyncio.sleep(
+                backoff_delay(attempt, base=0.5, cap=self.max_reconnect_delay)
+            )
+            attempt += 1
+
+    async def _read(self, ws: Any) -> None:
+        async for raw in ws:
+            try:
+                message = json.loads(raw)
+                event = message["event"]
+                topic = message["topic"]
+                payload = message["payload"]
+            except (ValueError, TypeError, KeyError):
+                logger.warning("Skipped a malformed realtime message: %.200r", raw)
+                continue
+            if event == "phx_reply":
+                channel = self.channels.get(topic)
+                if channel is not None and channel.state == "joining":
+                    channel._joined(payload)
+                future = self._replies.get(message.get("ref"))
+                if future is not None and not future.done():
+                    future.set_result(payload)
+                continue
+            channel = self.channels.get(topic)
+            if channel is not None:
+                await channel._dispatch(event, payload)
+
+    async def _heartbeat(self, ws: Any) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self._push(PHOENIX_TOPIC, "heartbeat", {})
+            except asyncio.TimeoutError:
+                # an unanswered heartbeat means a dead connection: closing it
+                # makes `_run` reconnect
+                await ws.close()
+                return
+
+    async def _rejoin(self, channel: AsyncRealtimeChannel) -> None:
+        try:
+            await channel._join()
+        except (RealtimeError, asyncio.TimeoutError, ConnectionError):
+            logger.warning("Could not rejoin %s", channel.topic, exc_info=True)
+
+    async def _push(
+        self, topic: str, event: str, payload: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Send a message and wait for the server's reply."""
+        self._ref += 1
+        ref = str(self._ref)
+        future = asyncio.get_running_loop().create_future()
+        self._replies[ref] = future
+        try:
+            await self._send(topic, event, payload, ref)
+            return await asyncio.wait_for(future, self.timeout)
+        finally:
+            self._replies.pop(ref, None)
+
+    async def _send(
+        self,
+        topic: str,
+        event: str,
+        payload: Dict[str, Any],
+        ref: Optional[str] = None,
+    ) -> None:
+        if self._ws is None:
+            raise ConnectionError("The realtime socket is not connected")
+        message = {"topic": topic, "event": event, "payload": payload, "ref": ref}
+        await self._ws.send(json.dumps(message))
+
+    def _fail_pending_replies(self) -> None:
+        for future in self._replies.values():
+            if not future.done():
+                future.set_exception(ConnectionError("The realtime socket closed"))
+
+    def _invoke(self, callback: Callable[..., Any], argument: Any) -> None:
+        # a failing callback must not stop the socket reader
+        try:
+            result = callback(argument)
+        except Exception:
+            logger.exception("Realtime callback %r failed", callback)
+            return
+        if inspect.isawaitable(result):
+            self._spawn(result)
+
+    def _spawn(self, awaitable: Any) -> None:
+        task = asyncio.ensure_future(awaitable)
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+
+    def _done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Realtime task failed", exc_info=task.exception())
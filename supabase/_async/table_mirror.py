@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+from datetime import date, time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Union,
+)
+
+from ..lib.mirror import MirrorStore, Row
+from ..lib.realtime_payload import ChangePayload
+from ..lib.retry import backoff_delay
+from .realtime_client import AsyncRealtimeChannel
+
+if TYPE_CHECKING:
+    from .client import AsyncClient
+
+logger = logging.getLogger(__name__)
+
+# tells apart the channels of several mirrors of the same table
+_mirror_ids = itertools.count(1)
+
+
+class AsyncTableMirror:
+    """An in-memory copy of a table, kept up to date by realtime changes.
+
+    The table is read once through PostgREST, page by page, then every
+    INSERT, UPDATE and DELETE received on a realtime channel is applied to
+    the copy. Whenever the channel is joined again after a reconnection,
+    the table is read anew, since changes may have been missed in between;
+    the previous copy keeps answering reads until the new one is complete.
+
+    Changes received while the table is being read win over the rows read,
+    which keeps the copy exact whichever arrives first. Rows hold the values
+    PostgREST returns whatever their source: dates and times decoded by the
+    realtime client are turned back into ISO 8601 strings. Rows are shared
+    with the caller and must not be modified.
+
+    Changes that do not hold the key columns, e.g. the old row of a table
+    whose replica identity leaves them out, cannot be applied and are
+    skipped with a warning.
+
+    Create mirrors with `AsyncClient.mirror`.
+    """
+
+    def __init__(
+        self,
+        client: AsyncClient,
+        table: str,
+        key: Union[str, Sequence[str]] = "id",
+        *,
+        indexes: Sequence[str] = (),
+        order_by: Optional[str] = None,
+        page_size: int = 1000,
+    ):
+        keys = (key,) if isinstance(key, str) else tuple(key)
+        if order_by is None:
+            if len(keys) != 1:
+                raise ValueError("order_by is required when the key has many columns")
+            order_by = keys[0]
+        self.table = table
+        self.order_by = order_by
+        self.page_size = page_size
+        # times the table was read again after a reconnection
+        self.resyncs = 0
+        self._client = client
+        self._store = MirrorStore(keys, indexes)
+        # the changes applied while the table is being read, by row key; None
+        # for deleted rows
+        self._pending: Optional[Dict[Hashable, Optional[Row]]] = None
+        self._sync: Optional[asyncio.Task] = None
+        self._loaded = False
+        self._channel: Optional[AsyncRealtimeChannel] = None
+
+    async def __aenter__(self) -> AsyncTableMirror:
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def __iter__(self) -> Iterator[Row]:
+        return iter(self._store)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._store
+
+    def get(self, key: Hashable, default: Optional[Row] = None) -> Optional[Row]:
+        """Return the row with the given key.
+
+        The key is the value of the key column, or a tuple of the values of
+        the key columns when there are several.
+        """
+        return self._store.get(key, default)
+
+    def find(self, column: str, value: Any) -> List[Row]:
+        """Return the rows whose `column` equals `value`.
+
+        Columns given as `indexes` are looked up, the others scanned.
+        """
+        return self._store.find(column, value)
+
+    @property
+    def syncing(self) -> bool:
+        """Whether the table is being read again."""
+        return self._pending is not None
+
+    async def start(self) -> AsyncTableMirror:
+        """Subscribe to the table's changes and wait for its first copy."""
+        schema = self._client.schema
+        channel = self._client.channel(
+            f"mirror:{schema}:{self.table}:{next(_mirror_ids)}"
+        )
+        channel.on_postgres_changes("*", self._apply, schema=schema, table=self.table)
+        channel.on_join(self._resync)
+        self._channel = await channel.subscribe()
+        try:
+            # a reconnection may replace the read started by the join
+            while True:
+                sync = self._sync
+                assert sync is not None
+                await asyncio.wait({sync})
+                if sync is self._sync:
+                    break
+            sync.result()
+        except BaseException:
+            await self.close()
+            raise
+        return self
+
+    async def close(self) -> None:
+        """Stop following the table's changes."""
+        if self._sync is not None:
+            self._sync.cancel()
+            await asyncio.gather(self._sync, return_exceptions=True)
+            self._sync = None
+        if self._channel is not None:
+            channel, self._channel = self._channel, None
+            await self._client.remove_channel(channel)
+
+    def _apply(self, change: ChangePayload) -> None:
+        old_key = self._key_of(_normalise(change.old))
+        row: Optional[Row] = None
+        if change.event_type == "DELETE":
+            key = old_key
+        else:
+            row = _normalise(change.new)
+            key = self._key_of(row)
+        if key is None:
+            logger.warning(
+                "Skipped a %s of %s without its key columns %s",
+                change.event_type,
+                self.table,
+                ", ".join(self._store.key),
+            )
+            return
+        if old_key is not None and old_key != key:
+            # an UPDATE of the key moves the row
+            self._delete(old_key)
+        if row is None:
+            self._delete(key)
+        else:
+            self._store.put(row)
+            if self._pending is not None:
+                self._pending[key] = row
+
+    def _delete(self, key: Hashable) -> None:
+        self._store.delete(key)
+        if self._pending is not None:
+            self._pending[key] = None
+
+    def _key_of(self, row: Row) -> Optional[Hashable]:
+        try:
+            return self._store.key_of(row)
+        except KeyError:
+            return None
+
+    def _resync(self, channel: AsyncRealtimeChannel) -> None:
+        # called as soon as the join is acknowledged, so that the changes
+        # which follow it are recorded as pending
+        if self._sync is not None:
+            self._sync.cancel()
+            self.resyncs += 1
+        self._pending = {}
+        self._sync = asyncio.ensure_future(self._read_table())
+
+    async def _read_table(self) -> None:
+        attempt = 0
+        while True:
+            try:
+                rows = self._client.table(self.table).stream(
+                    page_size=self.page_size, order_by=self.order_by
+                )
+                store = MirrorStore(self._store.key, self._store.indexes)
+                async for row in rows:
+                    store.put(row)
+                break
+            except Exception:
+                if not self._loaded:
+                    raise
+                logger.warning("Could not read %s", self.table, exc_info=True)
+            await asyncio.sleep(backoff_delay(attempt))
+            attempt += 1
+        assert self._pending is not None
+        for key, pending in self._pending.items():
+            if pending is None:
+                store.delete(key)
+            else:
+                store.put(pending)
+        self._store = store
+        self._pending = None
+        self._loaded = True
+
+
+def _normalise(record: Mapping[str, Any]) -> Row:
+    """Return `record` with its dates and times as PostgREST writes them."""
+    return {
+        column: value.isoformat() if isinstance(value, (date, time)) else value
+        for column, value in record.items()
+    }
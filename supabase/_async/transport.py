@@ -0,0 +1,294 @@
+import asyncio
+from typing import Any, Dict, Optional
+
+from httpx import (
+    AsyncBaseTransport,
+    AsyncClient,
+    AsyncHTTPTransport,
+    Headers,
+    Limits,
+    NetworkError,
+    Request,
+    Response,
+    Timeout,
+    TimeoutException,
+)
+
+from ..lib.batch import request_timeout
+from ..lib.instrumentation import Instrumentation
+from ..lib.json_codec import JSONCodec, codec_response
+from ..lib.response_cache import ResponseCache, copy_response, request_identity
+from ..lib.retry import UNSENT_ERRORS, CircuitBreaker, CircuitOpenError, RetryPolicy
+
+
+def connection_pool(http2: bool, limits: Limits) -> AsyncBaseTransport:
+    """Return a new pool of HTTP connections, for the sub-clients to share."""
+    return AsyncHTTPTransport(http2=http2, limits=limits)
+
+
+class AsyncSupabaseTransport(AsyncBaseTransport):
+    """Connection pool shared by every sub-client of a Supabase client.
+
+    The postgrest, storage, functions and auth sessions all send their requests
+    through one instance of this class, so they reuse the same keep-alive
+    connections. Closing an individual session is a no-op; the pool is only
+    released once the owning Supabase client is closed.
+
+    Requests are only measured when an :class:`Instrumentation` is given;
+    otherwise they are passed straight through to `transport`.
+    """
+
+    def __init__(
+        self,
+        transport: AsyncBaseTransport,
+        owns_transport: bool = True,
+        instrumentation: Optional[Instrumentation] = None,
+    ):
+        self._transport = transport
+        self._owns_transport = owns_transport
+        self.instrumentation = instrumentation
+
+    async def handle_async_request(self, request: Request) -> Response:
+        timeout = request_timeout.get()
+        if timeout is not None:
+            request.extensions["timeout"] = Timeout(timeout).as_dict()
+        instrumentation = self.instrumentation
+        if instrumentation is None:
+            return await self._transport.handle_async_request(request)
+        if "trace" not in request.extensions:
+            request.extensions["trace"] = self._tracer(instrumentation)
+        started = instrumentation.start(request)
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException as exc:
+            instrumentation.finish(request, started, error=exc)
+            raise
+        instrumentation.finish(request, started, response)
+        return response
+
+    @staticmethod
+    def _tracer(instrumentation: Instrumentation) -> Any:
+        """Return an httpcore trace callback timing connection setup."""
+        steps: Dict[str, float] = {}
+
+        async def trace(event: str, info: Dict[str, Any]) -> None:
+            instrumentation.connection_event(event, steps)
+
+        return trace
+
+    async def aclose(self) -> None:
+        pass
+
+    async def release(self) -> None:
+        """Close the underlying pool, unless it was supplied by the caller."""
+        if self._owns_transport:
+            await self._transport.aclose()
+
+
+class AsyncCachingTransport(AsyncBaseTransport):
+    """Serves repeated PostgREST reads from a :class:`ResponseCache`."""
+
+    def __init__(self, transport: AsyncBaseTransport, cache: ResponseCache):
+        self._transport = transport
+        self._cache = cache
+
+    async def handle_async_request(self, request: Request) -> Response:
+        key = self._cache.key(request)
+        if key is None:
+            response = await self._transport.handle_async_request(request)
+            if request.method != "GET" and response.is_success:
+                self._cache.invalidate(request)
+            return response
+
+        entry = self._cache.get(key)
+        if entry is not None:
+            if self._cache.is_fresh(entry):
+                return entry.to_response()
+            if entry.etag is not None:
+                request.headers["If-None-Match"] = entry.etag
+
+        response = await self._transport.handle_async_request(request)
+        if response.status_code == 304 and entry is not None:
+            await response.aclose()
+            self._cache.refresh(key, request, entry)
+            return entry.to_response()
+        if response.status_code == 200:
+            await response.aread()
+            self._cache.store(key, request, response)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class AsyncCoalescingTransport(AsyncBaseTransport):
+    """Sends concurrent identical PostgREST reads as a single request.
+
+    A GET issued while an identical one is in flight waits for that
+    response, rather than being sent. Identical means the same URL,
+    representation and credentials. Each caller gets its own copy of the
+    response. Writes, and CSV exports that are meant to be streamed, are
+    always sent.
+    """
+
+    def __init__(self, transport: AsyncBaseTransport):
+        self._transport = transport
+        self._flights: Dict[str, asyncio.Future] = {}
+
+    async def handle_async_request(self, request: Request) -> Response:
+        if request.method != "GET" or request.headers.get("Accept") == "text/csv":
+            return await self._transport.handle_async_request(request)
+        key = request_identity(request)
+        flight = self._flights.get(key)
+        if flight is not None:
+            return await self._follow(flight, request)
+        flight = self._flights[key] = asyncio.get_running_loop().create_future()
+        try:
+            response = await self._transport.handle_async_request(request)
+            await response.aread()
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except Exception as exc:
+            flight.set_exception(exc)
+            # retrieved, so that no warning is logged when nobody waited
+            flight.exception()
+            raise
+        else:
+            flight.set_result(response)
+        finally:
+            del self._flights[key]
+        return response
+
+    async def _follow(self, flight: asyncio.Future, request: Request) -> Response:
+        try:
+            response = await asyncio.shield(flight)
+        except asyncio.CancelledError:
+            if not flight.cancelled():
+                raise
+            # the caller that sent the request was cancelled: send it again
+            return await self.handle_async_request(request)
+        return copy_response(response)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class AsyncRetryTransport(AsyncBaseTransport):
+    """Applies a :class:`RetryPolicy` to every request it sends.
+
+    Each host gets its own circuit breaker, so that an outage of one service
+    does not stop the requests to another.
+    """
+
+    def __init__(self, transport: AsyncBaseTransport, policy: RetryPolicy):
+        self._transport = transport
+        self._policy = policy
+        self._breakers: Dict[str, Optional[CircuitBreaker]] = {}
+
+    async def handle_async_request(self, request: Request) -> Response:
+        policy = self._policy
+        breaker = self._breaker(request)
+        can_retry = policy.can_retry(request)
+        attempt = 0
+        while True:
+            if breaker is not None and not breaker.allow():
+                raise CircuitOpenError(
+                    f"Circuit open for {request.url.host}", request=request
+                )
+            try:
+                response = await self._send(request)
+            except (TimeoutException, NetworkError) as exc:
+                if breaker is not None:
+                    breaker.record(False)
+                retryable = can_retry or isinstance(exc, UNSENT_ERRORS)
+                if not retryable or attempt >= policy.retries:
+                    raise
+                delay = policy.delay(attempt)
+            else:
+                failed = response.status_code in policy.retry_statuses
+                if breaker is not None:
+                    breaker.record(not (failed and response.status_code >= 500))
+                if not failed or not can_retry or attempt >= policy.retries:
+                    return response
+                delay = policy.delay(attempt, response)
+                await response.aclose()
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def _send(self, request: Request) -> Response:
+        if self._policy.hedge_after is None or request.method != "GET":
+            return await self._transport.handle_async_request(request)
+        first = asyncio.ensure_future(self._transport.handle_async_request(request))
+        done, _ = await asyncio.wait({first}, timeout=self._policy.hedge_after)
+        if done:
+            return first.result()
+        second = asyncio.ensure_future(self._transport.handle_async_request(request))
+        pending = {first, second}
+        while True:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            responses = [task.result() for task in done if not task.exception()]
+            if responses or not pending:
+                break
+        for task in pending:
+            task.cancel()
+        if not responses:
+            # both attempts failed: raise the error of the first one
+            return first.result()
+        for response in responses[1:]:
+            await response.aclose()
+        return responses[0]
+
+    def _breaker(self, request: Request) -> Optional[CircuitBreaker]:
+        host = request.url.netloc.decode("ascii")
+        if host not in self._breakers:
+            self._breakers[host] = self._policy.circuit_breaker()
+        return self._breakers[host]
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class AsyncCodecTransport(AsyncBaseTransport):
+    """Hands out responses whose `json()` is decoded by a :class:`JSONCodec`."""
+
+    def __init__(self, transport: AsyncBaseTransport, codec: JSONCodec):
+        self._transport = transport
+        self._codec = codec
+
+    async def handle_async_request(self, request: Request) -> Response:
+        response = await self._transport.handle_async_request(request)
+        return codec_response(response, self._codec)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class AsyncCodecClient(AsyncClient):
+    """HTTP session of a sub-client, handling JSON with the client's codec.
+
+    Request bodies given as `json=` are encoded, and responses decoded, by
+    `codec`; without one, httpx uses the standard library as usual.
+    """
+
+    def __init__(
+        self,
+        *,
+        transport: Optional[AsyncBaseTransport] = None,
+        codec: Optional[JSONCodec] = None,
+        **kwargs: Any,
+    ):
+        if codec is not None and transport is not None:
+            transport = AsyncCodecTransport(transport, codec)
+        super().__init__(transport=transport, **kwargs)
+        self.codec = codec
+
+    def build_request(self, method: str, url: Any, **kwargs: Any) -> Request:
+        body = kwargs.get("json")
+        if self.codec is not None and body is not None:
+            headers = Headers(kwargs.get("headers"))
+            headers.setdefault("Content-Type", "application/json")
+            kwargs.update(json=None, content=self.codec.dumps(body), headers=headers)
+        return super().build_request(method, url, **kwargs)
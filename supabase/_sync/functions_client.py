@@ -0,0 +1,175 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from httpx import USE_CLIENT_DEFAULT, BaseTransport, Request, Response, Timeout
+from supafunc import SyncFunctionsClient
+from supafunc.errors import FunctionsHttpError, FunctionsRelayError
+from supafunc.utils import __version__
+
+from ..lib.batch import BatchResult, request_timeout
+from ..lib.client_options import DEFAULT_FUNCTION_CLIENT_TIMEOUT
+from ..lib.json_codec import JSONCodec
+from .transport import SyncCodecClient
+
+Invocation = Tuple[str, Optional[Dict[str, Any]]]
+
+
+class SyncSupabaseFunctionsClient(SyncFunctionsClient):
+    """Edge functions client whose session can be bound to a shared transport.
+
+    Each function can be given its own timeout in `function_timeouts`;
+    the others use `timeout`. Responses can be streamed with
+    `invoke_stream`, and many invocations sent at once with `invoke_many`.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        *,
+        transport: Optional[BaseTransport] = None,
+        timeout: Union[int, float, Timeout] = DEFAULT_FUNCTION_CLIENT_TIMEOUT,
+        function_timeouts: Optional[Dict[str, float]] = None,
+        json_codec: Optional[JSONCodec] = None,
+    ):
+        """Instantiate SupabaseFunctionsClient instance."""
+        # Mirrors AsyncFunctionsClient.__init__, which builds its session inline
+        # and offers no hook to hand it a transport.
+        self.url = url
+        self.headers = {
+            "User-Agent": f"supabase-py/functions-py v{__version__}",
+            **headers,
+        }
+        self._client = SyncCodecClient(
+            base_url=self.url,
+            headers=self.headers,
+            transport=transport,
+            timeout=timeout,
+            codec=json_codec,
+        )
+        self.function_timeouts = dict(function_timeouts or {})
+
+    def invoke(
+        self, function_name: str, invoke_options: Optional[Dict] = None
+    ) -> Union[Dict, bytes]:
+        """Invokes a function
+
+        Parameters
+        ----------
+        function_name : the name of the function to invoke
+        invoke_options : object with the following properties
+            `headers`: object representing the headers to send with the request
+            `body`: the body of the request
+            `responseType`: how the response should be parsed. The default is `json`
+        """
+        # Unlike AsyncFunctionsClient.invoke, the headers of one invocation are
+        # not added to the client's, so that concurrent invocations stay apart.
+        response = self._client.send(self._build_request(function_name, invoke_options))
+        self._raise_for_error(response)
+        if (invoke_options or {}).get("responseType") == "json":
+            return response.json()
+        return response.content
+
+    def invoke_stream(
+        self,
+        function_name: str,
+        invoke_options: Optional[Dict] = None,
+        *,
+        lines: bool = False,
+    ) -> Iterator[Union[bytes, str]]:
+        """Invoke a function and yield its response as it arrives.
+
+        Parameters
+        ----------
+        function_name : str
+            The name of the function to invoke.
+        invoke_options : dict, optional
+            The `headers` and `body` of the request, as for `invoke`.
+        lines : bool
+            Yield decoded lines, e.g. of server-sent events or NDJSON, rather
+            than chunks of bytes.
+
+        The connection is released once the response has been read. Close
+        the iterator with `close()` to stop reading it earlier.
+        """
+        response = self._client.send(
+            self._build_request(function_name, invoke_options), stream=True
+        )
+        try:
+            if response.is_error or response.headers.get("x-relay-header") == "true":
+                response.read()
+                self._raise_for_error(response)
+            chunks = response.iter_lines() if lines else response.iter_bytes()
+            for chunk in chunks:
+                yield chunk
+        finally:
+            response.close()
+
+    def invoke_many(
+        self, invocations: Iterable[Invocation], concurrency: int = 16
+    ) -> List[BatchResult]:
+        """Invoke many functions concurrently over the pooled connections.
+
+        Parameters
+        ----------
+        invocations : iterable of (function_name, invoke_options) pairs
+            The invocations, with options as for `invoke`.
+        concurrency : int
+            Maximum number of invocations in flight at once.
+
+        Returns
+        -------
+        list of BatchResult
+            One result per invocation, in the order they were given. A
+            failed invocation holds its exception in `error` instead of
+            raising.
+        """
+
+        def run(invocation: Invocation) -> BatchResult:
+            try:
+                return BatchResult(response=self.invoke(*invocation))
+            except Exception as exc:
+                return BatchResult(error=exc)
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return list(executor.map(run, invocations))
+
+    def _build_request(
+        self, function_name: str, invoke_options: Optional[Dict]
+    ) -> Request:
+        options = invoke_options or {}
+        headers = {**self.headers, **options.get("headers", {})}
+        body = options.get("body")
+        content: Optional[bytes] = None
+        if isinstance(body, bytes):
+            content, body = body, None
+        elif isinstance(body, str):
+            headers["Content-Type"] = "text/plain"
+        elif isinstance(body, dict):
+            headers["Content-Type"] = "application/json"
+        timeout: Any = request_timeout.get()
+        if timeout is None:
+            timeout = self.function_timeouts.get(function_name, USE_CLIENT_DEFAULT)
+        return self._client.build_request(
+            "POST",
+            f"{self.url}/{function_name}",
+            headers=headers,
+            content=content,
+            json=body,
+            timeout=timeout,
+        )
+
+    @staticmethod
+    def _raise_for_error(response: Response) -> None:
+        if response.is_error:
+            try:
+                error = response.json().get("error")
+            except (ValueError, AttributeError):
+                error = None
+            raise FunctionsHttpError(
+                error
+                or "An error occurred while requesting your edge function at "
+                f"{response.request.url!r}."
+            )
+        if response.headers.get("x-relay-header") == "true":
+            raise FunctionsRelayError(response.json().get("error"))
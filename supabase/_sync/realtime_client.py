@@ -0,0 +1,37 @@
+from typing import Any, Dict, Optional
+
+REALTIME_NEEDS_ASYNCIO = (
+    "realtime channels run on asyncio: use supabase._async.client.AsyncClient"
+)
+
+
+class SyncRealtimeChannel:
+    """Stand-in for `AsyncRealtimeChannel`; see `SyncRealtimeClient`."""
+
+
+class SyncRealtimeClient:
+    """Stand-in for the realtime client of the sync `Client`.
+
+    The realtime socket is kept alive by asyncio tasks, so channels are only
+    available from `AsyncClient`. This stand-in lets the sync client, which
+    is generated from the async one, be created, authenticated and closed
+    like it; opening a channel raises `NotImplementedError`.
+    """
+
+    def __init__(
+        self, url: str, api_key: str, *, access_token: Optional[str] = None, **_: Any
+    ):
+        self.url = url
+        self.access_token = access_token or api_key
+        self.channels: Dict[str, SyncRealtimeChannel] = {}
+
+    def channel(
+        self, name: str, config: Optional[Dict[str, Any]] = None
+    ) -> SyncRealtimeChannel:
+        raise NotImplementedError(REALTIME_NEEDS_ASYNCIO)
+
+    def close(self) -> None:
+        pass
+
+    def set_auth(self, access_token: str) -> None:
+        self.access_token = access_token
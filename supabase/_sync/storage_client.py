@@ -0,0 +1,392 @@
+import mimetypes
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, MutableMapping, Optional
+
+from httpx import BaseTransport
+from storage3 import SyncStorageClient
+from storage3.constants import DEFAULT_TIMEOUT
+
+from ..lib.json_codec import JSONCodec
+from ..lib.signed_url_cache import SignedURLCache
+from ..lib.transfer import ObjectResult, TransferReport, same_content
+from .storage_transfer import DEFAULT_CHUNK_SIZE, SyncTransferManager
+from .transport import SyncCodecClient
+
+LIST_PAGE_SIZE = 1000
+REMOVE_BATCH_SIZE = 1000
+
+
+class SyncSupabaseStorageClient(SyncStorageClient):
+    """Storage client whose session can be bound to a shared transport."""
+
+    def __init__(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        timeout: int = DEFAULT_TIMEOUT,
+        *,
+        transport: Optional[BaseTransport] = None,
+        signed_url_cache: Optional[SignedURLCache] = None,
+        json_codec: Optional[JSONCodec] = None,
+    ):
+        """Instantiate SupabaseStorageClient instance."""
+        self._transport = transport
+        self._json_codec = json_codec
+        self.signed_url_cache = (
+            SignedURLCache() if signed_url_cache is None else signed_url_cache
+        )
+        SyncStorageClient.__init__(self, url, headers, timeout)
+
+    def _create_session(
+        self, base_url: str, headers: Dict[str, str], timeout: int
+    ) -> SyncCodecClient:
+        return SyncCodecClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            transport=self._transport,
+            codec=self._json_codec,
+        )
+
+    def set_auth(self, token: str) -> None:
+        """Updates the authorization header
+
+        Parameters
+        ----------
+        token : str
+            the new jwt token sent in the authorization header
+        """
+        self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def get_signed_url(
+        self,
+        bucket: str,
+        path: str,
+        expires_in: int,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """Return a signed URL of an object, reusing a cached one if possible.
+
+        Parameters
+        ----------
+        bucket : str
+            The bucket of the object.
+        path : str
+            The path of the object in the bucket.
+        expires_in : int
+            Seconds the URL is valid for.
+        options : dict, optional
+            The `download` and `transform` options of `create_signed_url`.
+        """
+        key = self.signed_url_cache.key(
+            self.session.headers.get("Authorization", ""),
+            bucket,
+            path,
+            expires_in,
+            options,
+        )
+        url = self.signed_url_cache.get(key)
+        if url is None:
+            data = self.from_(bucket).create_signed_url(path, expires_in, options or {})
+            url = data["signedURL"]
+            self.signed_url_cache.set(key, url)
+        return url
+
+    def get_signed_urls(
+        self,
+        bucket: str,
+        paths: Iterable[str],
+        expires_in: int,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Optional[str]]:
+        """Return signed URLs of many objects, signing the uncached ones at once.
+
+        The URLs missing from the cache are signed with a single request to
+        the multi-path signing endpoint, which only supports the `download`
+        option.
+
+        Returns
+        -------
+        dict of str to str
+            The URL of each path, or None when the server could not sign it
+            (for instance because the object does not exist).
+        """
+        authorization = self.session.headers.get("Authorization", "")
+        keys = {
+            path: self.signed_url_cache.key(
+                authorization, bucket, path, expires_in, options
+            )
+            for path in paths
+        }
+        urls = {path: self.signed_url_cache.get(key) for path, key in keys.items()}
+        misses = [path for path, url in urls.items() if url is None]
+        if misses:
+            # storage3's create_signed_urls fails on the null URL of a path
+            # the server could not sign, so the request is sent from here
+            body: Dict[str, Any] = {"paths": misses, "expiresIn": str(expires_in)}
+            if options and options.get("download"):
+                body["download"] = options["download"]
+            response = self.from_(bucket)._request(
+                "POST", f"/object/sign/{bucket}", json=body
+            )
+            for item in response.json():
+                url = item.get("signedURL")
+                if item.get("error") or not url or item.get("path") not in keys:
+                    continue
+                url = f"{self.session.base_url}{url.lstrip('/')}"
+                urls[item["path"]] = url
+                self.signed_url_cache.set(keys[item["path"]], url)
+        return urls
+
+    def transfer_manager(
+        self,
+        *,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        workers: int = 4,
+        retries: int = 5,
+        resume_store: Optional[MutableMapping[str, str]] = None,
+    ) -> SyncTransferManager:
+        """Return a manager for resumable uploads and parallel downloads.
+
+        Parameters
+        ----------
+        chunk_size : int
+            Bytes sent per upload request, and fetched by the first download
+            request.
+        workers : int
+            Parts of a file transferred in parallel.
+        retries : int
+            Attempts at a chunk or a range before giving up.
+        resume_store : mapping, optional
+            Where the upload URLs of unfinished uploads are kept, so that a
+            later call can resume them. Defaults to an in-memory dict.
+        """
+        return SyncTransferManager(
+            self.session,
+            chunk_size=chunk_size,
+            workers=workers,
+            retries=retries,
+            resume_store=resume_store,
+        )
+
+    def sync_dir(
+        self,
+        bucket: str,
+        local_path: str,
+        *,
+        prefix: str = "",
+        concurrency: int = 64,
+        delete: bool = False,
+    ) -> TransferReport:
+        """Upload the files of a local directory that differ from the bucket.
+
+        Parameters
+        ----------
+        bucket : str
+            The bucket to upload to.
+        local_path : str
+            The directory to upload, recursively.
+        prefix : str
+            The folder of the bucket the directory is mirrored to.
+        concurrency : int
+            Maximum number of uploads in flight at once.
+        delete : bool
+            Also remove the objects under `prefix` that have no local file.
+
+        Returns
+        -------
+        TransferReport
+            One result per local file (`uploaded` or `skipped` when its
+            content is already stored), and per removed object.
+        """
+        started = time.perf_counter()
+        report = TransferReport()
+        remote = self._list_objects(bucket, prefix)
+        local = _local_files(local_path, prefix)
+        files = self.from_(bucket)
+
+        def upload(path: str, file: str) -> None:
+            metadata = remote.get(path)
+            if metadata is not None and same_content(file, metadata):
+                report.results.append(ObjectResult(path, "skipped"))
+                return
+            try:
+                data = _read_file(file)
+                content_type = mimetypes.guess_type(file)[0]
+                files.upload(
+                    path,
+                    data,
+                    {
+                        "content-type": content_type or "application/octet-stream",
+                        "x-upsert": "true",
+                    },
+                )
+            except Exception as exc:
+                report.results.append(ObjectResult(path, "uploaded", exc))
+            else:
+                report.results.append(ObjectResult(path, "uploaded", bytes=len(data)))
+
+        _run_limited(
+            [
+                lambda path=path, file=file: upload(path, file)
+                for path, file in local.items()
+            ],
+            concurrency,
+        )
+        if delete:
+            stale = sorted(set(remote) - set(local))
+            self._remove(bucket, stale, report, concurrency)
+        report.elapsed = time.perf_counter() - started
+        return report
+
+    def download_many(
+        self,
+        bucket: str,
+        destination: str,
+        *,
+        prefix: str = "",
+        paths: Optional[Iterable[str]] = None,
+        concurrency: int = 64,
+    ) -> TransferReport:
+        """Download the objects of a bucket folder that differ from local files.
+
+        Parameters
+        ----------
+        bucket : str
+            The bucket to download from.
+        destination : str
+            The local directory the objects are written to, keeping their
+            path relative to `prefix`.
+        prefix : str
+            The folder of the bucket to download.
+        paths : iterable of str, optional
+            Only download these objects of the folder.
+        concurrency : int
+            Maximum number of downloads in flight at once.
+        """
+        started = time.perf_counter()
+        report = TransferReport()
+        remote = self._list_objects(bucket, prefix)
+        wanted = list(remote) if paths is None else list(paths)
+        files = self.from_(bucket)
+
+        def download(path: str) -> None:
+            file = os.path.join(destination, *_relative(path, prefix).split("/"))
+            metadata = remote.get(path)
+            if metadata is not None and same_content(file, metadata, False):
+                report.results.append(ObjectResult(path, "skipped"))
+                return
+            try:
+                data = files.download(path)
+                _write_file(file, data)
+            except Exception as exc:
+                report.results.append(ObjectResult(path, "downloaded", exc))
+            else:
+                report.results.append(ObjectResult(path, "downloaded", bytes=len(data)))
+
+        _run_limited([lambda path=path: download(path) for path in wanted], concurrency)
+        report.elapsed = time.perf_counter() - started
+        return report
+
+    def remove_many(
+        self, bucket: str, paths: Iterable[str], *, concurrency: int = 8
+    ) -> TransferReport:
+        """Remove objects, up to a thousand per request."""
+        started = time.perf_counter()
+        report = TransferReport()
+        self._remove(bucket, list(paths), report, concurrency)
+        report.elapsed = time.perf_counter() - started
+        return report
+
+    def _remove(
+        self,
+        bucket: str,
+        paths: List[str],
+        report: TransferReport,
+        concurrency: int,
+    ) -> None:
+        files = self.from_(bucket)
+
+        def remove(batch: List[str]) -> None:
+            try:
+                files.remove(batch)
+            except Exception as exc:
+                report.results.extend(
+                    ObjectResult(path, "deleted", exc) for path in batch
+                )
+            else:
+                report.results.extend(ObjectResult(path, "deleted") for path in batch)
+
+        _run_limited(
+            [
+                lambda batch=paths[i : i + REMOVE_BATCH_SIZE]: remove(batch)
+                for i in range(0, len(paths), REMOVE_BATCH_SIZE)
+            ],
+            concurrency,
+        )
+
+    def _list_objects(self, bucket: str, prefix: str) -> Dict[str, Any]:
+        """Return the metadata of every object under `prefix`, by path."""
+        files = self.from_(bucket)
+        objects: Dict[str, Any] = {}
+        folders = [prefix.strip("/")]
+        while folders:
+            folder = folders.pop()
+            offset = 0
+            while True:
+                entries = files.list(
+                    folder, {"limit": LIST_PAGE_SIZE, "offset": offset}
+                )
+                for entry in entries:
+                    path = f"{folder}/{entry['name']}" if folder else entry["name"]
+                    # folders are listed without an id
+                    if entry.get("id") is None:
+                        folders.append(path)
+                    else:
+                        metadata = dict(entry.get("metadata") or {})
+                        # the listing's own timestamp, when the metadata has none
+                        metadata.setdefault("lastModified", entry.get("updated_at"))
+                        objects[path] = metadata
+                if len(entries) < LIST_PAGE_SIZE:
+                    break
+                offset += LIST_PAGE_SIZE
+        return objects
+
+
+def _run_limited(calls: List[Callable[[], None]], concurrency: int) -> None:
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(call) for call in calls]:
+            future.result()
+
+
+def _read_file(file: str) -> bytes:
+    with open(file, "rb") as f:
+        return f.read()
+
+
+def _write_file(file: str, data: bytes) -> None:
+    """Write `file` through a temporary file, so it is never left truncated."""
+    os.makedirs(os.path.dirname(file), exist_ok=True)
+    temporary = f"{file}.part"
+    with open(temporary, "wb") as f:
+        f.write(data)
+    os.replace(temporary, file)
+
+
+def _local_files(local_path: str, prefix: str) -> Dict[str, str]:
+    """Return the files under `local_path` by the path they are stored at."""
+    prefix = prefix.strip("/")
+    files = {}
+    for root, _, names in os.walk(local_path):
+        for name in names:
+            file = os.path.join(root, name)
+            relative = os.path.relpath(file, local_path).replace(os.sep, "/")
+            files[f"{prefix}/{relative}" if prefix else relative] = file
+    return files
+
+
+def _relative(path: str, prefix: str) -> str:
+    prefix = prefix.strip("/")
+    return path[len(prefix) + 1 :] if prefix else path
@@ -0,0 +1,352 @@
+from __future__ import annotations
+
+import base64
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, MutableMapping, Optional, Tuple
+
+from httpx import NetworkError, Response, TimeoutException
+from storage3.utils import StorageException, SyncClient
+
+from ..lib.retry import RETRYABLE_STATUS_CODES, backoff_delay
+from ..lib.transfer import TransferProgress, UploadData, UploadSource, split
+
+TUS_VERSION = "1.0.0"
+# the chunk size the Supabase resumable upload endpoint expects
+DEFAULT_CHUNK_SIZE = 6 * 1024 * 1024
+
+ProgressCallback = Callable[[TransferProgress], None]
+
+
+class _RetryableError(StorageException):
+    """A failure worth retrying: the connection broke or the server is busy."""
+
+
+class SyncTransferManager:
+    """Large file transfers over the storage client's session.
+
+    Uploads use the TUS resumable upload protocol: the file is sent in
+    `chunk_size` pieces and an interrupted upload continues from the last
+    piece the server acknowledged, within the call (up to `retries` times)
+    and across calls through `resume_store`. When the server supports the
+    TUS `concatenation` extension, the file is split between `workers`
+    partial uploads sent in parallel.
+
+    Downloads are split in `workers` byte ranges fetched in parallel and
+    streamed straight into the destination file.
+    """
+
+    def __init__(
+        self,
+        session: SyncClient,
+        *,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        workers: int = 4,
+        retries: int = 5,
+        resume_store: Optional[MutableMapping[str, str]] = None,
+    ):
+        self.session = session
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.retries = retries
+        self.resume_store: MutableMapping[str, str] = (
+            {} if resume_store is None else resume_store
+        )
+        self._extensions: Optional[List[str]] = None
+
+    def upload(
+        self,
+        bucket: str,
+        path: str,
+        data: UploadData,
+        *,
+        content_type: str = "application/octet-stream",
+        cache_control: str = "3600",
+        upsert: bool = False,
+        progress: Optional[ProgressCallback] = None,
+    ) -> TransferProgress:
+        """Upload a file with a resumable upload.
+
+        Parameters
+        ----------
+        bucket : str
+            The bucket to upload to.
+        path : str
+            The path of the object in the bucket.
+        data : path, bytes or binary file object
+            What to upload. Paths and regular files are memory-mapped rather
+            than read; other file objects must be seekable.
+        content_type : str
+            The content type stored with the object.
+        cache_control : str
+            The `max-age` the object is served with, in seconds.
+        upsert : bool
+            Overwrite the object if it already exists.
+        progress : callable, optional
+            Called with the `TransferProgress` each time a chunk is stored.
+        """
+        source = UploadSource(data)
+        try:
+            state = TransferProgress(path, source.size)
+            metadata = {
+                "bucketName": bucket,
+                "objectName": path,
+                "contentType": content_type,
+                "cacheControl": cache_control,
+            }
+            headers = {
+                "Upload-Metadata": ",".join(
+                    f"{key} {base64.b64encode(value.encode()).decode()}"
+                    for key, value in metadata.items()
+                ),
+                "x-upsert": "true" if upsert else "false",
+            }
+            ranges = split(source.size, self.workers, self.chunk_size)
+            if len(ranges) > 1 and "concatenation" not in self._server_extensions():
+                ranges = [(0, source.size)]
+            fingerprint = (
+                f"{bucket}/{path}:{source.fingerprint}:{len(ranges)}"
+                if source.fingerprint
+                else None
+            )
+            parts = self._parts(fingerprint, ranges, headers)
+            urls = [url for url, _ in parts]
+            self._gather(
+                [
+                    lambda url=url, offset=offset, start=start, end=end: (
+                        self._upload_part(
+                            url, offset, source, start, end, state, progress
+                        )
+                    )
+                    for (url, offset), (start, end) in zip(parts, ranges)
+                ]
+            )
+            if len(urls) > 1:
+                self._request(
+                    "POST",
+                    "/upload/resumable",
+                    {**headers, "Upload-Concat": "final;" + " ".join(urls)},
+                )
+            if fingerprint is not None:
+                self.resume_store.pop(fingerprint, None)
+            return state.finish()
+        finally:
+            source.close()
+
+    def download(
+        self,
+        bucket: str,
+        path: str,
+        destination: str,
+        *,
+        progress: Optional[ProgressCallback] = None,
+    ) -> TransferProgress:
+        """Download an object into a file, fetching byte ranges in parallel.
+
+        The object is written to `destination + ".part"`, which replaces
+        `destination` once every range has been received.
+        """
+        url = f"/object/{bucket}/{path}"
+        partial = f"{destination}.part"
+        with self.session.stream(
+            "GET", url, headers={"Range": f"bytes=0-{self.chunk_size - 1}"}
+        ) as response:
+            if response.is_error:
+                response.read()
+                self._raise_for_status(response)
+            total = _content_length(response)
+            state = TransferProgress(path, total)
+            with open(partial, "wb") as file:
+                file.truncate(total)
+                for block in response.iter_bytes():
+                    file.write(block)
+                    state.add(len(block), progress)
+        received = state.transferred
+        if received < total:
+            ranges = [
+                (received + start, received + end)
+                for start, end in split(total - received, self.workers, self.chunk_size)
+            ]
+            self._gather(
+                [
+                    lambda start=start, end=end: self._download_range(
+                        url, partial, start, end, state, progress
+                    )
+                    for start, end in ranges
+                ]
+            )
+        os.replace(partial, destination)
+        return state.finish()
+
+    def _parts(
+        self,
+        fingerprint: Optional[str],
+        ranges: List[Tuple[int, int]],
+        headers: Dict[str, str],
+    ) -> List[Tuple[str, int]]:
+        """Return the URL of the upload of each range and the bytes it holds."""
+        if fingerprint is not None and fingerprint in self.resume_store:
+            try:
+                return [
+                    (url, self._offset(url))
+                    for url in self.resume_store[fingerprint].split()
+                ]
+            except StorageException:
+                # expired or removed uploads: start over
+                pass
+        parts = []
+        for start, end in ranges:
+            part_headers = {**headers, "Upload-Length": str(end - start)}
+            if len(ranges) > 1:
+                part_headers["Upload-Concat"] = "partial"
+            response = self._request("POST", "/upload/resumable", part_headers)
+            parts.append((response.headers["Location"], 0))
+        if fingerprint is not None:
+            self.resume_store[fingerprint] = " ".join(url for url, _ in parts)
+        return parts
+
+    def _upload_part(
+        self,
+        url: str,
+        offset: int,
+        source: UploadSource,
+        start: int,
+        end: int,
+        state: TransferProgress,
+        progress: Optional[ProgressCallback],
+    ) -> None:
+        if offset:
+            state.add(offset, progress)
+        attempt = 0
+        resync = False
+        while True:
+            try:
+                if resync:
+                    # the failed chunk may have been partly stored
+                    confirmed = self._offset(url)
+                    state.add(confirmed - offset, progress)
+                    offset = confirmed
+                    resync = False
+                if start + offset >= end:
+                    return
+                chunk_end = min(start + offset + self.chunk_size, end)
+                headers = {
+                    "Upload-Offset": str(offset),
+                    "Content-Type": "application/offset+octet-stream",
+                    "Content-Length": str(chunk_end - start - offset),
+                }
+                response = self._request(
+                    "PATCH",
+                    url,
+                    headers,
+                    content=self._stream(source, start + offset, chunk_end),
+                )
+            except _RetryableError:
+                if attempt >= self.retries:
+                    raise
+                time.sleep(backoff_delay(attempt))
+                attempt += 1
+                resync = True
+                continue
+            attempt = 0
+            confirmed = int(response.headers["Upload-Offset"])
+            state.add(confirmed - offset, progress)
+            offset = confirmed
+
+    def _download_range(
+        self,
+        url: str,
+        partial: str,
+        start: int,
+        end: int,
+        state: TransferProgress,
+        progress: Optional[ProgressCallback],
+    ) -> None:
+        attempt = 0
+        with open(partial, "r+b") as file:
+            file.seek(start)
+            while start < end:
+                headers = {"Range": f"bytes={start}-{end - 1}"}
+                try:
+                    with self.session.stream("GET", url, headers=headers) as response:
+                        if response.status_code != 206:
+                            response.read()
+                            self._raise_for_status(response)
+                            raise StorageException(
+                                {
+                                    "message": "The server ignored the Range header",
+                                    "statusCode": response.status_code,
+                                }
+                            )
+                        for block in response.iter_bytes():
+                            block = block[: end - start]
+                            file.write(block)
+                            start += len(block)
+                            state.add(len(block), progress)
+                except (_RetryableError, TimeoutException, NetworkError):
+                    if attempt >= self.retries:
+                        raise
+                    time.sleep(backoff_delay(attempt))
+                    attempt += 1
+
+    def _offset(self, url: str) -> int:
+        """Ask the server how many bytes of an upload it has stored."""
+        response = self._request("HEAD", url, {})
+        return int(response.headers["Upload-Offset"])
+
+    def _server_extensions(self) -> List[str]:
+        if self._extensions is None:
+            response = self._request("OPTIONS", "/upload/resumable", {})
+            self._extensions = [
+                extension.strip()
+                for extension in response.headers.get("Tus-Extension", "").split(",")
+            ]
+        return self._extensions
+
+    def _request(
+        self, method: str, url: str, headers: Dict[str, str], **kwargs: Any
+    ) -> Response:
+        try:
+            response = self.session.request(
+                method,
+                url,
+                headers={"Tus-Resumable": TUS_VERSION, **headers},
+                **kwargs,
+            )
+        except (TimeoutException, NetworkError) as exc:
+            raise _RetryableError({"message": str(exc)}) from exc
+        self._raise_for_status(response)
+        return response
+
+    @staticmethod
+    def _raise_for_status(response: Response) -> None:
+        if not response.is_error:
+            return
+        try:
+            error = response.json()
+        except ValueError:
+            error = {"message": response.text}
+        error = {**error, "statusCode": response.status_code}
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            raise _RetryableError(error)
+        raise StorageException(error)
+
+    @staticmethod
+    def _stream(source: UploadSource, start: int, end: int):
+        for block in source.blocks(start, end):
+            yield block
+
+    @staticmethod
+    def _gather(calls: List[Callable[[], None]]) -> None:
+        with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+            for future in [executor.submit(call) for call in calls]:
+                future.result()
+
+
+def _content_length(response: Response) -> int:
+    match = re.match(r"bytes \d+-\d+/(\d+)", response.headers.get("Content-Range", ""))
+    if match:
+        return int(match.group(1))
+    return int(response.headers.get("Content-Length", 0))
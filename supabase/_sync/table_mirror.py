@@ -0,0 +1,16 @@
+from typing import Any
+
+from .realtime_client import REALTIME_NEEDS_ASYNCIO
+
+
+class SyncTableMirror:
+    """Stand-in for `AsyncTableMirror`, which is kept up to date by realtime.
+
+    See `SyncRealtimeClient`: creating one raises `NotImplementedError`.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        raise NotImplementedError(REALTIME_NEEDS_ASYNCIO)
+
+    def start(self) -> "SyncTableMirror":
+        return self
@@ -1,14 +1,47 @@
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
 from postgrest import APIError as PostgrestAPIError
 from postgrest import APIResponse as PostgrestAPIResponse
-from storage3.utils import StorageException
 
 from .__version__ import __version__
 from ._sync.auth_client import SyncSupabaseAuthClient as SupabaseAuthClient
 from ._sync.client import ClientOptions
 from ._sync.client import SyncClient as Client
-from ._sync.client import SyncStorageClient as SupabaseStorageClient
+from ._sync.client import SyncClientFactory as ClientFactory
 from ._sync.client import create_client
-from .lib.realtime_client import SupabaseRealtimeClient
+from .lib.response_cache import ResponseCache
+
+if TYPE_CHECKING:
+    from storage3 import SyncStorageClient as SupabaseStorageClient
+    from storage3.utils import StorageException
+
+    from .lib.realtime_client import SupabaseRealtimeClient
+
+# Re-exports from sub-SDKs that most programs never touch. They are imported
+# on first attribute access (PEP 562) to keep `import supabase` fast.
+_LAZY_IMPORTS = {
+    "StorageException": ("storage3.utils", "StorageException"),
+    "SupabaseStorageClient": ("storage3", "SyncStorageClient"),
+    "SupabaseRealtimeClient": (
+        "supabase.lib.realtime_client",
+        "SupabaseRealtimeClient",
+    ),
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module, attribute = _LAZY_IMPORTS[name]
+    value = getattr(import_module(module), attribute)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted([*globals(), *_LAZY_IMPORTS])
+
 
 __all__ = [
     "PostgrestAPIError",
@@ -18,7 +51,9 @@ __all__ = [
     "__version__",
     "create_client",
     "Client",
+    "ClientFactory",
     "ClientOptions",
     "SupabaseStorageClient",
     "SupabaseRealtimeClient",
+    "ResponseCache",
 ]
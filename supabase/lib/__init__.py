@@ -1,4 +1,19 @@
-from supabase._async import auth_client
-from supabase.lib import realtime_client
+from importlib import import_module
+from types import ModuleType
 
 __all__ = ["auth_client", "realtime_client"]
+
+# The submodules pull in gotrue and realtime, so they are only imported when
+# first accessed (PEP 562).
+_LAZY_SUBMODULES = {
+    "auth_client": "supabase._async.auth_client",
+    "realtime_client": "supabase.lib.realtime_client",
+}
+
+
+def __getattr__(name: str) -> ModuleType:
+    if name not in _LAZY_SUBMODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = import_module(_LAZY_SUBMODULES[name])
+    globals()[name] = module
+    return module
@@ -0,0 +1,23 @@
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Optional
+
+request_timeout: ContextVar[Optional[float]] = ContextVar(
+    "request_timeout", default=None
+)
+"""Overrides the HTTP timeout of the requests sent from the current context."""
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one request executed as part of a batch."""
+
+    response: Optional[Any] = None
+    """The value returned by the request's `execute()`."""
+
+    error: Optional[Exception] = None
+    """The exception raised by the request, if it failed."""
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
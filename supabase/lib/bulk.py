@@ -0,0 +1,81 @@
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .json_codec import JSONCodec
+
+
+@dataclass
+class ChunkOutcome:
+    """What writing one chunk of a bulk write did."""
+
+    rows: int = 0
+    bytes: int = 0
+    retries: int = 0
+    error: Optional[Exception] = None
+
+
+@dataclass
+class BulkResult:
+    """Summary of a bulk write."""
+
+    rows: int = 0
+    """Number of rows written."""
+
+    bytes: int = 0
+    """Number of request body bytes sent for the written rows."""
+
+    chunks: int = 0
+    """Number of chunks written."""
+
+    retries: int = 0
+    """Number of times a chunk was sent again after a transient failure."""
+
+    errors: List[Tuple[int, Exception]] = field(default_factory=list)
+    """Index and exception of every chunk that could not be written."""
+
+    elapsed: float = 0.0
+    """Wall-clock seconds the whole write took."""
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes / self.elapsed if self.elapsed else 0.0
+
+    def add(self, index: int, outcome: ChunkOutcome) -> None:
+        """Account for the chunk at `index`."""
+        if outcome.error is not None:
+            self.errors.append((index, outcome.error))
+            return
+        self.rows += outcome.rows
+        self.bytes += outcome.bytes
+        self.retries += outcome.retries
+        self.chunks += 1
+
+
+def iter_chunks(
+    rows: Iterable[Dict[str, Any]], chunk_size: int
+) -> Iterator[List[Dict[str, Any]]]:
+    """Lazily split `rows` into lists of at most `chunk_size` rows."""
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def encode_chunk(
+    chunk: List[Dict[str, Any]], codec: Optional[JSONCodec] = None
+) -> bytes:
+    if codec is not None:
+        return codec.dumps(chunk)
+    return json.dumps(chunk, separators=(",", ":")).encode()
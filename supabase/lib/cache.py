@@ -0,0 +1,91 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Callable, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """Bounded mapping that evicts the least recently used entry first.
+
+    Entries can optionally expire `ttl` seconds after they were stored. The
+    cache is safe to share between threads.
+
+    `on_evict` is called with the key and value of every entry the cache
+    drops on its own, because it is full or the entry expired, so that the
+    value can be released. It is not called for `pop` and `clear`.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = monotonic,
+        on_evict: Optional[Callable[[K, V], None]] = None,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._clock = clock
+        self._entries: "OrderedDict[K, Tuple[Optional[float], V]]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        """Return the live value stored for `key` and mark it as recently used."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            expired = expires_at is not None and expires_at <= self._clock()
+            if expired:
+                del self._entries[key]
+            else:
+                self._entries.move_to_end(key)
+        if expired:
+            self._evicted([(key, value)])
+            return default
+        return value
+
+    def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        """Store `value`, evicting the least recently used entry when full."""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = None if ttl is None else self._clock() + ttl
+        evicted: List[Tuple[K, V]] = []
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                old_key, (_, old_value) = self._entries.popitem(last=False)
+                evicted.append((old_key, old_value))
+        self._evicted(evicted)
+
+    def pop(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def values(self) -> List[V]:
+        """Return the stored values, including those that have expired."""
+        with self._lock:
+            return [value for _, value in self._entries.values()]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: object) -> bool:
+        return self.get(key) is not None  # type: ignore[arg-type]
+
+    def _evicted(self, entries: List[Tuple[K, V]]) -> None:
+        # called outside the lock, so that the callback can use the cache
+        if self.on_evict is not None:
+            for key, value in entries:
+                self.on_evict(key, value)
@@ -2,13 +2,26 @@ from dataclasses import dataclass, field
 from typing import Any, Dict, Optional, Union
 
 from gotrue import AuthFlowType, SyncMemoryStorage, SyncSupportedStorage
-from httpx import Timeout
+from httpx import AsyncBaseTransport, BaseTransport, Limits, Timeout
 from postgrest.constants import DEFAULT_POSTGREST_CLIENT_TIMEOUT
-from storage3.constants import DEFAULT_TIMEOUT as DEFAULT_STORAGE_CLIENT_TIMEOUT
 
 from supabase import __version__
 
+from .instrumentation import Instrumentation
+from .json_codec import JSONCodec
+from .response_cache import ResponseCache
+from .retry import RetryPolicy
+from .signed_url_cache import SignedURLCache
+
 DEFAULT_HEADERS = {"X-Client-Info": f"supabase-py/{__version__}"}
+# Same value as storage3.constants.DEFAULT_TIMEOUT, which is not imported so
+# that storage3 is only loaded once the storage client is used.
+DEFAULT_STORAGE_CLIENT_TIMEOUT = 20
+# The httpx default, which supafunc relies on.
+DEFAULT_FUNCTION_CLIENT_TIMEOUT = 5
+DEFAULT_HTTP_LIMITS = Limits(
+    max_connections=100, max_keepalive_connections=20, keepalive_expiry=5.0
+)
 
 
 @dataclass
@@ -32,7 +45,7 @@ class ClientOptions:
     """A storage provider. Used to store the logged in session."""
 
     realtime: Optional[Dict[str, Any]] = None
-    """Options passed to the realtime-py instance"""
+    """Keyword arguments passed to the realtime client"""
 
     postgrest_client_timeout: Union[
         int, float, Timeout
@@ -42,9 +55,76 @@ class ClientOptions:
     storage_client_timeout: Union[int, float, Timeout] = DEFAULT_STORAGE_CLIENT_TIMEOUT
     """Timeout passed to the SyncStorageClient instance"""
 
+    function_client_timeout: Union[
+        int, float, Timeout
+    ] = DEFAULT_FUNCTION_CLIENT_TIMEOUT
+    """Timeout of edge function invocations."""
+
+    function_timeouts: Dict[str, float] = field(default_factory=dict)
+    """Timeouts, in seconds, of the edge functions that need their own."""
+
     flow_type: AuthFlowType = "implicit"
     """flow type to use for authentication"""
 
+    http_limits: Limits = field(default_factory=lambda: DEFAULT_HTTP_LIMITS)
+    """
+    Connection pool limits and keep-alive expiry of the HTTP transport shared
+    by the postgrest, storage, functions and auth clients.
+    """
+
+    http2: bool = False
+    """Whether the shared HTTP transport negotiates HTTP/2. Requires `h2`."""
+
+    http_transport: Optional[Union[BaseTransport, AsyncBaseTransport]] = None
+    """
+    A custom httpx transport to share between the sub-clients instead of the
+    default pool. It is left open when the client is closed.
+    """
+
+    response_cache: Optional[ResponseCache] = None
+    """Optional cache serving repeated PostgREST reads without a round trip."""
+
+    signed_url_cache: Optional[SignedURLCache] = None
+    """
+    Cache of the storage URLs signed by `get_signed_url(s)`. Each client gets
+    its own default one when not set.
+    """
+
+    retry_policy: Optional[RetryPolicy] = None
+    """
+    Retries, hedging and circuit breaking applied to the requests of every
+    sub-client. Requests are sent once when not set.
+    """
+
+    instrumentation: Optional[Instrumentation] = None
+    """
+    Hooks, latency histograms and tracing of the requests of every sub-client.
+    Requests are not measured when not set.
+    """
+
+    refresh_lock_path: Optional[str] = None
+    """
+    Lock file taken around token refreshes. Set it to the same path in all
+    the processes sharing a persisted session through `storage`, so that
+    only one of them refreshes it and the others reuse the result.
+    """
+
+    json_codec: Union[str, JSONCodec] = "json"
+    """
+    How the postgrest, storage, functions and auth clients encode request
+    bodies and decode responses: `json` for the standard library, `orjson`
+    or `msgspec` for those libraries, `auto` for the first one installed,
+    or a `JSONCodec`. A library that is not installed falls back to the
+    standard library.
+    """
+
+    coalesce_reads: bool = False
+    """
+    Send concurrent identical PostgREST GET requests, with the same URL,
+    headers and credentials, as a single request whose response they share.
+    Writes are never coalesced.
+    """
+
     def replace(
         self,
         schema: Optional[str] = None,
@@ -59,7 +139,21 @@ class ClientOptions:
         storage_client_timeout: Union[
             int, float, Timeout
         ] = DEFAULT_STORAGE_CLIENT_TIMEOUT,
+        function_client_timeout: Union[
+            int, float, Timeout
+        ] = DEFAULT_FUNCTION_CLIENT_TIMEOUT,
+        function_timeouts: Optional[Dict[str, float]] = None,
         flow_type: Optional[AuthFlowType] = None,
+        http_limits: Optional[Limits] = None,
+        http2: Optional[bool] = None,
+        http_transport: Optional[Union[BaseTransport, AsyncBaseTransport]] = None,
+        response_cache: Optional[ResponseCache] = None,
+        signed_url_cache: Optional[SignedURLCache] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        refresh_lock_path: Optional[str] = None,
+        json_codec: Optional[Union[str, JSONCodec]] = None,
+        coalesce_reads: Optional[bool] = None,
     ) -> "ClientOptions":
         """Create a new SupabaseClientOptions with changes"""
         client_options = ClientOptions()
@@ -77,5 +171,21 @@ class ClientOptions:
         client_options.storage_client_timeout = (
             storage_client_timeout or self.storage_client_timeout
         )
+        client_options.function_client_timeout = (
+            function_client_timeout or self.function_client_timeout
+        )
+        client_options.function_timeouts = function_timeouts or self.function_timeouts
         client_options.flow_type = flow_type or self.flow_type
+        client_options.http_limits = http_limits or self.http_limits
+        client_options.http2 = http2 or self.http2
+        client_options.http_transport = http_transport or self.http_transport
+        client_options.response_cache = response_cache or self.response_cache
+        client_options.signed_url_cache = (
+            self.signed_url_cache if signed_url_cache is None else signed_url_cache
+        )
+        client_options.retry_policy = retry_policy or self.retry_policy
+        client_options.instrumentation = instrumentation or self.instrumentation
+        client_options.refresh_lock_path = refresh_lock_path or self.refresh_lock_path
+        client_options.json_codec = json_codec or self.json_codec
+        client_options.coalesce_reads = coalesce_reads or self.coalesce_reads
         return client_options
@@ -0,0 +1,46 @@
+from io import BytesIO
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import pandas
+    import pyarrow
+
+# PostgREST writes CSV rows in the text format of PostgreSQL records:
+# booleans are `t` and `f`, NULL is an empty field and an empty string is
+# quoted.
+TRUE_VALUES = ["t", "true"]
+FALSE_VALUES = ["f", "false"]
+
+
+def read_arrow(content: bytes, convert_options: Any = None) -> "pyarrow.Table":
+    """Parse a PostgREST CSV response into an Arrow table.
+
+    `convert_options`, a `pyarrow.csv.ConvertOptions`, replaces the default
+    one, e.g. to set the type of some columns.
+    """
+    try:
+        from pyarrow import csv
+    except ImportError as exc:
+        raise ImportError("execute_arrow requires the pyarrow package") from exc
+    if convert_options is None:
+        convert_options = csv.ConvertOptions(
+            true_values=TRUE_VALUES,
+            false_values=FALSE_VALUES,
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=False,
+        )
+    return csv.read_csv(BytesIO(content), convert_options=convert_options)
+
+
+def read_pandas(content: bytes, **read_csv: Any) -> "pandas.DataFrame":
+    """Parse a PostgREST CSV response into a DataFrame.
+
+    Keyword arguments are passed to `pandas.read_csv`.
+    """
+    try:
+        import pandas
+    except ImportError as exc:
+        raise ImportError("to_pandas requires the pandas package") from exc
+    read_csv.setdefault("true_values", TRUE_VALUES)
+    read_csv.setdefault("false_values", FALSE_VALUES)
+    return pandas.read_csv(BytesIO(content), **read_csv)
@@ -0,0 +1,162 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Coroutine,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    TypeVar,
+)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# The concurrency primitives the async clients are written against. Each
+# `Async*` helper has a `Sync*` twin with the same interface, built on
+# threads, so that unasync can generate the sync clients from the async
+# ones: it renames one into the other and drops the `await`s.
+
+# Tasks started by `AsyncRuntime.spawn`, kept alive until they are done.
+_background: "Set[asyncio.Future]" = set()
+
+
+class AsyncLock:
+    """An asyncio lock, created on first use.
+
+    Before Python 3.10 an `asyncio.Lock` is bound to the event loop that is
+    current when it is created, which need not be the loop the client is
+    later used from.
+    """
+
+    def __init__(self) -> None:
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def __aenter__(self) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        await self._lock.acquire()
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        assert self._lock is not None
+        self._lock.release()
+
+
+class SyncLock:
+    """A thread lock."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> None:
+        self._lock.acquire()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._lock.release()
+
+
+class AsyncRuntime:
+    """Sleeping, timeouts and bounded fan-out on the running event loop."""
+
+    @staticmethod
+    async def sleep(seconds: float) -> None:
+        await asyncio.sleep(seconds)
+
+    @staticmethod
+    async def wait_for(result: Awaitable[T], timeout: Optional[float]) -> T:
+        """Return `result`, cancelling it after `timeout` seconds."""
+        return await asyncio.wait_for(result, timeout)
+
+    @staticmethod
+    def spawn(result: Coroutine[Any, Any, Any]) -> None:
+        """Run `result` in a task of its own, without waiting for it.
+
+        Outside of an event loop, `result` is run to completion instead.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(result)
+            return
+        task = asyncio.ensure_future(result)
+        _background.add(task)
+        task.add_done_callback(_background.discard)
+
+    @staticmethod
+    async def map(
+        function: Callable[[T], Awaitable[R]], items: Iterable[T], concurrency: int
+    ) -> List[R]:
+        """Call `function` on every item, with at most `concurrency` in flight.
+
+        `items` is only advanced when a slot is free, so it can be a lazy
+        iterator over more data than fits in memory. Each call runs in its
+        own task, with a copy of the caller's context. The results are
+        returned in the order of the items.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(item: T) -> R:
+            try:
+                return await function(item)
+            finally:
+                semaphore.release()
+
+        tasks = []
+        for item in items:
+            await semaphore.acquire()
+            tasks.append(asyncio.ensure_future(run(item)))
+        return list(await asyncio.gather(*tasks))
+
+
+class SyncRuntime:
+    """Sleeping, timeouts and bounded fan-out on threads."""
+
+    @staticmethod
+    def sleep(seconds: float) -> None:
+        time.sleep(seconds)
+
+    @staticmethod
+    def wait_for(result: T, timeout: Optional[float]) -> T:
+        """Return `result`.
+
+        The call that produced it has already returned: a thread cannot be
+        cancelled, so the timeout has to be enforced by that call, e.g. as
+        the HTTP timeout set through `request_timeout`.
+        """
+        return result
+
+    @staticmethod
+    def spawn(result: Any) -> None:
+        """Do nothing: the call that produced `result` has already run."""
+
+    @staticmethod
+    def map(
+        function: Callable[[T], R], items: Iterable[T], concurrency: int
+    ) -> List[R]:
+        """Call `function` on every item, with at most `concurrency` in flight.
+
+        `items` is only advanced when a slot is free, so it can be a lazy
+        iterator over more data than fits in memory. Each call runs in a
+        worker thread, with a copy of the caller's context. The results are
+        returned in the order of the items.
+        """
+        semaphore = threading.BoundedSemaphore(concurrency)
+
+        def run(item: T) -> R:
+            try:
+                return function(item)
+            finally:
+                semaphore.release()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = []
+            for item in items:
+                semaphore.acquire()
+                futures.append(executor.submit(copy_context().run, run, item))
+            return [future.result() for future in futures]
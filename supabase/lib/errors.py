@@ -0,0 +1,12 @@
+from json import JSONDecodeError
+
+from httpx import Response
+from postgrest.exceptions import APIError, generate_default_error_message
+
+
+def postgrest_error(response: Response) -> APIError:
+    """Build the APIError postgrest-py raises for a failed response."""
+    try:
+        return APIError(response.json())
+    except JSONDecodeError:
+        return APIError(generate_default_error_message(response))
@@ -0,0 +1,63 @@
+import os
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+    import msvcrt
+
+
+class FileLock:
+    """An exclusive advisory lock on a file, shared between processes.
+
+    The lock belongs to the open file rather than to the process, so two
+    instances on the same path exclude each other even within one process.
+    The operating system releases it when its holder exits, so a crashed
+    process cannot leave it held.
+    """
+
+    def __init__(self, path: str):
+        """Instantiate the lock.
+
+        Parameters
+        ----------
+        path: str
+            The lock file. It is created if it does not exist and is never
+            removed, since removing it would let two holders lock
+            different files.
+        """
+        self.path = path
+        self._fd: Optional[int] = None
+
+    @property
+    def locked(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self) -> bool:
+        """Take the lock without waiting; return whether it was taken."""
+        if self._fd is not None:
+            raise RuntimeError(f"{self.path} is already locked by this instance")
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:  # pragma: no cover - Windows
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        fd, self._fd = self._fd, None
+        if fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:  # pragma: no cover - Windows
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
@@ -0,0 +1,257 @@
+import math
+import threading
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from httpx import Request, Response
+
+RequestHook = Callable[[Request], None]
+ResponseHook = Callable[[Request, Optional[Response], float], None]
+
+# The path under which each service is served.
+SERVICES = {
+    "rest": "/rest/v1/",
+    "storage": "/storage/v1/",
+    "functions": "/functions/v1/",
+    "auth": "/auth/v1/",
+}
+
+MetricKey = Tuple[str, str, str]
+
+
+def classify(request: Request) -> Tuple[str, str]:
+    """Return the service a request is sent to and the resource it names.
+
+    The resource is the table or `rpc/<function>` for PostgREST, the kind of
+    object API for storage, the function name for edge functions and the
+    endpoint for auth.
+    """
+    path = request.url.path
+    for service, prefix in SERVICES.items():
+        if path.startswith(prefix):
+            segments = path[len(prefix) :].split("/")
+            if service == "rest" and segments[0] == "rpc" and len(segments) > 1:
+                return service, f"rpc/{segments[1]}"
+            return service, segments[0]
+    return "other", request.url.host
+
+
+class LatencyHistogram:
+    """Latencies bucketed on a logarithmic scale, in the spirit of HDR.
+
+    Every recorded value is kept in a bucket whose bounds are within
+    `precision` of each other, so that percentiles are accurate to that
+    relative error whatever the range of the values, in constant memory
+    per order of magnitude.
+    """
+
+    def __init__(self, precision: float = 0.01):
+        self._gamma = (1 + precision) / (1 - precision)
+        self._log_gamma = math.log(self._gamma)
+        self._buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, value: float) -> None:
+        value = max(value, 1e-9)
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self._buckets[index] = self._buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> float:
+        """Return the value below which `q` percent of the values fall."""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * (self.count - 1)
+        seen = 0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if seen > rank:
+                value = 2 * self._gamma**index / (self._gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+        }
+
+
+class _Series:
+    __slots__ = ("latency", "errors")
+
+    def __init__(self) -> None:
+        self.latency = LatencyHistogram()
+        self.errors = 0
+
+
+class Instrumentation:
+    """Measures the requests a client sends.
+
+    Latencies are kept per service, resource and method, from the moment a
+    request is handed to the transport until its response headers arrive.
+    Requests that fail or receive an error status are counted as errors.
+    The time spent opening connections and negotiating TLS is recorded
+    separately, when the transport reports it.
+
+    Request hooks are called with each request before it is sent; response
+    hooks with the request, its response (None when it failed) and the
+    elapsed seconds. With `tracing`, every request is also wrapped in an
+    OpenTelemetry client span whose context is propagated in the request
+    headers. Tracing requires the `opentelemetry-api` package.
+    """
+
+    def __init__(
+        self,
+        request_hooks: Iterable[RequestHook] = (),
+        response_hooks: Iterable[ResponseHook] = (),
+        tracing: bool = False,
+    ):
+        self.request_hooks: List[RequestHook] = list(request_hooks)
+        self.response_hooks: List[ResponseHook] = list(response_hooks)
+        self._tracer: Any = None
+        if tracing:
+            try:
+                from opentelemetry import trace
+            except ImportError as exc:
+                raise ImportError(
+                    "tracing requires the opentelemetry-api package"
+                ) from exc
+            self._tracer = trace.get_tracer("supabase")
+        self._lock = threading.Lock()
+        self._series: Dict[MetricKey, _Series] = {}
+        self._connects = LatencyHistogram()
+        self._handshakes = LatencyHistogram()
+
+    def start(self, request: Request) -> Tuple[float, Any]:
+        """Note that `request` is about to be sent; pass the result to `finish`."""
+        for hook in self.request_hooks:
+            hook(request)
+        span = None
+        if self._tracer is not None:
+            span = self._start_span(request)
+        return perf_counter(), span
+
+    def finish(
+        self,
+        request: Request,
+        started: Tuple[float, Any],
+        response: Optional[Response] = None,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        elapsed = perf_counter() - started[0]
+        service, resource = classify(request)
+        key = (service, resource, request.method)
+        failed = response is None or response.status_code >= 400
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series()
+            series.latency.record(elapsed)
+            series.errors += failed
+        if started[1] is not None:
+            self._end_span(started[1], response, error)
+        for hook in self.response_hooks:
+            hook(request, response, elapsed)
+
+    def connection_event(self, event: str, started: Dict[str, float]) -> None:
+        """Record the httpcore trace `event` of a request.
+
+        `started` holds the start times of the request's pending steps.
+        """
+        step, _, stage = event.rpartition(".")
+        if step not in ("connection.connect_tcp", "connection.start_tls"):
+            return
+        if stage == "started":
+            started[step] = perf_counter()
+        elif stage == "complete" and step in started:
+            histogram = (
+                self._connects if step == "connection.connect_tcp" else self._handshakes
+            )
+            with self._lock:
+                histogram.record(perf_counter() - started.pop(step))
+
+    def snapshot(self, pool: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """Return the measurements so far as plain, JSON serialisable data."""
+        with self._lock:
+            requests = [
+                {
+                    "service": service,
+                    "resource": resource,
+                    "method": method,
+                    "errors": series.errors,
+                    "latency": series.latency.snapshot(),
+                }
+                for (service, resource, method), series in sorted(self._series.items())
+            ]
+            connections = {
+                "connect": self._connects.snapshot(),
+                "tls": self._handshakes.snapshot(),
+            }
+        return {"requests": requests, "connections": connections, "pool": pool}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+            self._connects = LatencyHistogram()
+            self._handshakes = LatencyHistogram()
+
+    def _start_span(self, request: Request) -> Any:
+        from opentelemetry import propagate, trace
+
+        service, resource = classify(request)
+        span = self._tracer.start_span(
+            f"{service} {request.method} {resource}",
+            kind=trace.SpanKind.CLIENT,
+            attributes={
+                "http.request.method": request.method,
+                "url.full": str(request.url.copy_with(query=None)),
+                "server.address": request.url.host,
+                "supabase.service": service,
+                "supabase.resource": resource,
+            },
+        )
+        propagate.inject(request.headers, context=trace.set_span_in_context(span))
+        return span
+
+    @staticmethod
+    def _end_span(
+        span: Any, response: Optional[Response], error: Optional[BaseException]
+    ) -> None:
+        from opentelemetry.trace import Status, StatusCode
+
+        if response is not None:
+            span.set_attribute("http.response.status_code", response.status_code)
+            if response.status_code >= 500:
+                span.set_status(Status(StatusCode.ERROR))
+        if error is not None:
+            span.record_exception(error)
+            span.set_status(Status(StatusCode.ERROR, str(error)))
+        span.end()
+
+
+def pool_stats(transport: Any) -> Optional[Dict[str, int]]:
+    """Describe the connection pool behind `transport`, if it has one."""
+    while not hasattr(transport, "_pool") and hasattr(transport, "_transport"):
+        transport = transport._transport
+    pool = getattr(transport, "_pool", None)
+    if pool is None:
+        return None
+    connections = pool.connections
+    idle = sum(1 for connection in connections if connection.is_idle())
+    return {
+        "connections": len(connections),
+        "idle": idle,
+        "active": len(connections) - idle,
+    }
@@ -0,0 +1,134 @@
+import json
+import logging
+from typing import Any, Dict, Optional, Type, Union
+
+from httpx import ByteStream, Response
+
+logger = logging.getLogger(__name__)
+
+
+class JSONCodec:
+    """Encodes request bodies to JSON and decodes JSON responses.
+
+    This implementation uses the standard library, exactly like httpx does;
+    subclasses plug in faster libraries.
+    """
+
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+    """JSON through orjson, which also encodes datetimes, UUIDs and dataclasses."""
+
+    name = "orjson"
+
+    def __init__(self) -> None:
+        import orjson
+
+        self._dumps = orjson.dumps
+        self._loads = orjson.loads
+        # like the standard library, accept keys such as integers
+        self._options = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._dumps(obj, option=self._options)
+
+    def loads(self, data: bytes) -> Any:
+        return self._loads(data)
+
+
+class MsgspecCodec(JSONCodec):
+    """JSON through msgspec."""
+
+    name = "msgspec"
+
+    def __init__(self) -> None:
+        import msgspec
+
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+        self._decode_error = msgspec.DecodeError
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._encoder.encode(obj)
+
+    def loads(self, data: bytes) -> Any:
+        try:
+            return self._decoder.decode(data)
+        except self._decode_error as exc:
+            # raised as the standard library does, which callers catch, e.g.
+            # to report a non-JSON error page
+            text = data.decode("utf-8", "replace")
+            raise json.JSONDecodeError(str(exc), text, 0) from exc
+
+
+CODECS: Dict[str, Type[JSONCodec]] = {
+    codec.name: codec for codec in (JSONCodec, OrjsonCodec, MsgspecCodec)
+}
+
+# the libraries tried, in order, by the "auto" codec
+FAST_CODECS = ("orjson", "msgspec")
+
+
+def resolve_codec(codec: Union[str, JSONCodec]) -> Optional[JSONCodec]:
+    """Return the codec named by `codec`, or None for the standard library.
+
+    A fast library that is not installed falls back to the standard
+    library, with a warning; `auto` picks the first installed one.
+    """
+    if isinstance(codec, JSONCodec):
+        return codec
+    if codec == "auto":
+        for name in FAST_CODECS:
+            try:
+                return CODECS[name]()
+            except ImportError:
+                continue
+        return None
+    if codec not in CODECS:
+        raise ValueError(
+            f"json_codec must be one of auto, {', '.join(CODECS)} "
+            f"or a JSONCodec, not {codec!r}"
+        )
+    if codec == JSONCodec.name:
+        return None
+    try:
+        return CODECS[codec]()
+    except ImportError:
+        logger.warning(
+            "%s is not installed: JSON is handled by the standard library", codec
+        )
+        return None
+
+
+class CodecResponse(Response):
+    """A response whose `json()` is decoded by a :class:`JSONCodec`."""
+
+    codec: JSONCodec
+
+    def json(self, **kwargs: Any) -> Any:
+        if kwargs:
+            # options of json.loads, which other codecs do not take
+            return super().json(**kwargs)
+        return self.codec.loads(self.content)
+
+
+def codec_response(response: Response, codec: JSONCodec) -> CodecResponse:
+    """Return `response` as a :class:`CodecResponse` decoded by `codec`."""
+    stream = (
+        ByteStream(response.content) if response.is_stream_consumed else response.stream
+    )
+    wrapped = CodecResponse(
+        response.status_code,
+        headers=response.headers,
+        stream=stream,
+        extensions=response.extensions,
+    )
+    wrapped.codec = codec
+    return wrapped
@@ -0,0 +1,78 @@
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Sequence
+
+Row = Dict[str, Any]
+
+
+class MirrorStore:
+    """Rows of a table indexed by primary key, with optional secondary indexes.
+
+    The key of a row is the value of its `key` column, or the tuple of the
+    values of its `key` columns when there are several. Each column of
+    `indexes` maps its values to the rows holding them; indexed columns must
+    hold hashable values.
+    """
+
+    __slots__ = ("key", "_rows", "_indexes")
+
+    def __init__(self, key: Sequence[str], indexes: Sequence[str] = ()):
+        self.key = tuple(key)
+        self._rows: Dict[Hashable, Row] = {}
+        self._indexes: Dict[str, Dict[Hashable, Dict[Hashable, Row]]] = {
+            column: {} for column in indexes
+        }
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __iter__(self) -> Iterator[Row]:
+        return iter(self._rows.values())
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._rows
+
+    @property
+    def indexes(self) -> List[str]:
+        return list(self._indexes)
+
+    def key_of(self, row: Row) -> Hashable:
+        if len(self.key) == 1:
+            return row[self.key[0]]
+        return tuple(row[column] for column in self.key)
+
+    def get(self, key: Hashable, default: Optional[Row] = None) -> Optional[Row]:
+        return self._rows.get(key, default)
+
+    def find(self, column: str, value: Any) -> List[Row]:
+        """Return the rows whose `column` equals `value`.
+
+        Indexed columns are looked up, the others scanned.
+        """
+        index = self._indexes.get(column)
+        if index is not None:
+            return list(index.get(value, {}).values())
+        return [row for row in self._rows.values() if row.get(column) == value]
+
+    def put(self, row: Row) -> Hashable:
+        """Insert or replace a row, returning its key."""
+        key = self.key_of(row)
+        self._unindex(key, self._rows.get(key))
+        self._rows[key] = row
+        for column, index in self._indexes.items():
+            index.setdefault(row.get(column), {})[key] = row
+        return key
+
+    def delete(self, key: Hashable) -> Optional[Row]:
+        """Remove the row with the given key, returning it if it was there."""
+        row = self._rows.pop(key, None)
+        self._unindex(key, row)
+        return row
+
+    def _unindex(self, key: Hashable, row: Optional[Row]) -> None:
+        if row is None:
+            return
+        for column, index in self._indexes.items():
+            rows = index.get(row.get(column))
+            if rows is not None:
+                rows.pop(key, None)
+                if not rows:
+                    del index[row.get(column)]
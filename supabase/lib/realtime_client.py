@@ -1,7 +1,11 @@
 from typing import Any, Callable
 
 from realtime.connection import Socket
-from realtime.transformers import convert_change_data
+
+from .realtime_payload import ChangePayload, PayloadDecoder
+
+# shared by every subscription: it only caches the converters of each table
+_decoder = PayloadDecoder()
 
 
 class SupabaseRealtimeClient:
@@ -14,28 +18,32 @@ class SupabaseRealtimeClient:
         self.subscription = socket.set_channel(topic)
 
     @staticmethod
-    def get_payload_records(payload: Any):
-        records: dict = {"new": {}, "old": {}}
-        if payload.type in ["INSERT", "UPDATE"]:
-            records["new"] = payload.record
-            convert_change_data(payload.columns, payload.record)
-        if payload.type in ["UPDATE", "DELETE"]:
-            records["old"] = payload.record
-            convert_change_data(payload.columns, payload.old_record)
-        return records
-
-    def on(self, event, callback: Callable[..., Any]):
-        def cb(payload):
-            enriched_payload = {
+    def decode_payload(payload: Any) -> ChangePayload:
+        return _decoder.decode(
+            {
                 "schema": payload.schema,
                 "table": payload.table,
                 "commit_timestamp": payload.commit_timestamp,
-                "event_type": payload.type,
-                "new": {},
-                "old": {},
+                "type": payload.type,
+                "record": (
+                    payload.record if payload.type in ("INSERT", "UPDATE") else None
+                ),
+                "old_record": (
+                    payload.old_record if payload.type in ("UPDATE", "DELETE") else None
+                ),
+                "columns": payload.columns,
             }
-            enriched_payload = {**enriched_payload, **self.get_payload_records(payload)}
-            callback(enriched_payload)
+        )
+
+    @staticmethod
+    def get_payload_records(payload: Any):
+        change = SupabaseRealtimeClient.decode_payload(payload)
+        return {"new": change.new, "old": change.old}
+
+    def on(self, event, callback: Callable[..., Any]):
+        def cb(payload):
+            # callbacks of this API have always received a plain dictionary
+            callback(self.decode_payload(payload).to_dict())
 
         self.subscription.join().on(event, cb)
         return self
@@ -0,0 +1,216 @@
+import json
+from collections.abc import Mapping as MappingABC
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+
+Converter = Callable[[str], Any]
+Converters = Tuple[Tuple[str, Converter], ...]
+
+_EMPTY: Mapping[str, Any] = MappingProxyType({})
+_BOOLEANS = {"t": True, "true": True, "f": False, "false": False}
+_FIELDS = (
+    "schema",
+    "table",
+    "commit_timestamp",
+    "event_type",
+    "new",
+    "old",
+    "errors",
+)
+
+
+def _to_bool(value: str) -> Optional[bool]:
+    return _BOOLEANS.get(value)
+
+
+def _to_timestamp(value: str) -> str:
+    # ISO-8601, as returned by PostgREST
+    return value.replace(" ", "T")
+
+
+def _to_datetime(value: str) -> Any:
+    from dateutil.parser import isoparse
+
+    return isoparse(value)
+
+
+def _to_time(value: str) -> Any:
+    from dateutil.parser import parse
+
+    return parse(value)
+
+
+_SCALAR_CONVERTERS: Dict[str, Converter] = {
+    "bool": _to_bool,
+    "float4": float,
+    "float8": float,
+    "int2": int,
+    "int4": int,
+    "int8": int,
+    "json": json.loads,
+    "jsonb": json.loads,
+    "money": float,
+    "numeric": float,
+    "oid": int,
+    "timestamp": _to_timestamp,
+    "timestamptz": _to_datetime,
+    "timetz": _to_time,
+}
+
+
+def _array_converter(convert: Optional[Converter]) -> Converter:
+    def to_array(value: str) -> List[Any]:
+        inner = value[1:-1]
+        items = inner.split(",") if inner else []
+        return [convert(item) for item in items] if convert else items
+
+    return to_array
+
+
+def compile_converters(columns: List[Dict[str, Any]]) -> Converters:
+    """Return the `(column, converter)` pairs of the columns that need one.
+
+    Columns of types that are delivered as plain strings (text, uuid,
+    dates...) are left out, so decoding a record never visits them.
+    """
+    converters = []
+    for column in columns:
+        type = column.get("type") or ""
+        if type.startswith("_"):
+            convert: Optional[Converter] = _array_converter(
+                _SCALAR_CONVERTERS.get(type[1:])
+            )
+        else:
+            convert = _SCALAR_CONVERTERS.get(type)
+        if convert is not None:
+            converters.append((column["name"], convert))
+    return tuple(converters)
+
+
+def convert_record(record: Dict[str, Any], converters: Converters) -> None:
+    """Convert the string values of `record` in place."""
+    for name, convert in converters:
+        value = record.get(name)
+        if type(value) is str:
+            try:
+                record[name] = convert(value)
+            except (TypeError, ValueError):
+                # keep the value as sent, like the realtime transformers do
+                pass
+
+
+class ChangePayload(MappingABC):
+    """A database change, with its records decoded on first access.
+
+    It is also a read-only mapping of its fields (`payload["new"]`,
+    `dict(payload)`...), for compatibility with the dictionaries the
+    callbacks used to receive; `to_dict` returns such a dictionary.
+    """
+
+    __slots__ = (
+        "schema",
+        "table",
+        "commit_timestamp",
+        "event_type",
+        "errors",
+        "_new",
+        "_old",
+        "_converters",
+    )
+
+    def __init__(
+        self,
+        schema: str,
+        table: str,
+        commit_timestamp: Optional[str],
+        event_type: str,
+        new: Optional[Dict[str, Any]],
+        old: Optional[Dict[str, Any]],
+        errors: Any = None,
+        converters: Converters = (),
+    ):
+        self.schema = schema
+        self.table = table
+        self.commit_timestamp = commit_timestamp
+        self.event_type = event_type
+        self.errors = errors
+        self._new = new or _EMPTY
+        self._old = old or _EMPTY
+        self._converters: Optional[Converters] = converters or None
+
+    @property
+    def new(self) -> Mapping[str, Any]:
+        """The row after an INSERT or UPDATE."""
+        if self._converters is not None:
+            self._decode()
+        return self._new
+
+    @property
+    def old(self) -> Mapping[str, Any]:
+        """The row before an UPDATE or DELETE, as far as the replica identity allows."""
+        if self._converters is not None:
+            self._decode()
+        return self._old
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in _FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_FIELDS)
+
+    def __len__(self) -> int:
+        return len(_FIELDS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the change as a plain dictionary, records included."""
+        fields = {field: getattr(self, field) for field in _FIELDS}
+        fields["new"] = dict(self.new)
+        fields["old"] = dict(self.old)
+        return fields
+
+    def __repr__(self) -> str:
+        return (
+            f"ChangePayload({self.event_type} {self.schema}.{self.table} "
+            f"new={self.new!r} old={self.old!r})"
+        )
+
+    def _decode(self) -> None:
+        assert self._converters is not None
+        for record in (self._new, self._old):
+            if record:
+                convert_record(record, self._converters)  # type: ignore[arg-type]
+        self._converters = None
+
+
+class PayloadDecoder:
+    """Turns the data of postgres change events into `ChangePayload` objects.
+
+    The converters of a table are compiled from the columns of its first
+    event and reused for as long as the columns stay the same.
+    """
+
+    __slots__ = ("_tables",)
+
+    def __init__(self) -> None:
+        self._tables: Dict[Tuple[str, str], Tuple[Any, Converters]] = {}
+
+    def decode(self, data: Dict[str, Any]) -> ChangePayload:
+        schema = data.get("schema")
+        table = data.get("table")
+        columns = data.get("columns") or []
+        cached = self._tables.get((schema, table))
+        if cached is None or cached[0] != columns:
+            cached = (columns, compile_converters(columns))
+            self._tables[(schema, table)] = cached
+        return ChangePayload(
+            schema,
+            table,
+            data.get("commit_timestamp"),
+            data.get("type") or data.get("eventType"),
+            data.get("record"),
+            data.get("old_record"),
+            data.get("errors"),
+            cached[1],
+        )
@@ -0,0 +1,184 @@
+from dataclasses import dataclass
+from hashlib import sha256
+from time import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Protocol, Tuple
+
+from httpx import Request, Response
+
+from .cache import LRUCache
+
+# Request headers that change the representation PostgREST returns.
+VARY_HEADERS = ("accept", "accept-profile", "prefer", "range")
+# Response headers describing the body as sent, which no longer apply once
+# it has been read and decoded.
+WIRE_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+
+def decoded_headers(headers: Iterable[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """Return `headers` without those describing the encoded body."""
+    return [
+        (name, value) for name, value in headers if name.lower() not in WIRE_HEADERS
+    ]
+
+
+def decoded_response(
+    status_code: int,
+    headers: Iterable[Tuple[str, str]],
+    content: bytes,
+    extensions: Optional[Dict[str, Any]] = None,
+) -> Response:
+    """Build a response around an already decoded body.
+
+    Reading a response removes its content encoding, e.g. gzip, so a new
+    response carrying the same bytes must not announce that encoding again.
+    """
+    return Response(
+        status_code,
+        headers=decoded_headers(headers),
+        content=content,
+        extensions=extensions,
+    )
+
+
+def copy_response(response: Response) -> Response:
+    """Return an independent copy of a response whose body has been read."""
+    return decoded_response(
+        response.status_code,
+        response.headers.multi_items(),
+        response.content,
+        dict(response.extensions),
+    )
+
+
+def request_identity(request: Request) -> str:
+    """Identify what `request` reads: its URL, representation and caller.
+
+    Two requests with the same identity get the same response. The
+    credentials are hashed, so that they are not kept in plain text.
+    """
+    credentials = "|".join(
+        request.headers.get(name, "") for name in ("apikey", "authorization")
+    )
+    vary = "|".join(request.headers.get(name, "") for name in VARY_HEADERS)
+    identity = sha256(credentials.encode()).hexdigest()
+    return f"{identity}:{request.url}:{vary}"
+
+
+@dataclass
+class CachedResponse:
+    """A PostgREST response body kept for later reads."""
+
+    status_code: int
+    headers: List[Tuple[str, str]]
+    content: bytes
+    expires_at: float
+
+    @property
+    def etag(self) -> Optional[str]:
+        for name, value in self.headers:
+            if name.lower() == "etag":
+                return value
+        return None
+
+    def to_response(self) -> Response:
+        return decoded_response(self.status_code, self.headers, self.content)
+
+
+class CacheBackend(Protocol):
+    """Storage used by :class:`ResponseCache`.
+
+    :class:`supabase.lib.cache.LRUCache` is the in-memory default; anything
+    with the same `get`/`set` methods, e.g. a wrapper around a shared cache
+    server, can be plugged in instead.
+    """
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        ...
+
+    def set(self, key: str, value: CachedResponse) -> None:
+        ...
+
+
+class ResponseCache:
+    """Read-through cache for PostgREST GET requests.
+
+    Responses are keyed on the method, URL with its query string, the headers
+    that select a representation and the caller's credentials, so users never
+    see each other's rows. A cached response is served without a round trip
+    for `ttl` seconds. Once stale, it is revalidated with `If-None-Match`
+    when the server sent an ETag, and fetched again otherwise.
+
+    Any other method bypasses the cache. A successful write to a table also
+    drops the responses cached for that table by this process.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 60.0,
+        table_ttls: Optional[Dict[str, float]] = None,
+        max_size: int = 1024,
+        backend: Optional[CacheBackend] = None,
+        clock: Callable[[], float] = time,
+    ):
+        """Instantiate the cache.
+
+        Parameters
+        ----------
+        ttl: float
+            Seconds a response stays fresh.
+        table_ttls: dict of str to float, optional
+            Per table (or view) overrides of `ttl`. A value of 0 disables
+            caching for that table.
+        max_size: int
+            Number of responses kept by the default in-memory backend.
+        backend: CacheBackend, optional
+            Where responses are stored. Defaults to an in-memory LRU.
+        """
+        self.ttl = ttl
+        self.table_ttls = table_ttls or {}
+        self.backend: CacheBackend = backend or LRUCache(max_size)
+        self._clock = clock
+        self._generations: Dict[str, int] = {}
+
+    @staticmethod
+    def table_of(request: Request) -> str:
+        return request.url.path.rstrip("/").rsplit("/", 1)[-1]
+
+    def key(self, request: Request) -> Optional[str]:
+        """Return the cache key of `request`, or None if it must not be cached."""
+        table = self.table_of(request)
+        if request.method != "GET" or self.table_ttls.get(table, self.ttl) <= 0:
+            return None
+        identity, representation = request_identity(request).split(":", 1)
+        generation = self._generations.get(table, 0)
+        return f"{identity}:{generation}:{representation}"
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        return self.backend.get(key)
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        return entry.expires_at > self._clock()
+
+    def store(self, key: str, request: Request, response: Response) -> None:
+        """Keep the already read body of `response` under `key`."""
+        ttl = self.table_ttls.get(self.table_of(request), self.ttl)
+        self.backend.set(
+            key,
+            CachedResponse(
+                status_code=response.status_code,
+                headers=decoded_headers(response.headers.multi_items()),
+                content=response.content,
+                expires_at=self._clock() + ttl,
+            ),
+        )
+
+    def refresh(self, key: str, request: Request, entry: CachedResponse) -> None:
+        """Mark `entry` as fresh again after the server confirmed it is current."""
+        ttl = self.table_ttls.get(self.table_of(request), self.ttl)
+        entry.expires_at = self._clock() + ttl
+        self.backend.set(key, entry)
+
+    def invalidate(self, request: Request) -> None:
+        """Forget the responses cached for the table `request` wrote to."""
+        table = self.table_of(request)
+        self._generations[table] = self._generations.get(table, 0) + 1
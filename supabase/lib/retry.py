@@ -0,0 +1,160 @@
+import random
+import threading
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from time import monotonic, time
+from typing import Callable, FrozenSet, Optional
+
+from httpx import (
+    ByteStream,
+    ConnectError,
+    ConnectTimeout,
+    PoolTimeout,
+    Request,
+    Response,
+    TransportError,
+)
+
+# Statuses worth retrying: the request never reached the database or the
+# server asked us to slow down.
+RETRYABLE_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+# Methods whose repetition has the same effect as sending them once.
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+# Errors raised before any byte of the request was sent, which makes every
+# request safe to send again.
+UNSENT_ERRORS = (ConnectError, ConnectTimeout, PoolTimeout)
+
+
+def backoff_delay(attempt: int, base: float = 0.2, cap: float = 10.0) -> float:
+    """Exponential backoff with full jitter for the given retry attempt."""
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class CircuitOpenError(TransportError):
+    """Raised instead of sending a request to a host that keeps failing."""
+
+
+@dataclass
+class RetryPolicy:
+    """How the shared transport retries, hedges and stops sending requests.
+
+    Failed requests are sent again after an exponential backoff with
+    jitter, or after the delay the server asked for in `Retry-After`. Only
+    idempotent methods, and requests carrying an `Idempotency-Key` header,
+    are retried after they may have reached the server; any request is
+    retried when the connection could not be established.
+    """
+
+    retries: int = 3
+    """Attempts made after the first one."""
+
+    backoff_base: float = 0.2
+    """Upper bound, in seconds, of the delay before the first retry."""
+
+    backoff_cap: float = 10.0
+    """Upper bound, in seconds, of any delay, including `Retry-After`."""
+
+    retry_statuses: FrozenSet[int] = RETRYABLE_STATUS_CODES
+    """Response statuses treated as transient failures."""
+
+    idempotent_methods: FrozenSet[str] = IDEMPOTENT_METHODS
+    """Methods retried after the request may have reached the server."""
+
+    hedge_after: Optional[float] = None
+    """
+    Seconds after which a GET that has not been answered yet is sent a
+    second time, the first response being used. Disabled when None.
+    """
+
+    failure_threshold: Optional[int] = 5
+    """
+    Consecutive failures after which requests to a host fail fast with
+    `CircuitOpenError`. The circuit breaker is disabled when None.
+    """
+
+    reset_timeout: float = 30.0
+    """Seconds after which a single request is let through to an open host."""
+
+    def can_retry(self, request: Request) -> bool:
+        """Whether the request may be sent again once it reached the server."""
+        if not isinstance(request.stream, ByteStream):
+            # a streamed body has been consumed by the first attempt
+            return False
+        return (
+            request.method in self.idempotent_methods
+            or "Idempotency-Key" in request.headers
+        )
+
+    def delay(self, attempt: int, response: Optional[Response] = None) -> float:
+        """Seconds to wait before the given retry attempt."""
+        retry_after = response.headers.get("Retry-After") if response else None
+        if retry_after:
+            try:
+                seconds = float(retry_after)
+            except ValueError:
+                try:
+                    seconds = parsedate_to_datetime(retry_after).timestamp() - time()
+                except (TypeError, ValueError):
+                    seconds = None
+            if seconds is not None:
+                return min(self.backoff_cap, max(0.0, seconds))
+        return backoff_delay(attempt, self.backoff_base, self.backoff_cap)
+
+    def circuit_breaker(self) -> Optional["CircuitBreaker"]:
+        if self.failure_threshold is None:
+            return None
+        return CircuitBreaker(self.failure_threshold, self.reset_timeout)
+
+
+class CircuitBreaker:
+    """Stops traffic to a host after repeated failures.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    requests are refused for `reset_timeout` seconds. A single request is
+    then let through: its success closes the circuit again, while its
+    failure, or no answer within `reset_timeout`, keeps it open.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        reset_timeout: float,
+        clock: Callable[[], float] = monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = self._clock()
+            if now - self._opened_at < self.reset_timeout:
+                return False
+            # let this request through, and no other until it succeeds or
+            # another reset_timeout has passed
+            self._opened_at = now
+            return True
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            if success:
+                self._failures = 0
+                self._opened_at = None
+                return
+            self._failures += 1
+            if self._opened_at is not None or (
+                self._failures >= self.failure_threshold
+            ):
+                self._opened_at = self._clock()
@@ -0,0 +1,186 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+from functools import partial
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+from urllib.parse import quote
+
+from gotrue import AsyncSupportedStorage, SyncSupportedStorage
+
+T = TypeVar("T")
+
+
+class FileStorage(SyncSupportedStorage):
+    """Sessions kept in a directory, one file per key.
+
+    Files are replaced atomically, so a reader in another process sees
+    either the old or the new session, never a partial one. Reads are served
+    from memory until the file's modification time, size or inode changes.
+    The files hold credentials and are only readable by their owner.
+    """
+
+    def __init__(self, directory: str):
+        """Instantiate the storage.
+
+        Parameters
+        ----------
+        directory: str
+            Where the files are kept. It is created if it does not exist.
+        """
+        self.directory = directory
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self._cache: Dict[str, Tuple[Tuple[int, int, int], str]] = {}
+        self._lock = threading.Lock()
+
+    def get_item(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] == self._version(os.stat(path)):
+                return cached[1]
+            with open(path, encoding="utf-8") as file:
+                # the file is replaced rather than written in place, so its
+                # content matches the version of the open file
+                version = self._version(os.fstat(file.fileno()))
+                value = file.read()
+        except FileNotFoundError:
+            self._cache.pop(key, None)
+            return None
+        self._cache[key] = (version, value)
+        return value
+
+    def set_item(self, key: str, value: str) -> None:
+        path = self._path(key)
+        fd, temporary = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                file.write(value)
+                file.flush()
+                os.fsync(file.fileno())
+            with self._lock:
+                os.replace(temporary, path)
+                self._cache[key] = (self._version(os.stat(path)), value)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.unlink(temporary)
+            raise
+
+    def remove_item(self, key: str) -> None:
+        with self._lock:
+            self._cache.pop(key, None)
+            try:
+                os.unlink(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, quote(key, safe="") + ".json")
+
+    @staticmethod
+    def _version(stat: os.stat_result) -> Tuple[int, int, int]:
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class SQLiteStorage(SyncSupportedStorage):
+    """Sessions kept in a SQLite database shared by many processes.
+
+    The database runs in WAL mode so that readers do not block the writer,
+    and writers wait up to `timeout` seconds for each other. Reads are
+    served from memory until another connection commits a change, which
+    SQLite reports through `PRAGMA data_version`.
+    """
+
+    def __init__(self, path: str, timeout: float = 5.0):
+        """Instantiate the storage.
+
+        Parameters
+        ----------
+        path: str
+            The database file. It is created if it does not exist.
+        timeout: float
+            Seconds to wait for another process holding the write lock.
+        """
+        self.path = path
+        self._connection = sqlite3.connect(
+            path, timeout=timeout, isolation_level=None, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        self._cache: Dict[str, Optional[str]] = {}
+        self._data_version = -1
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS sessions "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+
+    def get_item(self, key: str) -> Optional[str]:
+        with self._lock:
+            (data_version,) = self._connection.execute("PRAGMA data_version").fetchone()
+            if data_version != self._data_version:
+                self._cache.clear()
+                self._data_version = data_version
+            if key not in self._cache:
+                row = self._connection.execute(
+                    "SELECT value FROM sessions WHERE key = ?", (key,)
+                ).fetchone()
+                self._cache[key] = row[0] if row else None
+            return self._cache[key]
+
+    def set_item(self, key: str, value: str) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO sessions (key, value) VALUES (?, ?)",
+                (key, value),
+            )
+            # data_version does not change for our own commits
+            self._cache[key] = value
+
+    def remove_item(self, key: str) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM sessions WHERE key = ?", (key,))
+            self._cache[key] = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class _AsyncStorage(AsyncSupportedStorage):
+    """Runs a blocking storage in the event loop's default executor."""
+
+    def __init__(self, storage: SyncSupportedStorage):
+        self._storage = storage
+
+    async def get_item(self, key: str) -> Optional[str]:
+        return await self._run(self._storage.get_item, key)
+
+    async def set_item(self, key: str, value: str) -> None:
+        await self._run(self._storage.set_item, key, value)
+
+    async def remove_item(self, key: str) -> None:
+        await self._run(self._storage.remove_item, key)
+
+    @staticmethod
+    async def _run(function: Callable[..., T], *args: Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(function, *args))
+
+
+class AsyncFileStorage(_AsyncStorage):
+    """`FileStorage` for the async client, doing its I/O off the event loop."""
+
+    def __init__(self, directory: str):
+        super().__init__(FileStorage(directory))
+
+
+class AsyncSQLiteStorage(_AsyncStorage):
+    """`SQLiteStorage` for the async client, doing its I/O off the event loop."""
+
+    def __init__(self, path: str, timeout: float = 5.0):
+        super().__init__(SQLiteStorage(path, timeout))
+
+    async def close(self) -> None:
+        await self._run(self._storage.close)
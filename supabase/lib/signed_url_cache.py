@@ -0,0 +1,70 @@
+import json
+from hashlib import sha256
+from time import monotonic
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .cache import LRUCache
+
+SignedURLKey = Tuple[str, str, str, int, str]
+
+
+class SignedURLCache:
+    """Signed storage URLs handed out again instead of being signed anew.
+
+    A URL signed to be valid for `expires_in` seconds is reused for
+    `refresh_fraction` of that lifetime, so that every URL returned from the
+    cache still has at least the rest of its lifetime ahead of it. URLs are
+    keyed on the caller's credentials, bucket, path, lifetime and options;
+    at most `max_size` are kept, evicting the least recently used first.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 10_000,
+        refresh_fraction: float = 0.5,
+        clock: Callable[[], float] = monotonic,
+    ):
+        """Instantiate the cache.
+
+        Parameters
+        ----------
+        max_size: int
+            Number of URLs kept.
+        refresh_fraction: float
+            Part of a URL's lifetime, between 0 and 1, during which it is
+            handed out again.
+        clock: callable
+            Source of the current time, in seconds.
+        """
+        if not 0 < refresh_fraction <= 1:
+            raise ValueError("refresh_fraction must be in (0, 1]")
+        self.refresh_fraction = refresh_fraction
+        self._urls: LRUCache[SignedURLKey, str] = LRUCache(max_size, clock=clock)
+
+    @staticmethod
+    def key(
+        authorization: str,
+        bucket: str,
+        path: str,
+        expires_in: int,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> SignedURLKey:
+        return (
+            sha256(authorization.encode()).hexdigest(),
+            bucket,
+            path,
+            expires_in,
+            json.dumps(options, sort_keys=True) if options else "",
+        )
+
+    def get(self, key: SignedURLKey) -> Optional[str]:
+        return self._urls.get(key)
+
+    def set(self, key: SignedURLKey, url: str) -> None:
+        self._urls.set(key, url, ttl=key[3] * self.refresh_fraction)
+
+    def clear(self) -> None:
+        self._urls.clear()
+
+    def __len__(self) -> int:
+        return len(self._urls)
@@ -0,0 +1,217 @@
+import hashlib
+import mmap
+import os
+import stat
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+BLOCK_SIZE = 64 * 1024
+
+UploadData = Union[str, "os.PathLike[str]", bytes, bytearray, memoryview, IO[bytes]]
+
+
+@dataclass
+class TransferProgress:
+    """The state of an upload or a download, also returned once it is done."""
+
+    path: str
+    """Path of the object in its bucket"""
+    total: int
+    """Size of the object, in bytes"""
+    transferred: int = 0
+    """Bytes confirmed by the server, or written to disk"""
+    started: float = field(default_factory=time.monotonic)
+    finished: Optional[float] = None
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def fraction(self) -> float:
+        return self.transferred / self.total if self.total else 1.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.transferred / self.elapsed if self.elapsed else 0.0
+
+    def add(self, count: int, callback: Optional[Callable[..., None]]) -> None:
+        with self._lock:
+            self.transferred += count
+        if callback is not None:
+            callback(self)
+
+    def finish(self) -> "TransferProgress":
+        self.finished = time.monotonic()
+        return self
+
+
+class UploadSource:
+    """Random access to the bytes of an upload, without reading them all.
+
+    Paths and regular files are memory-mapped; other seekable file objects
+    are read a block at a time.
+    """
+
+    def __init__(self, data: UploadData):
+        self._file: Optional[IO[bytes]] = None
+        self._owns_file = False
+        self._view: Optional[memoryview] = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._lock = threading.Lock()
+        self.fingerprint: Optional[str] = None
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            self._view = memoryview(data).cast("B")
+            self.size = self._view.nbytes
+            return
+        if isinstance(data, (str, os.PathLike)):
+            self._file = open(data, "rb")
+            self._owns_file = True
+        else:
+            self._file = data
+        self._map_file()
+        if self._view is None:
+            start = self._file.tell()
+            self.size = self._file.seek(0, os.SEEK_END) - start
+            self._start = start
+        name = getattr(self._file, "name", None)
+        if isinstance(name, str):
+            mtime = os.stat(name).st_mtime_ns if os.path.exists(name) else 0
+            self.fingerprint = f"{os.path.abspath(name)}:{self.size}:{mtime}"
+
+    def _map_file(self) -> None:
+        assert self._file is not None
+        try:
+            fileno = self._file.fileno()
+            info = os.fstat(fileno)
+        except (AttributeError, OSError, ValueError):
+            return
+        if not stat.S_ISREG(info.st_mode):
+            return
+        size = info.st_size
+        start = self._file.tell()
+        if size - start <= 0:
+            self._view = memoryview(b"")
+        else:
+            self._mmap = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._mmap)[start:]
+        self.size = self._view.nbytes
+
+    def blocks(self, start: int, end: int) -> Iterator[bytes]:
+        """Yield the bytes between `start` and `end`, a block at a time."""
+        for offset in range(start, end, BLOCK_SIZE):
+            yield self.read(offset, min(offset + BLOCK_SIZE, end))
+
+    def read(self, start: int, end: int) -> bytes:
+        if self._view is not None:
+            return self._view[start:end].tobytes()
+        assert self._file is not None
+        with self._lock:
+            self._file.seek(self._start + start)
+            return self._file.read(end - start)
+
+    def close(self) -> None:
+        if self._view is not None:
+            self._view.release()
+        if self._mmap is not None:
+            self._mmap.close()
+        if self._owns_file and self._file is not None:
+            self._file.close()
+
+
+def split(size: int, parts: int, chunk_size: int) -> List[Tuple[int, int]]:
+    """Split `size` bytes in at most `parts` ranges aligned on `chunk_size`."""
+    chunks = -(-size // chunk_size) or 1
+    parts = max(1, min(parts, chunks))
+    ranges = []
+    start = 0
+    for index in range(parts):
+        count = chunks // parts + (index < chunks % parts)
+        end = min(start + count * chunk_size, size)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+@dataclass
+class ObjectResult:
+    """What a bulk storage operation did with one object."""
+
+    path: str
+    action: str
+    """`uploaded`, `downloaded`, `deleted` or `skipped`"""
+    error: Optional[Exception] = None
+    bytes: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class TransferReport:
+    """The per-object results of a bulk storage operation."""
+
+    results: List[ObjectResult] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return all(result.ok for result in self.results)
+
+    @property
+    def failed(self) -> List[ObjectResult]:
+        return [result for result in self.results if not result.ok]
+
+    def count(self, action: str) -> int:
+        """Number of objects successfully handled with the given action."""
+        return sum(
+            1 for result in self.results if result.ok and result.action == action
+        )
+
+
+def same_content(file: str, metadata: Dict[str, Any], uploading: bool = True) -> bool:
+    """Whether a local file holds the object described by `metadata`.
+
+    Sizes are compared first. When the object's ETag is a plain MD5, the
+    file is hashed and compared as well. Objects uploaded in parts have no
+    such ETag, so modification times are compared instead: when `uploading`,
+    the file must not have changed since the object was written, otherwise
+    it must have been written after the object. Without either, the file is
+    reported as changed.
+    """
+    try:
+        info = os.stat(file)
+    except OSError:
+        return False
+    if info.st_size != metadata.get("size"):
+        return False
+    etag = (metadata.get("eTag") or "").strip('"')
+    if etag and "-" not in etag:
+        digest = hashlib.md5()
+        with open(file, "rb") as f:
+            for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+                digest.update(block)
+        return digest.hexdigest() == etag
+    modified = _timestamp(metadata.get("lastModified"))
+    if modified is None:
+        return False
+    if uploading:
+        return info.st_mtime <= modified
+    return info.st_mtime >= modified
+
+
+def _timestamp(value: Any) -> Optional[float]:
+    """Parse an ISO 8601 date and time, as listed by storage, to a timestamp."""
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
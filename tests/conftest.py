@@ -1,11 +1,17 @@
 from __future__ import annotations
 
 import os
+from typing import Any, Callable, List, Optional
 
+import httpx
 import pytest
 from dotenv import load_dotenv
 
-from supabase import Client, create_client
+from supabase import Client, ClientOptions, create_client
+
+# A project URL and key for clients whose requests never leave the process
+URL = "https://ooqqmozurnggtljmjkii.supabase.co"
+KEY = "xxxxxxxxxxxxxx.xxxxxxxxxxxxxxx.xxxxxxxxxxxxxxx"
 
 
 def pytest_configure(config) -> None:
@@ -19,3 +25,36 @@ def supabase() -> Client:
     key = os.environ.get("SUPABASE_TEST_KEY")
     assert key is not None, "Must provide SUPABASE_TEST_KEY environment variable"
     return create_client(url, key)
+
+
+class MockServer:
+    """An httpx mock handler that records the requests it answers.
+
+    Requests are answered by `respond`, with an empty JSON list by default.
+    `respond` may be a coroutine function when an async client sends them.
+    """
+
+    def __init__(self, respond: Optional[Callable[[httpx.Request], Any]] = None):
+        self.requests: List[httpx.Request] = []
+        self.respond = respond or (lambda request: httpx.Response(200, json=[]))
+
+    def __call__(self, request: httpx.Request) -> Any:
+        self.requests.append(request)
+        return self.respond(request)
+
+
+def mock_options(handler: Callable[[httpx.Request], Any], **options) -> ClientOptions:
+    """Return client options sending every request to `handler`."""
+    return ClientOptions(http_transport=httpx.MockTransport(handler), **options)
+
+
+def mock_client(
+    handler: Callable[[httpx.Request], Any], client_class: Any = Client, **options
+) -> Any:
+    """Return a client of `client_class` whose requests `handler` answers."""
+    return client_class(URL, KEY, mock_options(handler, **options))
+
+
+@pytest.fixture
+def mock_server() -> MockServer:
+    return MockServer()
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Iterator, List, Tuple
+
+import pytest
+
+from supabase import Client
+
+from .conftest import KEY
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    seen: List[Tuple[int, str]] = []
+
+    def _reply(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        self.seen.append((self.client_address[1], self.headers["Authorization"]))
+        body = b"[]"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = _reply
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def server() -> Iterator[ThreadingHTTPServer]:
+    _KeepAliveHandler.seen = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_token_refresh_keeps_sub_clients_and_connections(server) -> None:
+    host, port = server.server_address
+    client = Client(f"http://{host}:{port}", KEY)
+    postgrest, storage, functions = client.postgrest, client.storage, client.functions
+
+    for i in range(3):
+        session = SimpleNamespace(access_token=f"token-{i}")
+        client.auth._notify_all_subscribers("TOKEN_REFRESHED", session)
+        client.table("countries").select("*").execute()
+        client.storage.list_buckets()
+        client.functions.invoke("hello")
+
+    assert client.postgrest is postgrest
+    assert client.storage is storage
+    assert client.functions is functions
+    connections = {port for port, _ in _KeepAliveHandler.seen}
+    assert len(connections) == 1
+    assert [auth for _, auth in _KeepAliveHandler.seen[-3:]] == ["Bearer token-2"] * 3
+    client.close()
+
+
+def test_sign_out_restores_the_api_key(server) -> None:
+    host, port = server.server_address
+    client = Client(f"http://{host}:{port}", KEY)
+    client.auth._notify_all_subscribers(
+        "SIGNED_IN", SimpleNamespace(access_token="user-token")
+    )
+    client.table("countries").select("*").execute()
+    client.auth._notify_all_subscribers("SIGNED_OUT", None)
+    client.table("countries").select("*").execute()
+
+    assert [auth for _, auth in _KeepAliveHandler.seen] == [
+        "Bearer user-token",
+        f"Bearer {KEY}",
+    ]
+    client.close()
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import threading
+import time
+from typing import List
+
+import httpx
+from gotrue import AsyncMemoryStorage, SyncMemoryStorage
+from gotrue.constants import EXPIRY_MARGIN
+
+from supabase import Client, ClientOptions
+from supabase._async.client import AsyncClient
+from supabase.lib.file_lock import FileLock
+
+from .conftest import KEY, URL, mock_options
+
+STORAGE_KEY = "supabase.auth.token"
+
+
+def _jwt(exp: int, sub: str = "user-1") -> str:
+    def encode(value: dict) -> str:
+        raw = base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+        return raw.rstrip("=")
+
+    return f"{encode({'alg': 'HS256'})}.{encode({'sub': sub, 'exp': exp})}.sig"
+
+
+def _session(expires_in: int, sub: str = "user-1") -> dict:
+    expires_at = int(time.time()) + expires_in
+    return {
+        "access_token": _jwt(expires_at, sub),
+        "refresh_token": f"refresh-{sub}",
+        "expires_in": expires_in,
+        "expires_at": expires_at,
+        "token_type": "bearer",
+        "user": {
+            "id": sub,
+            "app_metadata": {},
+            "user_metadata": {},
+            "aud": "authenticated",
+            "created_at": "2024-01-01T00:00:00Z",
+        },
+    }
+
+
+class AuthServer:
+    def __init__(self) -> None:
+        self.refreshes: List[httpx.Request] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/auth/v1/token"
+        self.refreshes.append(request)
+        time.sleep(0.05)
+        return httpx.Response(200, json=_session(3600, "refreshed"))
+
+
+class CountingStorage(SyncMemoryStorage):
+    def __init__(self) -> None:
+        super().__init__()
+        self.reads = 0
+
+    def get_item(self, key: str):
+        self.reads += 1
+        return super().get_item(key)
+
+
+def _options(server: AuthServer, storage, **options) -> ClientOptions:
+    return mock_options(server, storage=storage, auto_refresh_token=False, **options)
+
+
+def test_session_is_served_from_memory_until_close_to_expiry() -> None:
+    storage = CountingStorage()
+    storage.set_item(STORAGE_KEY, json.dumps(_session(3600)))
+    client = Client(URL, KEY, _options(AuthServer(), storage))
+
+    for _ in range(5):
+        assert client.auth.get_session().user.id == "user-1"
+    assert storage.reads == 1
+    assert client.auth.get_claims()["sub"] == "user-1"
+
+    client.auth._remove_session()
+    client.auth._notify_all_subscribers("SIGNED_OUT", None)
+    assert client.auth.get_claims() is None
+
+
+def test_threads_share_one_refresh() -> None:
+    server = AuthServer()
+    storage = SyncMemoryStorage()
+    storage.set_item(STORAGE_KEY, json.dumps(_session(5)))
+    client = Client(URL, KEY, _options(server, storage))
+    users: List[str] = []
+
+    threads = [
+        threading.Thread(target=lambda: users.append(client.auth.get_session().user.id))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert users == ["refreshed"] * 8
+    assert len(server.refreshes) == 1
+
+
+def test_coroutines_share_one_refresh() -> None:
+    server = AuthServer()
+
+    async def run() -> List[str]:
+        storage = AsyncMemoryStorage()
+        await storage.set_item(STORAGE_KEY, json.dumps(_session(5)))
+        client = AsyncClient(URL, KEY, _options(server, storage))
+        sessions = await asyncio.gather(*(client.auth.get_session() for _ in range(8)))
+        return [session.user.id for session in sessions]
+
+    assert asyncio.run(run()) == ["refreshed"] * 8
+    assert len(server.refreshes) == 1
+
+
+def test_clients_sharing_a_storage_refresh_once(tmp_path) -> None:
+    server = AuthServer()
+    storage = SyncMemoryStorage()
+    storage.set_item(STORAGE_KEY, json.dumps(_session(5)))
+    options = _options(
+        server, storage, refresh_lock_path=str(tmp_path / "refresh.lock")
+    )
+    # separate clients stand in for processes: only the file lock is shared
+    clients = [Client(URL, KEY, options) for _ in range(4)]
+    users: List[str] = []
+
+    threads = [
+        threading.Thread(target=lambda c=c: users.append(c.auth.get_session().user.id))
+        for c in clients
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert users == ["refreshed"] * 4
+    assert len(server.refreshes) == 1
+
+
+def test_timer_refreshes_a_session_just_over_the_expiry_margin() -> None:
+    server = AuthServer()
+    storage = SyncMemoryStorage()
+    # the auto refresh timer often fires with a little more than the margin left
+    storage.set_item(STORAGE_KEY, json.dumps(_session(EXPIRY_MARGIN + 2)))
+    client = Client(URL, KEY, _options(server, storage))
+    events: List[str] = []
+    client.auth.on_auth_state_change(lambda event, session: events.append(event))
+
+    # what the timer does
+    session = client.auth.get_session()
+    refreshed = client.auth._call_refresh_token(session.refresh_token)
+
+    assert refreshed.user.id == "refreshed"
+    assert len(server.refreshes) == 1
+    assert json.loads(server.refreshes[0].content) == {
+        "refresh_token": "refresh-user-1"
+    }
+    assert events == ["TOKEN_REFRESHED"]
+    assert client.auth.get_session().user.id == "refreshed"
+
+
+def test_sessions_refreshed_elsewhere_are_reused() -> None:
+    server = AuthServer()
+    storage = SyncMemoryStorage()
+    storage.set_item(STORAGE_KEY, json.dumps(_session(EXPIRY_MARGIN + 2)))
+    client = Client(URL, KEY, _options(server, storage))
+    session = client.auth.get_session()
+
+    # another process refreshed it, rotating the refresh token
+    storage.set_item(STORAGE_KEY, json.dumps(_session(3600, "rotated")))
+    assert client.auth._call_refresh_token(session.refresh_token).user.id == ("rotated")
+    # or without rotating it, in which case it expires later
+    session = client.auth.get_session()
+    storage.set_item(STORAGE_KEY, json.dumps(_session(7200, "rotated")))
+    reused = client.auth._call_refresh_token(session.refresh_token)
+    assert reused.expires_at > session.expires_at
+    assert not server.refreshes
+
+    # an explicit refresh always asks the server
+    assert client.auth.refresh_session().user.id == "refreshed"
+    assert len(server.refreshes) == 1
+
+
+def test_file_lock_excludes_other_holders(tmp_path) -> None:
+    first, second = (FileLock(str(tmp_path / "lock")) for _ in range(2))
+
+    assert first.acquire()
+    assert not second.acquire()
+    first.release()
+    assert second.acquire()
+    second.release()
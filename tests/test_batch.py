@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+from gotrue import AsyncMemoryStorage
+
+from supabase._async.client import AsyncClient
+
+from .conftest import mock_client
+
+
+def _respond(request: httpx.Request) -> httpx.Response:
+    if request.url.path.endswith("/missing"):
+        return httpx.Response(404, json={"message": "relation does not exist"})
+    return httpx.Response(200, json=[{"path": request.url.path}])
+
+
+def test_batch_returns_results_in_order_with_errors() -> None:
+    client = mock_client(_respond)
+
+    results = client.batch(
+        [
+            client.table("countries").select("*"),
+            client.table("missing").select("*"),
+            client.rpc("hello_world"),
+        ],
+        concurrency=2,
+    )
+
+    assert [result.ok for result in results] == [True, False, True]
+    assert results[0].response.data == [{"path": "/rest/v1/countries"}]
+    assert results[1].error.message == "relation does not exist"
+    assert results[2].response.data == [{"path": "/rest/v1/rpc/hello_world"}]
+
+
+def test_async_batch_bounds_concurrency_and_times_out() -> None:
+    in_flight = 0
+    peak = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(1 if request.url.path.endswith("/slow") else 0.01)
+        in_flight -= 1
+        return _respond(request)
+
+    async def main() -> None:
+        client = mock_client(handler, AsyncClient, storage=AsyncMemoryStorage())
+        requests = [client.table(f"t{i}").select("*") for i in range(8)]
+        requests.append(client.table("slow").select("*"))
+
+        results = await client.batch(requests, concurrency=3, timeout=0.2)
+
+        assert peak <= 3
+        assert all(result.ok for result in results[:-1])
+        assert isinstance(results[-1].error, asyncio.TimeoutError)
+
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import List
+
+import httpx
+from gotrue import AsyncMemoryStorage
+
+from supabase._async.client import AsyncClient
+
+from .conftest import mock_client
+
+
+def _handler(bodies: List[list]):
+    failed_once = set()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        rows = json.loads(request.content)
+        first = rows[0]["id"]
+        if first == 10 and first not in failed_once:
+            failed_once.add(first)
+            return httpx.Response(503, json={"message": "unavailable"})
+        if first == 30:
+            return httpx.Response(409, json={"message": "conflict"})
+        assert request.url.params["on_conflict"] == "id"
+        assert "return=minimal" in request.headers["Prefer"]
+        bodies.append(rows)
+        return httpx.Response(201)
+
+    return handler
+
+
+def test_bulk_upsert_chunks_retries_and_reports() -> None:
+    bodies: List[list] = []
+    client = mock_client(_handler(bodies))
+    rows = ({"id": i} for i in range(45))
+
+    result = client.bulk_upsert(
+        "numbers", rows, chunk_size=10, concurrency=3, on_conflict="id"
+    )
+
+    assert sorted(row["id"] for body in bodies for row in body) == [
+        i for i in range(45) if not 30 <= i < 40
+    ]
+    assert (result.rows, result.chunks, result.retries) == (35, 4, 1)
+    assert [index for index, _ in result.errors] == [3]
+    assert result.errors[0][1].message == "conflict"
+    assert result.bytes == sum(
+        len(json.dumps(body, separators=(",", ":"))) for body in bodies
+    )
+    assert result.rows_per_second > 0
+
+
+def test_async_bulk_upsert() -> None:
+    bodies: List[list] = []
+
+    async def main() -> None:
+        client = mock_client(
+            _handler(bodies), AsyncClient, storage=AsyncMemoryStorage()
+        )
+        result = await client.bulk_upsert(
+            "numbers", [{"id": i} for i in range(25)], chunk_size=10, on_conflict="id"
+        )
+        assert result.ok
+        assert (result.rows, result.chunks, result.retries) == (25, 3, 1)
+
+    asyncio.run(main())
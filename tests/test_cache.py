@@ -0,0 +1,47 @@
+from supabase.lib.cache import LRUCache
+
+
+class TestLRUCache:
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_entries_expire_after_ttl(self):
+        now = [0.0]
+        cache = LRUCache(max_size=2, ttl=10, clock=lambda: now[0])
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=60)
+
+        now[0] = 30
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+        assert len(cache) == 1
+
+    def test_evicted_and_expired_entries_are_reported(self):
+        now = [0.0]
+        evicted = []
+        cache = LRUCache(
+            max_size=2,
+            ttl=10,
+            clock=lambda: now[0],
+            on_evict=lambda key, value: evicted.append((key, value)),
+        )
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.set("c", 3)
+        assert evicted == [("a", 1)]
+
+        now[0] = 30
+        assert cache.get("b") is None
+        assert evicted == [("a", 1), ("b", 2)]
+
+        cache.pop("c")
+        cache.clear()
+        assert len(evicted) == 2
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import asyncio
+from typing import List
+
+from supabase import ClientFactory
+from supabase._async.client import AsyncClient, AsyncClientFactory
+
+from .conftest import KEY, URL, MockServer, mock_options
+
+
+def _factory(server: MockServer, **kwargs) -> ClientFactory:
+    return ClientFactory(URL, KEY, mock_options(server), **kwargs)
+
+
+def test_for_user_sends_each_users_token(mock_server: MockServer) -> None:
+    factory = _factory(mock_server)
+
+    factory.for_user("alice-token").table("todos").select("*").execute()
+    factory.for_user("bob-token").storage.list_buckets()
+    factory.client.table("todos").select("*").execute()
+
+    assert [request.headers["Authorization"] for request in mock_server.requests] == [
+        "Bearer alice-token",
+        "Bearer bob-token",
+        f"Bearer {KEY}",
+    ]
+    assert "alice-token" not in factory.client.options.headers["Authorization"]
+
+
+def test_for_user_caches_clients_by_token() -> None:
+    factory = _factory(MockServer(), cache_size=2)
+
+    alice = factory.for_user("alice-token")
+    assert factory.for_user("alice-token") is alice
+
+    factory.for_user("bob-token")
+    factory.for_user("carol-token")
+    assert factory.for_user("alice-token") is not alice
+
+
+def test_user_clients_share_the_factory_transport() -> None:
+    factory = _factory(MockServer())
+    alice = factory.for_user("alice-token")
+
+    alice.close()
+    factory.for_user("bob-token").table("todos").select("*").execute()
+
+    assert alice.postgrest.session._transport._transport is factory.client._transport
+
+
+def test_evicted_and_remaining_user_clients_close_their_realtime(
+    mock_server: MockServer,
+) -> None:
+    closed: List[str] = []
+
+    def watch(client: AsyncClient, name: str) -> AsyncClient:
+        close = client.realtime.close
+
+        async def record() -> None:
+            closed.append(name)
+            await close()
+
+        client.realtime.close = record  # type: ignore[method-assign]
+        return client
+
+    async def main() -> None:
+        factory = AsyncClientFactory(URL, KEY, mock_options(mock_server), cache_size=1)
+        watch(factory.for_user("alice-token"), "alice")
+        watch(factory.for_user("bob-token"), "bob")
+        await asyncio.sleep(0)
+        assert closed == ["alice"]
+
+        await factory.aclose()
+
+    asyncio.run(main())
+    assert closed == ["alice", "bob"]
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import threading
+import time
+from typing import List
+
+import httpx
+import pytest
+from postgrest import APIError
+
+from supabase._async.client import AsyncClient
+
+from .conftest import MockServer, mock_client
+
+
+def _server(status: int = 200) -> MockServer:
+    async def respond(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.05)
+        if status != 200:
+            return httpx.Response(status, json={"message": "boom"})
+        return httpx.Response(200, json=[{"key": "theme", "value": "dark"}])
+
+    return MockServer(respond)
+
+
+def test_identical_reads_share_one_request() -> None:
+    server = _server()
+
+    async def run() -> list:
+        client = mock_client(server, AsyncClient, coalesce_reads=True)
+        query = client.table("config").select("*").eq("key", "theme")
+        return await asyncio.gather(*(query.execute() for _ in range(50)))
+
+    responses = asyncio.run(run())
+
+    assert len(server.requests) == 1
+    assert all(r.data == [{"key": "theme", "value": "dark"}] for r in responses)
+    # every caller gets its own rows
+    assert len({id(r.data[0]) for r in responses}) == 50
+
+
+def test_compressed_responses_are_shared() -> None:
+    async def respond(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.05)
+        body = gzip.compress(b'[{"id": 1}]')
+        return httpx.Response(200, content=body, headers={"Content-Encoding": "gzip"})
+
+    server = MockServer(respond)
+
+    async def run() -> list:
+        client = mock_client(server, AsyncClient, coalesce_reads=True)
+        query = client.table("config").select("*")
+        return await asyncio.gather(*(query.execute() for _ in range(2)))
+
+    responses = asyncio.run(run())
+
+    assert len(server.requests) == 1
+    assert [r.data for r in responses] == [[{"id": 1}]] * 2
+
+
+def test_different_reads_and_writes_are_sent() -> None:
+    server = _server()
+
+    async def run() -> None:
+        client = mock_client(server, AsyncClient, coalesce_reads=True)
+        config = client.table("config")
+        await asyncio.gather(
+            config.select("*").eq("key", "theme").execute(),
+            config.select("*").eq("key", "locale").execute(),
+            config.insert({"key": "a"}).execute(),
+            config.insert({"key": "a"}).execute(),
+        )
+
+    asyncio.run(run())
+
+    assert len(server.requests) == 4
+
+
+def test_errors_are_shared() -> None:
+    server = _server(status=500)
+
+    async def run() -> list:
+        client = mock_client(server, AsyncClient, coalesce_reads=True)
+        query = client.table("config").select("*")
+        return await asyncio.gather(
+            *(query.execute() for _ in range(3)), return_exceptions=True
+        )
+
+    errors = asyncio.run(run())
+
+    assert len(server.requests) == 1
+    assert all(isinstance(error, APIError) for error in errors)
+
+
+def test_a_cancelled_read_is_sent_again_for_the_others() -> None:
+    server = _server()
+
+    async def run() -> list:
+        client = mock_client(server, AsyncClient, coalesce_reads=True)
+        query = client.table("config").select("*")
+        first = asyncio.ensure_future(query.execute())
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(query.execute())
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return (await second).data
+
+    assert asyncio.run(run()) == [{"key": "theme", "value": "dark"}]
+    assert len(server.requests) == 2
+
+
+def test_sync_client_coalesces_reads_of_concurrent_threads() -> None:
+    def respond(request: httpx.Request) -> httpx.Response:
+        time.sleep(0.1)
+        return httpx.Response(200, json=[{"id": 1}])
+
+    server = MockServer(respond)
+    client = mock_client(server, coalesce_reads=True)
+    results: List[list] = []
+
+    def read() -> None:
+        results.append(client.table("config").select("*").execute().data)
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [[{"id": 1}]] * 8
+    assert len(server.requests) == 1
+
+
+@pytest.mark.parametrize("coalesce_reads", [False, True])
+def test_reads_in_sequence_are_all_sent(
+    mock_server: MockServer, coalesce_reads: bool
+) -> None:
+    client = mock_client(mock_server, coalesce_reads=coalesce_reads)
+    for _ in range(3):
+        client.table("config").select("*").execute()
+
+    assert len(mock_server.requests) == 3
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+import pytest
+from postgrest import APIError
+
+from supabase._async.client import AsyncClient
+
+from .conftest import MockServer, mock_client
+
+CSV = b'id,name,active,score\n1,"Santiago",t,1.5\n2,"",f,\n3,,t,2\n'
+
+
+def _csv(request: httpx.Request) -> httpx.Response:
+    if request.url.path.endswith("/missing"):
+        return httpx.Response(404, json={"message": "relation does not exist"})
+    return httpx.Response(200, content=CSV, headers={"Content-Type": "text/csv"})
+
+
+def test_csv_is_streamed() -> None:
+    server = MockServer(_csv)
+    query = mock_client(server).table("cities").select("*").eq("active", "true")
+
+    chunks = list(query.stream_csv(chunk_size=8))
+
+    assert b"".join(chunks) == CSV
+    assert max(len(chunk) for chunk in chunks) == 8
+    assert server.requests[0].headers["Accept"] == "text/csv"
+    assert server.requests[0].url.params["active"] == "eq.true"
+    # the builder is left untouched
+    assert "text/csv" not in query.headers.get("Accept", "")
+
+
+def test_csv_errors_are_raised() -> None:
+    query = mock_client(_csv).table("missing").select("*")
+
+    with pytest.raises(APIError):
+        list(query.stream_csv())
+
+
+def test_csv_is_streamed_by_the_async_client() -> None:
+    async def run() -> bytes:
+        query = mock_client(_csv, AsyncClient).table("cities").select("*")
+        return b"".join([chunk async for chunk in query.stream_csv()])
+
+    assert asyncio.run(run()) == CSV
+
+
+def test_execute_arrow() -> None:
+    pytest.importorskip("pyarrow")
+    server = MockServer(_csv)
+
+    table = mock_client(server).table("cities").select("*").execute_arrow()
+
+    assert server.requests[0].headers["Accept"] == "text/csv"
+    assert table.column("id").to_pylist() == [1, 2, 3]
+    assert table.column("name").to_pylist() == ["Santiago", "", None]
+    assert table.column("active").to_pylist() == [True, False, True]
+    assert table.column("score").to_pylist() == [1.5, None, 2.0]
+
+
+def test_to_pandas() -> None:
+    pytest.importorskip("pandas")
+
+    frame = mock_client(_csv).table("cities").select("*").to_pandas()
+
+    assert list(frame["id"]) == [1, 2, 3]
+    assert list(frame["active"]) == [True, False, True]
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import asyncio
+from typing import List
+
+import httpx
+from supafunc.errors import FunctionsHttpError
+
+from supabase._async.client import AsyncClient
+
+from .conftest import MockServer, mock_client
+
+EVENTS = b'data: {"n": 1}\n\ndata: {"n": 2}\n\n'
+
+
+def echo(request: httpx.Request) -> httpx.Response:
+    """Answers each function with its name, the streaming one with events."""
+    name = request.url.path.rsplit("/", 1)[-1]
+    if name == "events":
+        return httpx.Response(200, content=EVENTS)
+    if name == "broken":
+        return httpx.Response(500, json={"error": "broken"})
+    return httpx.Response(200, json={"name": name, "body": request.content.decode()})
+
+
+def test_responses_can_be_streamed() -> None:
+    functions = mock_client(echo).functions
+
+    assert b"".join(functions.invoke_stream("events")) == EVENTS
+    assert list(functions.invoke_stream("events", lines=True)) == [
+        'data: {"n": 1}',
+        "",
+        'data: {"n": 2}',
+        "",
+    ]
+
+
+def test_streaming_an_error_raises() -> None:
+    try:
+        list(mock_client(echo).functions.invoke_stream("broken"))
+    except FunctionsHttpError as exc:
+        assert exc.message == "broken"
+    else:
+        raise AssertionError("the error was not raised")
+
+
+def test_responses_can_be_streamed_by_the_async_client() -> None:
+    async def run() -> List[str]:
+        client = mock_client(echo, AsyncClient)
+        return [
+            line async for line in client.functions.invoke_stream("events", lines=True)
+        ]
+
+    assert asyncio.run(run())[0] == 'data: {"n": 1}'
+
+
+def test_invoke_many_keeps_the_order_and_collects_errors() -> None:
+    results = mock_client(echo).functions.invoke_many(
+        [
+            ("first", {"body": b"1", "responseType": "json"}),
+            ("broken", None),
+            ("third", {"body": b"3", "responseType": "json"}),
+        ],
+        concurrency=2,
+    )
+
+    assert results[0].response == {"name": "first", "body": "1"}
+    assert isinstance(results[1].error, FunctionsHttpError)
+    assert results[2].response == {"name": "third", "body": "3"}
+
+
+def test_invoke_many_by_the_async_client() -> None:
+    async def run() -> list:
+        client = mock_client(echo, AsyncClient)
+        invocations = [(f"f{i}", {"responseType": "json"}) for i in range(20)]
+        return await client.functions.invoke_many(invocations, concurrency=4)
+
+    results = asyncio.run(run())
+    assert [result.response["name"] for result in results] == [
+        f"f{i}" for i in range(20)
+    ]
+
+
+def test_functions_can_have_their_own_timeout() -> None:
+    server = MockServer(lambda request: httpx.Response(200, json={}))
+
+    functions = mock_client(
+        server, function_client_timeout=10, function_timeouts={"report": 60}
+    ).functions
+    functions.invoke("quick")
+    functions.invoke("report")
+
+    timeouts = [request.extensions["timeout"] for request in server.requests]
+    assert timeouts[0]["read"] == 10
+    assert timeouts[1]["read"] == 60
+
+
+def test_invocation_headers_are_not_kept() -> None:
+    server = MockServer(lambda request: httpx.Response(200, json={}))
+
+    functions = mock_client(server).functions
+    functions.invoke("first", {"headers": {"X-Region": "eu-west-1"}})
+    functions.invoke("second")
+
+    headers = [request.headers for request in server.requests]
+    assert headers[0]["X-Region"] == "eu-west-1"
+    assert "X-Region" not in headers[1]
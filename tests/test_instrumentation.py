@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Tuple
+
+import httpx
+import pytest
+
+from supabase import Client, ClientOptions, Instrumentation
+from supabase.lib.instrumentation import LatencyHistogram
+
+from .conftest import KEY, MockServer, mock_client
+
+
+def handler(request: httpx.Request) -> httpx.Response:
+    if request.url.path.endswith("/missing"):
+        return httpx.Response(404, json={"message": "not found"})
+    return httpx.Response(200, json=[])
+
+
+def test_requests_are_measured_per_service_and_resource() -> None:
+    seen: List[str] = []
+    answered: List[Tuple[int, float]] = []
+    instrumentation = Instrumentation(
+        request_hooks=[lambda request: seen.append(request.url.path)],
+        response_hooks=[
+            lambda request, response, elapsed: answered.append(
+                (response.status_code, elapsed)
+            )
+        ],
+    )
+    client = mock_client(handler, instrumentation=instrumentation)
+
+    client.table("countries").select("*").execute()
+    client.table("countries").select("*").execute()
+    client.rpc("add", {"a": 1}).execute()
+    client.storage.list_buckets()
+    with pytest.raises(Exception):
+        client.functions.invoke("missing")
+
+    metrics = client.metrics()
+    summary = {
+        (r["service"], r["resource"], r["method"]): (r["latency"]["count"], r["errors"])
+        for r in metrics["requests"]
+    }
+    assert summary == {
+        ("rest", "countries", "GET"): (2, 0),
+        ("rest", "rpc/add", "POST"): (1, 0),
+        ("storage", "bucket", "GET"): (1, 0),
+        ("functions", "missing", "POST"): (1, 1),
+    }
+    assert len(seen) == len(answered) == 5
+    assert answered[-1][0] == 404
+    assert metrics["pool"] is None
+    json.dumps(metrics)
+
+
+def test_histogram_percentiles_are_within_its_precision() -> None:
+    histogram = LatencyHistogram(precision=0.01)
+    for millisecond in range(1, 1001):
+        histogram.record(millisecond / 1000)
+
+    assert histogram.count == 1000
+    assert histogram.percentile(50) == pytest.approx(0.5, rel=0.02)
+    assert histogram.percentile(99) == pytest.approx(0.99, rel=0.02)
+    assert histogram.max == 1.0
+    assert histogram.snapshot()["min"] == pytest.approx(0.001)
+
+
+class EmptyTable(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"[]")
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def test_connection_setup_and_pool_usage_are_reported() -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EmptyTable)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}"
+        options = ClientOptions(instrumentation=Instrumentation())
+        with Client(url, KEY, options) as client:
+            client.table("countries").select("*").execute()
+            client.table("countries").select("*").execute()
+            metrics = client.metrics()
+    finally:
+        server.shutdown()
+
+    assert metrics["connections"]["connect"]["count"] == 1
+    assert metrics["pool"] == {"connections": 1, "idle": 1, "active": 0}
+
+
+def test_requests_are_not_measured_by_default(mock_server: MockServer) -> None:
+    client = mock_client(mock_server)
+    client.table("countries").select("*").execute()
+
+    assert client.instrumentation is None
+    assert "trace" not in mock_server.requests[0].extensions
+    assert client.metrics() == {"requests": [], "connections": None, "pool": None}
+
+
+def test_requests_are_traced() -> None:
+    pytest.importorskip("opentelemetry.sdk")
+    from opentelemetry import trace
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+        InMemorySpanExporter,
+    )
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    server = MockServer(handler)
+
+    client = mock_client(server, instrumentation=Instrumentation(tracing=True))
+    client.table("countries").select("*").execute()
+
+    (span,) = exporter.get_finished_spans()
+    assert span.name == "rest GET countries"
+    assert span.attributes["http.response.status_code"] == 200
+    assert "traceparent" in server.requests[0].headers
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import json
+import sys
+from typing import Any, List
+
+import httpx
+import pytest
+from postgrest import APIError
+
+from supabase import JSONCodec, ResponseCache
+from supabase._async.client import AsyncClient
+from supabase.lib.json_codec import resolve_codec
+
+from .conftest import MockServer, mock_client
+
+
+class RecordingCodec(JSONCodec):
+    """The standard library codec, counting its calls."""
+
+    def __init__(self) -> None:
+        self.encoded: List[Any] = []
+        self.decoded = 0
+
+    def dumps(self, obj: Any) -> bytes:
+        self.encoded.append(obj)
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+    def loads(self, data: bytes) -> Any:
+        self.decoded += 1
+        return super().loads(data)
+
+
+def _echo() -> MockServer:
+    def respond(request: httpx.Request) -> httpx.Response:
+        if request.method == "GET":
+            return httpx.Response(200, json=[{"id": 1}])
+        if "functions" in request.url.path:
+            return httpx.Response(200, content=request.content)
+        return httpx.Response(201, content=b"[" + request.content + b"]")
+
+    return MockServer(respond)
+
+
+def test_codecs_are_resolved() -> None:
+    codec = RecordingCodec()
+
+    assert resolve_codec("json") is None
+    assert resolve_codec(codec) is codec
+    with pytest.raises(ValueError):
+        resolve_codec("yaml")
+
+
+def test_missing_libraries_fall_back_to_the_standard_library(monkeypatch) -> None:
+    monkeypatch.setitem(sys.modules, "orjson", None)
+
+    assert resolve_codec("orjson") is None
+
+
+def test_bodies_and_responses_go_through_the_codec() -> None:
+    server = _echo()
+    codec = RecordingCodec()
+    client = mock_client(server, json_codec=codec)
+
+    inserted = client.table("countries").insert({"id": 2, "name": "Chile"}).execute()
+    selected = client.table("countries").select("*").execute()
+
+    assert inserted.data == [{"id": 2, "name": "Chile"}]
+    assert selected.data == [{"id": 1}]
+    assert codec.encoded[0] == {"id": 2, "name": "Chile"}
+    assert codec.decoded == 2
+    assert server.requests[0].content == b'{"id":2,"name":"Chile"}'
+    assert server.requests[0].headers["Content-Type"] == "application/json"
+
+
+def test_cached_responses_go_through_the_codec() -> None:
+    codec = RecordingCodec()
+    client = mock_client(_echo(), json_codec=codec, response_cache=ResponseCache())
+
+    for _ in range(2):
+        assert client.table("countries").select("*").execute().data == [{"id": 1}]
+    assert codec.decoded == 2
+
+
+def test_functions_and_async_clients_use_the_codec() -> None:
+    codec = RecordingCodec()
+
+    async def run() -> Any:
+        client = mock_client(_echo(), AsyncClient, json_codec=codec)
+        return await client.functions.invoke(
+            "echo", {"body": {"hello": "world"}, "responseType": "json"}
+        )
+
+    assert asyncio.run(run()) == {"hello": "world"}
+    assert codec.encoded == [{"hello": "world"}]
+    assert codec.decoded == 1
+
+
+def test_orjson_codec() -> None:
+    pytest.importorskip("orjson")
+    server = _echo()
+    client = mock_client(server, json_codec="orjson")
+
+    day = datetime.date(2024, 3, 1)
+    client.table("events").insert({"day": day, 1: "non-string key"}).execute()
+
+    assert json.loads(server.requests[0].content) == {
+        "day": "2024-03-01",
+        "1": "non-string key",
+    }
+
+
+@pytest.mark.parametrize("name", ["json", "orjson", "msgspec"])
+def test_non_json_error_bodies_raise_api_errors(name: str) -> None:
+    if name != "json":
+        pytest.importorskip(name)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(502, text="<html>Bad Gateway</html>")
+
+    client = mock_client(handler, json_codec=name)
+
+    with pytest.raises(APIError):
+        client.table("countries").select("*").execute()
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+
+# Sub-SDKs that must only be imported once the matching client is used, and
+# sqlite3, only needed by the SQLite session storage.
+DEFERRED = ["storage3", "supafunc", "realtime", "sqlite3"]
+
+
+def _loaded_after(code: str) -> list:
+    script = f"import json, sys\n{code}\nprint(json.dumps(sorted(sys.modules)))"
+    output = subprocess.check_output([sys.executable, "-c", script], text=True)
+    modules = set(json.loads(output))
+    return [name for name in DEFERRED if name in modules]
+
+
+def test_import_does_not_load_unused_sub_sdks() -> None:
+    assert _loaded_after("import supabase") == []
+
+
+def test_table_only_usage_does_not_load_unused_sub_sdks() -> None:
+    code = (
+        "from supabase import create_client\n"
+        "client = create_client('https://x.supabase.co', 'a.b.c')\n"
+        "client.table('countries').select('*')"
+    )
+    assert _loaded_after(code) == []
+
+
+def test_sub_sdks_load_on_first_use() -> None:
+    code = (
+        "import supabase\n"
+        "client = supabase.Client('https://x.supabase.co', 'a.b.c')\n"
+        "client.storage, client.functions, supabase.SupabaseRealtimeClient"
+    )
+    assert _loaded_after(code) == ["storage3", "supafunc", "realtime"]
+
+
+def test_session_storages_load_on_first_use() -> None:
+    code = "import supabase\nsupabase.SQLiteStorage, supabase.AsyncFileStorage"
+    assert _loaded_after(code) == ["sqlite3"]
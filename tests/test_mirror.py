@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, Dict, List, Optional
+
+import httpx
+import websockets
+
+from supabase import ClientOptions
+from supabase._async.client import AsyncClient
+from supabase.lib.mirror import MirrorStore
+
+from .conftest import KEY
+
+COLUMNS = [
+    {"name": "id", "type": "int8"},
+    {"name": "code", "type": "text"},
+    {"name": "region", "type": "text"},
+    {"name": "updated_at", "type": "timestamptz"},
+]
+
+
+class Backend:
+    """Serves `rows` over PostgREST and pushes changes over a realtime socket."""
+
+    def __init__(self, rows: List[Dict[str, Any]]) -> None:
+        self.rows = rows
+        self.reads = 0
+        self.sockets: List[Any] = []
+        self.topics: List[str] = []
+
+    def rest(self, request: httpx.Request) -> httpx.Response:
+        if "id" in request.url.params:
+            # the page after the last one
+            return httpx.Response(200, json=[])
+        self.reads += 1
+        return httpx.Response(200, json=self.rows)
+
+    async def realtime(self, ws: Any, path: str = "") -> None:
+        self.sockets.append(ws)
+        async for raw in ws:
+            message = json.loads(raw)
+            response: Dict[str, Any] = {}
+            if message["event"] == "phx_join":
+                self.topics.append(message["topic"])
+                changes = message["payload"]["config"]["postgres_changes"]
+                response = {"postgres_changes": [{**c, "id": 7} for c in changes]}
+            await ws.send(
+                json.dumps(
+                    {
+                        "topic": message["topic"],
+                        "event": "phx_reply",
+                        "ref": message["ref"],
+                        "payload": {"status": "ok", "response": response},
+                    }
+                )
+            )
+
+    async def change(
+        self, type: str, record: Dict[str, Any], old: Optional[Dict[str, Any]] = None
+    ) -> None:
+        data = {
+            "schema": "public",
+            "table": "countries",
+            "type": type,
+            "columns": COLUMNS,
+            "record" if type != "DELETE" else "old_record": record,
+        }
+        if old is not None:
+            data["old_record"] = old
+        for topic in self.topics:
+            await self.sockets[-1].send(
+                json.dumps(
+                    {
+                        "topic": topic,
+                        "event": "postgres_changes",
+                        "ref": None,
+                        "payload": {"ids": [7], "data": data},
+                    }
+                )
+            )
+
+
+async def _wait_for(condition, timeout: float = 2.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+
+def _run(test) -> None:
+    backend = Backend(
+        [
+            {
+                "id": 1,
+                "code": "CL",
+                "region": "americas",
+                "updated_at": "2024-03-01T12:30:00+00:00",
+            },
+            {"id": 2, "code": "FR", "region": "europe"},
+        ]
+    )
+
+    async def main() -> None:
+        async with websockets.serve(backend.realtime, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            options = ClientOptions(
+                http_transport=httpx.MockTransport(backend.rest),
+                realtime={"max_reconnect_delay": 0.05},
+            )
+            client = AsyncClient(f"http://127.0.0.1:{port}", KEY, options)
+            await test(backend, client)
+
+    asyncio.run(main())
+
+
+def test_store_keeps_secondary_indexes_up_to_date() -> None:
+    store = MirrorStore(["id"], indexes=["region"])
+    store.put({"id": 1, "region": "europe"})
+    store.put({"id": 2, "region": "europe"})
+    store.put({"id": 1, "region": "asia"})
+    store.delete(2)
+
+    assert store.find("region", "europe") == []
+    assert store.find("region", "asia") == [{"id": 1, "region": "asia"}]
+    assert store.find("missing", None) == [{"id": 1, "region": "asia"}]
+
+
+def test_store_composite_keys() -> None:
+    store = MirrorStore(["tenant", "id"])
+    store.put({"tenant": "a", "id": 1})
+
+    assert store.get(("a", 1)) == {"tenant": "a", "id": 1}
+    assert ("b", 1) not in store
+
+
+def test_mirror_applies_changes() -> None:
+    async def test(backend: Backend, client: AsyncClient) -> None:
+        async with await client.mirror("countries", indexes=["region"]) as mirror:
+            assert len(mirror) == 2
+            assert mirror.get(1)["code"] == "CL"
+
+            await backend.change(
+                "INSERT", {"id": "3", "code": "DE", "region": "europe"}
+            )
+            await backend.change("UPDATE", {"id": "1", "code": "CL", "region": "south"})
+            await backend.change("DELETE", {"id": "2"})
+            await _wait_for(lambda: 2 not in mirror)
+
+            assert mirror.get(3) == {"id": 3, "code": "DE", "region": "europe"}
+            assert [row["id"] for row in mirror.find("region", "europe")] == [3]
+            assert mirror.find("region", "south")[0]["id"] == 1
+        assert client.get_channels() == []
+
+    _run(test)
+
+
+def test_mirror_reads_the_table_again_after_a_reconnection() -> None:
+    async def test(backend: Backend, client: AsyncClient) -> None:
+        mirror = await client.mirror("countries")
+        backend.rows = [{"id": 5, "code": "JP", "region": "asia"}]
+        await backend.sockets[-1].close()
+
+        await _wait_for(lambda: mirror.resyncs == 1 and not mirror.syncing)
+        assert backend.reads == 2
+        assert [row["id"] for row in mirror] == [5]
+        await mirror.close()
+
+    _run(test)
+
+
+def test_mirror_moves_rows_whose_key_is_updated() -> None:
+    async def test(backend: Backend, client: AsyncClient) -> None:
+        async with await client.mirror("countries", indexes=["region"]) as mirror:
+            await backend.change(
+                "UPDATE", {"id": "9", "code": "CL", "region": "south"}, {"id": "1"}
+            )
+            await _wait_for(lambda: 9 in mirror)
+
+            assert 1 not in mirror
+            assert [row["id"] for row in mirror.find("region", "americas")] == []
+
+    _run(test)
+
+
+def test_mirror_skips_changes_without_the_key() -> None:
+    async def test(backend: Backend, client: AsyncClient) -> None:
+        async with await client.mirror(
+            "countries", key="code", order_by="id"
+        ) as mirror:
+            # the replica identity only sends the primary key
+            await backend.change("DELETE", {"id": "1"})
+            await backend.change("INSERT", {"id": "3", "code": "DE"})
+            await _wait_for(lambda: "DE" in mirror)
+
+            assert "CL" in mirror
+            assert client.realtime.is_connected
+
+    _run(test)
+
+
+def test_mirrors_of_the_same_table_do_not_share_a_channel() -> None:
+    async def test(backend: Backend, client: AsyncClient) -> None:
+        first = await client.mirror("countries")
+        second = await client.mirror("countries", indexes=["region"])
+        assert len(client.get_channels()) == 2
+
+        await backend.change("INSERT", {"id": "3", "code": "DE"})
+        await _wait_for(lambda: 3 in first and 3 in second)
+        await first.close()
+        await backend.change("DELETE", {"id": "3"})
+        await _wait_for(lambda: 3 not in second)
+        await second.close()
+
+    _run(test)
+
+
+def test_rows_read_and_changed_hold_the_same_timestamps() -> None:
+    async def test(backend: Backend, client: AsyncClient) -> None:
+        async with await client.mirror("countries") as mirror:
+            await backend.change(
+                "UPDATE",
+                {"id": "2", "code": "FR", "updated_at": "2024-03-01 12:30:00+00"},
+            )
+            await _wait_for(lambda: "updated_at" in mirror.get(2))
+
+            assert mirror.get(1)["updated_at"] == "2024-03-01T12:30:00+00:00"
+            assert mirror.get(2)["updated_at"] == "2024-03-01T12:30:00+00:00"
+
+    _run(test)
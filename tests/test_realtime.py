@@ -0,0 +1,412 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from types import SimpleNamespace
+from typing import Any, Dict, List, Tuple
+
+import pytest
+import websockets
+
+from supabase._async.client import AsyncClient
+from supabase._async.realtime_client import AsyncRealtimeClient, ChangeQueue
+from supabase.lib.realtime_payload import ChangePayload, PayloadDecoder
+
+from .conftest import KEY, MockServer, mock_client
+
+
+class PhoenixServer:
+    """A minimal realtime server: acknowledges joins and pushes changes."""
+
+    def __init__(self) -> None:
+        self.joins: List[Dict[str, Any]] = []
+        self.connections = 0
+        self.sockets: List[Any] = []
+        self.events: List[Tuple[str, str]] = []
+
+    async def handler(self, ws: Any, path: str = "") -> None:
+        self.connections += 1
+        self.sockets.append(ws)
+        async for raw in ws:
+            message = json.loads(raw)
+            self.events.append((message["topic"], message["event"]))
+            response: Dict[str, Any] = {}
+            if message["event"] == "phx_join":
+                self.joins.append(message)
+                changes = message["payload"]["config"]["postgres_changes"]
+                response = {
+                    "postgres_changes": [
+                        {**change, "id": 100 + i} for i, change in enumerate(changes)
+                    ]
+                }
+            await ws.send(
+                json.dumps(
+                    {
+                        "topic": message["topic"],
+                        "event": "phx_reply",
+                        "ref": message["ref"],
+                        "payload": {"status": "ok", "response": response},
+                    }
+                )
+            )
+
+    async def push_change(self, topic: str, ids: List[int], record: Any) -> None:
+        data = {
+            "schema": "public",
+            "table": "todos",
+            "type": "INSERT",
+            "columns": [{"name": "id", "type": "int8"}],
+            "record": record,
+        }
+        payload = {"ids": ids, "data": data}
+        await self.sockets[-1].send(
+            json.dumps(
+                {
+                    "topic": topic,
+                    "event": "postgres_changes",
+                    "ref": None,
+                    "payload": payload,
+                }
+            )
+        )
+
+
+async def _wait_for(condition, timeout: float = 2.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+
+def _run(test) -> None:
+    async def main() -> None:
+        server = PhoenixServer()
+        async with websockets.serve(server.handler, "127.0.0.1", 0) as ws_server:
+            port = ws_server.sockets[0].getsockname()[1]
+            await test(server, f"ws://127.0.0.1:{port}")
+
+    asyncio.run(main())
+
+
+def test_changes_are_routed_to_the_matching_binding() -> None:
+    async def test(server: PhoenixServer, url: str) -> None:
+        realtime = AsyncRealtimeClient(url, KEY)
+        inserts: List[Any] = []
+        deletes: List[Any] = []
+        channel = (
+            realtime.channel("db")
+            .on_postgres_changes("INSERT", inserts.append, table="todos")
+            .on_postgres_changes("DELETE", deletes.append, table="todos")
+        )
+        await channel.subscribe()
+
+        config = server.joins[0]["payload"]["config"]
+        assert config["postgres_changes"] == [
+            {"event": "INSERT", "schema": "public", "table": "todos"},
+            {"event": "DELETE", "schema": "public", "table": "todos"},
+        ]
+        assert server.joins[0]["payload"]["access_token"] == KEY
+
+        await server.push_change("realtime:db", [100], {"id": "1"})
+        await _wait_for(lambda: inserts)
+        assert inserts[0].new == {"id": 1}
+        assert deletes == []
+        await realtime.close()
+
+    _run(test)
+
+
+def test_batched_callbacks_receive_lists_of_changes() -> None:
+    async def test(server: PhoenixServer, url: str) -> None:
+        realtime = AsyncRealtimeClient(url, KEY)
+        batches: List[List[Any]] = []
+        channel = realtime.channel("db").on_postgres_changes(
+            "*", batches.append, batch_size=3, batch_interval=0.05
+        )
+        await channel.subscribe()
+
+        for i in range(4):
+            await server.push_change("realtime:db", [100], {"id": i})
+        await _wait_for(lambda: len(batches) == 2)
+        assert [len(batch) for batch in batches] == [3, 1]
+        await realtime.close()
+
+    _run(test)
+
+
+def test_channels_are_joined_again_after_reconnecting() -> None:
+    async def test(server: PhoenixServer, url: str) -> None:
+        realtime = AsyncRealtimeClient(url, KEY, max_reconnect_delay=0.05)
+        received: List[Any] = []
+        await realtime.channel("db").on_postgres_changes(
+            "*", received.append
+        ).subscribe()
+
+        await server.sockets[-1].close()
+        await _wait_for(lambda: len(server.joins) == 2)
+        assert server.connections == 2
+
+        await server.push_change("realtime:db", [100], {"id": 1})
+        await _wait_for(lambda: received)
+        await realtime.close()
+
+    _run(test)
+
+
+def test_client_channels_share_one_socket() -> None:
+    async def test(server: PhoenixServer, url: str) -> None:
+        client = AsyncClient("http://localhost", KEY)
+        client.realtime = AsyncRealtimeClient(url, KEY)
+        first = await client.channel("one").subscribe()
+        await client.channel("two").subscribe()
+        assert server.connections == 1
+        assert len(client.get_channels()) == 2
+
+        client._listen_to_auth_events("TOKEN_REFRESHED", None)
+        await client.remove_channel(first)
+        assert [channel.topic for channel in client.get_channels()] == ["realtime:two"]
+        await client.remove_all_channels()
+        assert not client.realtime.is_connected
+        await client.aclose()
+
+    _run(test)
+
+
+def test_a_failing_callback_does_not_stop_the_socket() -> None:
+    async def test(server: PhoenixServer, url: str) -> None:
+        realtime = AsyncRealtimeClient(url, KEY)
+        received: List[Any] = []
+
+        def callback(change: ChangePayload) -> None:
+            received.append(change)
+            raise ValueError("user bug")
+
+        await realtime.channel("db").on_postgres_changes("*", callback).subscribe()
+        await server.push_change("realtime:db", [100], {"id": 1})
+        await server.push_change("realtime:db", [100], {"id": 2})
+        await _wait_for(lambda: len(received) == 2)
+
+        assert realtime.is_connected
+        assert server.connections == 1
+        await realtime.close()
+
+    _run(test)
+
+
+def test_malformed_messages_are_skipped() -> None:
+    async def test(server: PhoenixServer, url: str) -> None:
+        realtime = AsyncRealtimeClient(url, KEY)
+        received: List[Any] = []
+        await realtime.channel("db").on_postgres_changes(
+            "*", received.append
+        ).subscribe()
+        ws = server.sockets[-1]
+        await ws.send("not json")
+        await ws.send(json.dumps({"topic": "realtime:db", "ref": None}))
+        await ws.send(
+            json.dumps(
+                {
+                    "topic": "realtime:db",
+                    "event": "postgres_changes",
+                    "ref": None,
+                    "payload": {"ids": [100]},
+                }
+            )
+        )
+        await server.push_change("realtime:db", [100], {"id": 1})
+        await _wait_for(lambda: received)
+
+        assert received[0].new == {"id": 1}
+        assert server.connections == 1
+        await realtime.close()
+
+    _run(test)
+
+
+def test_close_leaves_the_joined_channels() -> None:
+    async def test(server: PhoenixServer, url: str) -> None:
+        realtime = AsyncRealtimeClient(url, KEY)
+        channel = await realtime.channel("db").subscribe()
+        await realtime.close()
+
+        assert server.events[-1] == ("realtime:db", "phx_leave")
+        assert channel.state == "closed"
+
+    _run(test)
+
+
+def _change(id: int, name: str = "") -> ChangePayload:
+    return ChangePayload(
+        "public", "todos", None, "UPDATE", {"id": id, "name": name}, None
+    )
+
+
+async def _drain(queue: ChangeQueue) -> List[Any]:
+    queue.close()
+    return [change async for change in queue]
+
+
+def test_queue_drop_oldest_keeps_the_newest_changes() -> None:
+    async def test() -> None:
+        queue = ChangeQueue(max_size=2, overflow="drop_oldest")
+        for i in range(5):
+            await queue.put(_change(i))
+
+        assert [change.new["id"] for change in await _drain(queue)] == [3, 4]
+        metrics = queue.metrics()
+        assert (metrics.received, metrics.dropped, metrics.max_depth) == (5, 3, 2)
+
+    asyncio.run(test())
+
+
+def test_queue_coalesce_replaces_pending_changes_to_the_same_row() -> None:
+    async def test() -> None:
+        queue = ChangeQueue(max_size=2, overflow="coalesce")
+        await queue.put(_change(1, "a"))
+        await queue.put(_change(2, "b"))
+        await queue.put(_change(1, "c"))
+        await queue.put(_change(3, "d"))
+
+        changes = [change.new for change in await _drain(queue)]
+        assert changes == [{"id": 2, "name": "b"}, {"id": 3, "name": "d"}]
+        assert (queue.coalesced, queue.dropped) == (1, 1)
+
+    asyncio.run(test())
+
+
+def test_queue_block_waits_for_the_consumer() -> None:
+    async def test() -> None:
+        queue = ChangeQueue(max_size=1)
+        await queue.put(_change(1))
+        producer = asyncio.ensure_future(queue.put(_change(2)))
+        await asyncio.sleep(0.01)
+        assert not producer.done()
+
+        assert (await queue.__anext__()).new["id"] == 1
+        await producer
+        assert len(queue) == 1
+        assert queue.dropped == 0
+
+    asyncio.run(test())
+
+
+def test_changes_without_a_callback_are_iterated_from_the_channel() -> None:
+    async def test(server: PhoenixServer, url: str) -> None:
+        realtime = AsyncRealtimeClient(url, KEY)
+        channel = realtime.channel("db").on_postgres_changes("*").buffer(max_size=10)
+        await channel.subscribe()
+        for i in range(3):
+            await server.push_change("realtime:db", [100], {"id": i})
+        await _wait_for(lambda: len(channel.queue) == 3)
+
+        await channel.unsubscribe()
+        assert [change.new["id"] async for change in channel] == [0, 1, 2]
+        await realtime.close()
+
+    _run(test)
+
+
+def test_decoder_converts_string_values_with_the_column_types() -> None:
+    data = {
+        "schema": "public",
+        "table": "todos",
+        "type": "UPDATE",
+        "columns": [
+            {"name": "id", "type": "int8"},
+            {"name": "done", "type": "bool"},
+            {"name": "tags", "type": "_int4"},
+            {"name": "meta", "type": "jsonb"},
+            {"name": "title", "type": "text"},
+        ],
+        "record": {"id": "7", "done": "t", "tags": "{1,2}", "meta": '{"a": 1}'},
+        "old_record": {"id": "7"},
+    }
+    decoder = PayloadDecoder()
+
+    change = decoder.decode(data)
+    assert change.new == {"id": 7, "done": True, "tags": [1, 2], "meta": {"a": 1}}
+    assert change["old"] == {"id": 7}
+    assert change["event_type"] == "UPDATE"
+
+    data["record"] = {"id": 8, "title": "already typed"}
+    assert decoder.decode(data).new == {"id": 8, "title": "already typed"}
+
+
+def test_legacy_payload_records_use_the_old_record() -> None:
+    from supabase.lib.realtime_client import SupabaseRealtimeClient
+
+    payload = SimpleNamespace(
+        schema="public",
+        table="todos",
+        commit_timestamp=None,
+        type="UPDATE",
+        columns=[{"name": "id", "type": "int4"}, {"name": "n", "type": "int4"}],
+        record={"id": "1", "n": "2"},
+        old_record={"id": "1", "n": "1"},
+    )
+
+    records = SupabaseRealtimeClient.get_payload_records(payload)
+    assert records == {"new": {"id": 1, "n": 2}, "old": {"id": 1, "n": 1}}
+
+
+def test_legacy_callbacks_receive_plain_dictionaries() -> None:
+    from supabase.lib.realtime_client import SupabaseRealtimeClient
+
+    handlers: Dict[str, Any] = {}
+    channel = SimpleNamespace(on=lambda event, cb: handlers.setdefault(event, cb))
+    socket = SimpleNamespace(
+        set_channel=lambda topic: SimpleNamespace(join=lambda: channel)
+    )
+    received: List[Any] = []
+    SupabaseRealtimeClient(socket, "public", "todos").on("INSERT", received.append)
+
+    handlers["INSERT"](
+        SimpleNamespace(
+            schema="public",
+            table="todos",
+            commit_timestamp="2024-03-01T12:00:00Z",
+            type="INSERT",
+            columns=[{"name": "id", "type": "int4"}],
+            record={"id": "1"},
+            old_record=None,
+        )
+    )
+
+    payload = received[0]
+    assert json.loads(json.dumps(payload)) == {
+        "schema": "public",
+        "table": "todos",
+        "commit_timestamp": "2024-03-01T12:00:00Z",
+        "event_type": "INSERT",
+        "new": {"id": 1},
+        "old": {},
+        "errors": None,
+    }
+
+
+def test_change_payloads_are_mappings() -> None:
+    change = _change(1, "a")
+
+    assert dict(change) == {
+        "schema": "public",
+        "table": "todos",
+        "commit_timestamp": None,
+        "event_type": "UPDATE",
+        "new": {"id": 1, "name": "a"},
+        "old": {},
+        "errors": None,
+    }
+    assert "errors" in change.keys()
+    assert change.get("missing", 0) == 0
+    assert json.dumps(change.to_dict())
+
+
+def test_the_sync_client_has_no_realtime_channels() -> None:
+    client = mock_client(MockServer())
+
+    with pytest.raises(NotImplementedError):
+        client.channel("room")
+    with pytest.raises(NotImplementedError):
+        client.mirror("countries")
+    assert client.get_channels() == []
+    client.close()
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+from types import SimpleNamespace
+
+import httpx
+
+from supabase import ResponseCache
+from supabase._async.client import AsyncClient
+
+from .conftest import MockServer, mock_client
+
+
+def _rows(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json=[{"id": 1}])
+
+
+def test_repeated_reads_are_served_from_cache() -> None:
+    server = MockServer(_rows)
+    client = mock_client(server, response_cache=ResponseCache(ttl=60))
+
+    first = client.table("countries").select("*").execute()
+    second = client.table("countries").select("*").execute()
+    client.table("countries").select("id").execute()
+
+    assert first.data == second.data == [{"id": 1}]
+    assert len(server.requests) == 2
+
+
+def test_cache_is_keyed_on_credentials() -> None:
+    server = MockServer(_rows)
+    client = mock_client(server, response_cache=ResponseCache(ttl=60))
+
+    client.table("countries").select("*").execute()
+    client.auth._notify_all_subscribers(
+        "SIGNED_IN", SimpleNamespace(access_token="user-token")
+    )
+    client.table("countries").select("*").execute()
+
+    assert len(server.requests) == 2
+
+
+def test_writes_bypass_and_invalidate_the_table() -> None:
+    server = MockServer(_rows)
+    client = mock_client(server, response_cache=ResponseCache(ttl=60))
+
+    client.table("countries").select("*").execute()
+    client.table("countries").insert({"id": 2}).execute()
+    client.table("countries").select("*").execute()
+
+    assert [request.method for request in server.requests] == ["GET", "POST", "GET"]
+
+
+def test_stale_entries_are_revalidated_with_etag() -> None:
+    now = [0.0]
+
+    def respond(request: httpx.Request) -> httpx.Response:
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, json=[{"id": 1}], headers={"ETag": '"v1"'})
+
+    server = MockServer(respond)
+    client = mock_client(
+        server, response_cache=ResponseCache(ttl=10, clock=lambda: now[0])
+    )
+
+    client.table("countries").select("*").execute()
+    now[0] = 20
+    response = client.table("countries").select("*").execute()
+    client.table("countries").select("*").execute()
+
+    assert response.data == [{"id": 1}]
+    assert len(server.requests) == 2
+    assert server.requests[1].headers["If-None-Match"] == '"v1"'
+
+
+def test_table_ttl_of_zero_disables_caching() -> None:
+    server = MockServer(_rows)
+    client = mock_client(server, response_cache=ResponseCache(table_ttls={"orders": 0}))
+
+    client.table("orders").select("*").execute()
+    client.table("orders").select("*").execute()
+
+    assert len(server.requests) == 2
+
+
+def _gzip(request: httpx.Request) -> httpx.Response:
+    if request.headers.get("If-None-Match") == '"v1"':
+        return httpx.Response(304)
+    body = gzip.compress(b'[{"id": 1}]')
+    headers = {"Content-Encoding": "gzip", "ETag": '"v1"'}
+    return httpx.Response(200, content=body, headers=headers)
+
+
+def test_compressed_responses_are_served_from_cache() -> None:
+    now = [0.0]
+    server = MockServer(_gzip)
+    cache = ResponseCache(ttl=10, clock=lambda: now[0])
+    client = mock_client(server, response_cache=cache)
+
+    results = [client.table("countries").select("*").execute().data]
+    results.append(client.table("countries").select("*").execute().data)
+    now[0] = 20
+    results.append(client.table("countries").select("*").execute().data)
+
+    assert results == [[{"id": 1}]] * 3
+    assert len(server.requests) == 2
+
+
+def test_compressed_responses_are_served_from_cache_by_the_async_client() -> None:
+    async def run() -> list:
+        client = mock_client(_gzip, AsyncClient, response_cache=ResponseCache())
+        query = client.table("countries").select("*")
+        return [(await query.execute()).data for _ in range(2)]
+
+    assert asyncio.run(run()) == [[{"id": 1}]] * 2
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Callable
+
+import httpx
+import pytest
+from postgrest import APIError
+
+from supabase import CircuitOpenError, Client, RetryPolicy
+from supabase._async.client import AsyncClient
+from supabase.lib.retry import CircuitBreaker
+
+from .conftest import MockServer, mock_client
+
+
+class Server(MockServer):
+    """Answers with the given responses in turn, then with an empty list."""
+
+    def __init__(self, *responses: Callable[[httpx.Request], httpx.Response]):
+        super().__init__(self._next)
+        self.responses = list(responses)
+
+    def _next(self, request: httpx.Request) -> httpx.Response:
+        if self.responses:
+            return self.responses.pop(0)(request)
+        return httpx.Response(200, json=[])
+
+
+def unavailable(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(503, json={"message": "busy"}, headers={"Retry-After": "0"})
+
+
+def reset(request: httpx.Request) -> httpx.Response:
+    raise httpx.ConnectError("connection refused", request=request)
+
+
+def _client(server: Server, **policy) -> Client:
+    policy.setdefault("backoff_base", 0.001)
+    return mock_client(server, retry_policy=RetryPolicy(**policy))
+
+
+def test_idempotent_requests_are_retried() -> None:
+    server = Server(unavailable, reset)
+    client = _client(server)
+
+    assert client.table("countries").select("*").execute().data == []
+    assert len(server.requests) == 3
+
+
+def test_unsafe_requests_are_only_retried_when_they_were_not_sent() -> None:
+    server = Server(reset, unavailable)
+    client = _client(server)
+
+    with pytest.raises(APIError):
+        client.table("countries").insert({"name": "Chile"}).execute()
+    assert len(server.requests) == 2
+
+    server = Server(unavailable)
+    client = _client(server)
+    client.functions.invoke(
+        "charge", {"headers": {"Idempotency-Key": "order-1"}, "body": {}}
+    )
+    assert len(server.requests) == 2
+
+
+def test_circuit_opens_after_consecutive_failures() -> None:
+    server = Server(*[unavailable] * 4)
+    client = _client(server, retries=1, failure_threshold=3)
+
+    with pytest.raises(APIError):
+        client.table("countries").select("*").execute()
+    with pytest.raises(CircuitOpenError):
+        client.table("countries").select("*").execute()
+    assert len(server.requests) == 3
+
+
+def test_open_circuit_lets_one_request_through_after_the_reset_timeout() -> None:
+    now = [0.0]
+    breaker = CircuitBreaker(2, reset_timeout=10, clock=lambda: now[0])
+    breaker.record(False)
+    breaker.record(False)
+
+    assert not breaker.allow()
+    now[0] = 10
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record(True)
+    assert breaker.allow()
+
+
+def slow(request: httpx.Request) -> httpx.Response:
+    time.sleep(0.5)
+    return httpx.Response(200, json=[{"slow": True}])
+
+
+def test_slow_reads_are_hedged() -> None:
+    server = Server(slow)
+    client = _client(server, hedge_after=0.05)
+
+    started = time.perf_counter()
+    assert client.table("countries").select("*").execute().data == []
+    assert time.perf_counter() - started < 0.4
+    assert len(server.requests) == 2
+
+
+def test_slow_reads_are_hedged_by_the_async_client() -> None:
+    async def slow_async(request: httpx.Request) -> httpx.Response:
+        if len(server.requests) == 1:
+            await asyncio.sleep(0.5)
+            return httpx.Response(200, json=[{"slow": True}])
+        return httpx.Response(200, json=[])
+
+    server = MockServer(slow_async)
+
+    async def run() -> list:
+        policy = RetryPolicy(hedge_after=0.05)
+        client = mock_client(server, AsyncClient, retry_policy=policy)
+        return (await client.table("countries").select("*").execute()).data
+
+    started = time.perf_counter()
+    assert asyncio.run(run()) == []
+    assert time.perf_counter() - started < 0.4
+    assert len(server.requests) == 2
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import asyncio
+import builtins
+
+import pytest
+
+from supabase.lib import session_storage
+from supabase.lib.session_storage import (
+    AsyncFileStorage,
+    AsyncSQLiteStorage,
+    FileStorage,
+    SQLiteStorage,
+)
+
+
+def test_file_storage_serves_unchanged_files_from_memory(tmp_path, monkeypatch) -> None:
+    opened = []
+
+    def counting_open(*args, **kwargs):
+        opened.append(args[0])
+        return builtins.open(*args, **kwargs)
+
+    monkeypatch.setattr(session_storage, "open", counting_open, raising=False)
+    # two instances stand in for two processes
+    writer, reader = FileStorage(str(tmp_path)), FileStorage(str(tmp_path))
+
+    writer.set_item("sb-auth/token", "first")
+    assert reader.get_item("sb-auth/token") == "first"
+    assert reader.get_item("sb-auth/token") == "first"
+    assert len(opened) == 1
+
+    writer.set_item("sb-auth/token", "second value")
+    assert reader.get_item("sb-auth/token") == "second value"
+    writer.remove_item("sb-auth/token")
+    assert reader.get_item("sb-auth/token") is None
+    assert [p.name for p in tmp_path.iterdir()] == []
+
+
+def test_file_storage_keeps_sessions_private(tmp_path) -> None:
+    FileStorage(str(tmp_path)).set_item("key", "secret")
+
+    assert (tmp_path / "key.json").stat().st_mode & 0o077 == 0
+
+
+@pytest.mark.parametrize("storage_class", [FileStorage, SQLiteStorage])
+def test_storages_persist_across_instances(tmp_path, storage_class) -> None:
+    path = str(tmp_path / ("sessions" if storage_class is FileStorage else "db"))
+    first, second = storage_class(path), storage_class(path)
+
+    assert second.get_item("key") is None
+    first.set_item("key", "value")
+    assert second.get_item("key") == "value"
+    second.set_item("key", "other")
+    assert first.get_item("key") == "other"
+    first.remove_item("key")
+    assert second.get_item("key") is None
+
+
+def test_sqlite_storage_reads_memory_until_another_connection_writes(
+    tmp_path,
+) -> None:
+    path = str(tmp_path / "sessions.db")
+    writer, reader = SQLiteStorage(path), SQLiteStorage(path)
+    writer.set_item("key", "value")
+    statements = []
+    reader._connection.set_trace_callback(statements.append)
+
+    assert reader.get_item("key") == "value"
+    assert reader.get_item("key") == "value"
+    writer.set_item("key", "other")
+    assert reader.get_item("key") == "other"
+
+    selects = [s for s in statements if s.startswith("SELECT")]
+    assert len(selects) == 2
+
+
+def test_async_storages(tmp_path) -> None:
+    async def run() -> None:
+        for storage in [
+            AsyncFileStorage(str(tmp_path / "sessions")),
+            AsyncSQLiteStorage(str(tmp_path / "sessions.db")),
+        ]:
+            await storage.set_item("key", "value")
+            assert await storage.get_item("key") == "value"
+            await storage.remove_item("key")
+            assert await storage.get_item("key") is None
+
+    asyncio.run(run())
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Dict, Optional
+
+import httpx
+
+from supabase import Client
+from supabase._async.client import AsyncClient
+from supabase.lib.signed_url_cache import SignedURLCache
+
+from .conftest import URL, MockServer, mock_client
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Signer(MockServer):
+    def __init__(self) -> None:
+        super().__init__(self.sign)
+
+    def sign(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        token = len(self.requests)
+        path = request.url.path[len("/storage/v1/object/sign/") :]
+        if "paths" not in body:
+            return httpx.Response(200, json={"signedURL": f"/{path}?token={token}"})
+        return httpx.Response(
+            200,
+            json=[
+                (
+                    {
+                        "path": p,
+                        "error": "Either the object does not exist",
+                        "signedURL": None,
+                    }
+                    if p == "missing.png"
+                    else {
+                        "path": p,
+                        "error": None,
+                        "signedURL": f"/{path}/{p}?token={token}",
+                    }
+                )
+                for p in body["paths"]
+            ],
+        )
+
+
+def _client(signer: Signer, cache: SignedURLCache) -> Client:
+    return mock_client(signer, signed_url_cache=cache)
+
+
+def test_urls_are_reused_until_part_of_their_lifetime_has_passed() -> None:
+    clock = Clock()
+    signer = Signer()
+    storage = _client(signer, SignedURLCache(refresh_fraction=0.5, clock=clock)).storage
+
+    first = storage.get_signed_url("images", "a.png", 60)
+    clock.now = 29
+    assert storage.get_signed_url("images", "a.png", 60) == first
+    assert storage.get_signed_url("images", "a.png", 60, {"download": True}) != first
+    clock.now = 31
+    assert storage.get_signed_url("images", "a.png", 60) != first
+    assert len(signer.requests) == 3
+
+
+def test_misses_are_signed_in_one_request() -> None:
+    signer = Signer()
+    storage = _client(signer, SignedURLCache()).storage
+    storage.get_signed_url("images", "a.png", 60)
+
+    urls = storage.get_signed_urls("images", ["a.png", "b.png", "missing.png"], 60)
+
+    assert urls["a.png"] == f"{URL}/storage/v1/images/a.png?token=1"
+    assert urls["b.png"] == f"{URL}/storage/v1/images/b.png?token=2"
+    assert urls["missing.png"] is None
+    assert json.loads(signer.requests[1].content) == {
+        "paths": ["b.png", "missing.png"],
+        "expiresIn": "60",
+    }
+
+    # paths that could not be signed are not cached
+    storage.get_signed_urls("images", ["b.png", "missing.png"], 60)
+    assert json.loads(signer.requests[2].content)["paths"] == ["missing.png"]
+
+
+def test_misses_are_signed_in_one_request_by_the_async_client() -> None:
+    signer = Signer()
+
+    async def run() -> Dict[str, Optional[str]]:
+        storage = mock_client(signer, AsyncClient).storage
+        return await storage.get_signed_urls(
+            "images", ["a.png", "missing.png"], 60, {"download": True}
+        )
+
+    assert asyncio.run(run()) == {
+        "a.png": f"{URL}/storage/v1/images/a.png?token=1",
+        "missing.png": None,
+    }
+    assert json.loads(signer.requests[0].content)["download"] is True
+
+
+def test_cache_is_bounded_and_keyed_on_credentials() -> None:
+    signer = Signer()
+    storage = _client(signer, SignedURLCache(max_size=2)).storage
+    for path in ["a.png", "b.png", "c.png"]:
+        storage.get_signed_url("images", path, 60)
+    assert len(storage.signed_url_cache) == 2
+
+    storage.get_signed_url("images", "c.png", 60)
+    assert len(signer.requests) == 3
+    storage.set_auth("user-token")
+    storage.get_signed_url("images", "c.png", 60)
+    assert len(signer.requests) == 4
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+from typing import Dict, List
+
+import httpx
+
+from supabase._async.client import AsyncClient
+from supabase.lib.transfer import same_content
+
+from .conftest import mock_client
+
+OBJECTS = "/storage/v1/object/"
+
+
+class Bucket:
+    """The storage object API of a single bucket, kept in memory."""
+
+    def __init__(self, objects: Dict[str, bytes]) -> None:
+        self.objects = dict(objects)
+        self.uploads: List[str] = []
+        self.removals: List[List[str]] = []
+        self.broken = False
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path[len(OBJECTS) :]
+        if request.method == "POST" and path == "list/photos":
+            return httpx.Response(200, json=self._list(json.loads(request.content)))
+        if request.method == "DELETE" and self.broken:
+            return httpx.Response(500, json={"message": "database unavailable"})
+        if request.method == "DELETE":
+            prefixes = json.loads(request.content)["prefixes"]
+            self.removals.append(prefixes)
+            for name in prefixes:
+                del self.objects[name]
+            return httpx.Response(200, json=[{"name": name} for name in prefixes])
+        name = path[len("photos/") :]
+        if request.method == "GET":
+            return httpx.Response(200, content=self.objects[name])
+        boundary = request.headers["Content-Type"].split("boundary=")[1].encode()
+        part = request.content.split(b"--" + boundary)[1]
+        self.objects[name] = part.split(b"\r\n\r\n", 1)[1][: -len(b"\r\n")]
+        self.uploads.append(name)
+        return httpx.Response(200, json={"Key": f"photos/{name}"})
+
+    def _list(self, body: dict) -> List[dict]:
+        folder = body["prefix"] + "/" if body["prefix"] else ""
+        entries: Dict[str, dict] = {}
+        for name, data in sorted(self.objects.items()):
+            if not name.startswith(folder):
+                continue
+            head, _, rest = name[len(folder) :].partition("/")
+            if rest:
+                entries[head] = {"name": head, "id": None, "metadata": None}
+            else:
+                etag = f'"{hashlib.md5(data).hexdigest()}"'
+                metadata = {"size": len(data), "eTag": etag}
+                entries[head] = {"name": head, "id": name, "metadata": metadata}
+        listed = list(entries.values())
+        return listed[body["offset"] : body["offset"] + body["limit"]]
+
+
+def test_sync_dir_uploads_changed_files_and_removes_stale_objects(tmp_path) -> None:
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "same.jpg").write_bytes(b"same")
+    (tmp_path / "changed.jpg").write_bytes(b"new content")
+    (tmp_path / "sub" / "added.jpg").write_bytes(b"added")
+    bucket = Bucket(
+        {
+            "2024/same.jpg": b"same",
+            "2024/changed.jpg": b"old content",
+            "2024/gone/stale.jpg": b"stale",
+        }
+    )
+    client = mock_client(bucket)
+
+    report = client.storage.sync_dir(
+        "photos", str(tmp_path), prefix="2024", concurrency=4, delete=True
+    )
+
+    assert report.ok
+    assert sorted(bucket.uploads) == ["2024/changed.jpg", "2024/sub/added.jpg"]
+    assert bucket.removals == [["2024/gone/stale.jpg"]]
+    assert bucket.objects == {
+        "2024/same.jpg": b"same",
+        "2024/changed.jpg": b"new content",
+        "2024/sub/added.jpg": b"added",
+    }
+    assert (report.count("uploaded"), report.count("skipped")) == (2, 1)
+    assert report.count("deleted") == 1
+
+
+def test_download_many_writes_missing_and_changed_objects(tmp_path) -> None:
+    (tmp_path / "same.jpg").write_bytes(b"same")
+    bucket = Bucket({"same.jpg": b"same", "a/b.jpg": b"b", "c.jpg": b"c"})
+
+    async def download():
+        client = mock_client(bucket, AsyncClient)
+        return await client.storage.download_many("photos", str(tmp_path))
+
+    report = asyncio.run(download())
+
+    assert (tmp_path / "a" / "b.jpg").read_bytes() == b"b"
+    assert (tmp_path / "c.jpg").read_bytes() == b"c"
+    assert (report.count("downloaded"), report.count("skipped")) == (2, 1)
+
+
+def test_failures_are_reported_per_object() -> None:
+    bucket = Bucket({"a.jpg": b"a", "b.jpg": b"b"})
+    bucket.broken = True
+    client = mock_client(bucket)
+
+    report = client.storage.remove_many("photos", ["a.jpg", "b.jpg"])
+
+    assert not report.ok
+    assert [result.path for result in report.failed] == ["a.jpg", "b.jpg"]
+    assert report.failed[0].error.args[0]["statusCode"] == 500
+
+
+def test_objects_without_an_md5_etag_are_compared_by_modification_time(
+    tmp_path,
+) -> None:
+    file = tmp_path / "big.bin"
+    file.write_bytes(b"content")
+    os.utime(file, (1_700_000_000, 1_700_000_000))
+    metadata = {"size": 7, "eTag": '"3858f62230ac3c915f300c664312c63f-2"'}
+
+    # written before the object was uploaded, then edited after it
+    uploaded = {**metadata, "lastModified": "2023-11-14T22:20:00.000Z"}
+    assert same_content(str(file), uploaded)
+    edited = {**metadata, "lastModified": "2023-11-14T22:00:00.000Z"}
+    assert not same_content(str(file), edited)
+    # downloaded after the object was last written
+    assert same_content(str(file), edited, uploading=False)
+    assert not same_content(str(file), uploaded, uploading=False)
+    # nothing to compare: the file may have changed
+    assert not same_content(str(file), metadata)
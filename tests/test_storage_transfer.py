@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import re
+from typing import Dict, List
+
+import httpx
+import pytest
+from storage3.utils import StorageException
+
+from supabase._async.client import AsyncClient
+
+from .conftest import URL, mock_client
+
+UPLOADS = f"{URL}/storage/v1/upload/resumable"
+CHUNK = 1024
+
+
+class StorageServer:
+    """A TUS upload endpoint with concatenation, and ranged object reads."""
+
+    def __init__(self, concatenation: bool = True) -> None:
+        self.concatenation = concatenation
+        self.uploads: Dict[str, bytearray] = {}
+        self.lengths: Dict[str, int] = {}
+        self.objects: Dict[str, bytes] = {}
+        self.patches: List[int] = []
+        self.fail_patches: List[int] = []
+        self.fail_ranges = 0
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path.startswith("/storage/v1/object/"):
+            return self._read(request, path[len("/storage/v1/object/") :])
+        assert request.headers["Tus-Resumable"] == "1.0.0"
+        if request.method == "OPTIONS":
+            extensions = "creation,concatenation" if self.concatenation else "creation"
+            return httpx.Response(204, headers={"Tus-Extension": extensions})
+        if request.method == "POST":
+            concat = request.headers.get("Upload-Concat", "")
+            if concat.startswith("final;"):
+                ids = [url.rsplit("/", 1)[1] for url in concat[6:].split()]
+                self.objects["bucket/big.bin"] = b"".join(
+                    bytes(self.uploads[id]) for id in ids
+                )
+                return httpx.Response(201, headers={"Location": f"{UPLOADS}/final"})
+            id = str(len(self.uploads))
+            self.uploads[id] = bytearray()
+            self.lengths[id] = int(request.headers["Upload-Length"])
+            return httpx.Response(201, headers={"Location": f"{UPLOADS}/{id}"})
+        id = path.rsplit("/", 1)[1]
+        if request.method == "HEAD":
+            offset = str(len(self.uploads[id]))
+            return httpx.Response(200, headers={"Upload-Offset": offset})
+        assert request.method == "PATCH"
+        upload = self.uploads[id]
+        assert int(request.headers["Upload-Offset"]) == len(upload)
+        self.patches.append(len(request.content))
+        if len(self.patches) in self.fail_patches:
+            # half of the chunk made it before the connection broke
+            upload.extend(request.content[: len(request.content) // 2])
+            raise httpx.ConnectError("connection reset")
+        upload.extend(request.content)
+        if len(upload) == self.lengths[id] and not self.concatenation:
+            self.objects["bucket/big.bin"] = bytes(upload)
+        return httpx.Response(204, headers={"Upload-Offset": str(len(upload))})
+
+    def _read(self, request: httpx.Request, key: str) -> httpx.Response:
+        data = self.objects[key]
+        match = re.match(r"bytes=(\d+)-(\d+)", request.headers.get("Range", ""))
+        if not match:
+            return httpx.Response(200, content=data)
+        start, end = int(match.group(1)), int(match.group(2))
+        if start > 0 and self.fail_ranges:
+            self.fail_ranges -= 1
+            return httpx.Response(503, json={"message": "busy"})
+        content_range = f"bytes {start}-{min(end, len(data) - 1)}/{len(data)}"
+        return httpx.Response(
+            206, content=data[start : end + 1], headers={"Content-Range": content_range}
+        )
+
+
+DATA = os.urandom(10 * CHUNK + 100)
+
+
+def test_upload_sends_parts_in_parallel_and_concatenates_them() -> None:
+    server = StorageServer()
+    manager = mock_client(server).storage.transfer_manager(chunk_size=CHUNK, workers=3)
+    reported: List[int] = []
+
+    result = manager.upload(
+        "bucket", "big.bin", DATA, progress=lambda p: reported.append(p.transferred)
+    )
+
+    assert server.objects["bucket/big.bin"] == DATA
+    assert len(server.uploads) == 3
+    assert max(server.patches) == CHUNK
+    assert result.transferred == result.total == len(DATA)
+    assert reported[-1] == len(DATA)
+
+
+def test_upload_resumes_from_the_offset_stored_by_the_server(tmp_path) -> None:
+    server = StorageServer(concatenation=False)
+    server.fail_patches = [3]
+    source = tmp_path / "big.bin"
+    source.write_bytes(DATA)
+    manager = mock_client(server).storage.transfer_manager(chunk_size=CHUNK, retries=0)
+
+    with pytest.raises(StorageException):
+        manager.upload("bucket", "big.bin", str(source))
+    assert len(manager.resume_store) == 1
+
+    result = manager.upload("bucket", "big.bin", str(source))
+    assert server.objects["bucket/big.bin"] == DATA
+    assert len(server.uploads) == 1
+    # the second call continues from the middle of the third chunk
+    assert sum(server.patches[3:]) == len(DATA) - 2 * CHUNK - CHUNK // 2
+    assert result.transferred == len(DATA)
+    assert not manager.resume_store
+
+
+def test_upload_retries_a_broken_chunk_within_the_call() -> None:
+    server = StorageServer(concatenation=False)
+    server.fail_patches = [2]
+
+    async def upload() -> None:
+        client = mock_client(server, AsyncClient)
+        manager = client.storage.transfer_manager(chunk_size=CHUNK)
+        await manager.upload("bucket", "big.bin", DATA)
+
+    asyncio.run(upload())
+    assert server.objects["bucket/big.bin"] == DATA
+
+
+def test_download_fetches_ranges_in_parallel(tmp_path) -> None:
+    server = StorageServer()
+    server.objects["bucket/big.bin"] = DATA
+    server.fail_ranges = 1
+    destination = tmp_path / "big.bin"
+    manager = mock_client(server).storage.transfer_manager(chunk_size=CHUNK, workers=4)
+
+    result = manager.download("bucket", "big.bin", str(destination))
+
+    assert destination.read_bytes() == DATA
+    assert result.transferred == len(DATA)
+    assert not (tmp_path / "big.bin.part").exists()
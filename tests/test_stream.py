@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+import pytest
+from gotrue import AsyncMemoryStorage
+
+from supabase._async.client import AsyncClient
+
+from .conftest import MockServer, mock_client
+
+ROWS = [{"id": i, "even": i % 2 == 0} for i in range(1, 26)]
+
+
+def _paginate(request: httpx.Request) -> httpx.Response:
+    params = request.url.params
+    rows = ROWS
+    for bound in params.get_list("id"):
+        rows = [row for row in rows if row["id"] > int(bound.split(".")[1])]
+    if params.get("even") == "eq.true":
+        rows = [row for row in rows if row["even"]]
+    assert params["order"] == "id.asc"
+    columns = params["select"].split(",")
+    if "*" not in columns:
+        rows = [{name: row[name] for name in columns} for row in rows]
+    return httpx.Response(200, json=rows[: int(params["limit"])])
+
+
+def test_stream_pages_with_keyset_cursor() -> None:
+    server = MockServer(_paginate)
+    client = mock_client(server)
+
+    rows = list(client.table("numbers").stream(page_size=10))
+
+    assert rows == ROWS
+    assert [request.url.params.get("id") for request in server.requests] == [
+        None,
+        "gt.10",
+        "gt.20",
+    ]
+
+
+def test_stream_stops_after_an_empty_page() -> None:
+    server = MockServer(_paginate)
+    client = mock_client(server)
+
+    assert len(list(client.table("numbers").stream(page_size=5))) == 25
+    assert len(server.requests) == 6
+
+
+def test_stream_selects_the_order_column() -> None:
+    server = MockServer(_paginate)
+    client = mock_client(server)
+
+    rows = list(client.table("numbers").stream("even", page_size=10))
+
+    assert rows == ROWS
+    assert server.requests[0].url.params["select"] == "even,id"
+
+
+@pytest.mark.parametrize(
+    "paged", [lambda q: q.order("id"), lambda q: q.limit(5), lambda q: q.range(0, 4)]
+)
+def test_stream_rejects_ordered_or_limited_queries(paged) -> None:
+    server = MockServer(_paginate)
+    client = mock_client(server)
+
+    with pytest.raises(ValueError):
+        paged(client.table("numbers").select("*")).stream()
+    assert server.requests == []
+
+
+def test_stream_keeps_filters() -> None:
+    client = mock_client(_paginate)
+
+    rows = client.table("numbers").select("*").eq("even", "true").stream(page_size=4)
+
+    assert [row["id"] for row in rows] == list(range(2, 26, 2))
+
+
+def test_async_stream_stops_fetching_when_closed() -> None:
+    server = MockServer(_paginate)
+
+    async def main() -> None:
+        client = mock_client(server, AsyncClient, storage=AsyncMemoryStorage())
+        rows = []
+        async for row in client.table("numbers").stream(page_size=10):
+            rows.append(row)
+            if len(rows) == 15:
+                break
+
+        assert [row["id"] for row in rows] == list(range(1, 16))
+
+    asyncio.run(main())
+    assert len(server.requests) <= 3
+
+
+def test_async_stream_stops_after_a_short_page() -> None:
+    server = MockServer(_paginate)
+
+    async def main() -> None:
+        client = mock_client(server, AsyncClient, storage=AsyncMemoryStorage())
+        rows = [row async for row in client.table("numbers").stream(page_size=10)]
+
+        assert rows == ROWS
+
+    asyncio.run(main())
+    assert [request.url.params.get("id") for request in server.requests] == [
+        None,
+        "gt.10",
+        "gt.20",
+    ]
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import ast
+import re
+import shutil
+from pathlib import Path
+from typing import List, Set, Tuple
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+PACKAGE = ROOT / "supabase"
+
+
+def _maintained_by_hand() -> Set[str]:
+    makefile = (ROOT / "Makefile").read_text()
+    listed = re.search(r"^SYNC_MAINTAINED = ((?:.*\\\n)*.*)$", makefile, re.M)
+    assert listed is not None
+    return set(listed.group(1).replace("\\", " ").split())
+
+
+GENERATED = sorted(
+    path.name
+    for path in (PACKAGE / "_async").glob("*.py")
+    if path.name not in _maintained_by_hand()
+)
+
+
+def _normalised(source: str) -> Tuple[Set[Tuple], List[str]]:
+    """Return the module-level imports and the rest of `source`'s syntax tree.
+
+    Formatting, and the order isort puts the imports in, are left out.
+    """
+    imports: Set[Tuple] = set()
+    body: List[str] = []
+    for node in ast.parse(source).body:
+        if isinstance(node, ast.ImportFrom):
+            imports.update((node.module, node.level, a.name) for a in node.names)
+        elif isinstance(node, ast.Import):
+            imports.update((None, 0, a.name) for a in node.names)
+        else:
+            body.append(ast.dump(node))
+    return imports, body
+
+
+def test_the_clients_are_generated() -> None:
+    assert {"auth_client.py", "client.py"} <= set(GENERATED)
+
+
+@pytest.mark.parametrize("module", GENERATED)
+def test_sync_module_matches_its_async_source(module: str, tmp_path) -> None:
+    unasync = pytest.importorskip("unasync")
+    source = tmp_path / "_async" / module
+    source.parent.mkdir()
+    shutil.copy(PACKAGE / "_async" / module, source)
+
+    unasync.unasync_files([str(source)], [unasync.Rule("/_async/", "/_sync/")])
+
+    generated = (tmp_path / "_sync" / module).read_text()
+    committed = (PACKAGE / "_sync" / module).read_text()
+    assert _normalised(generated) == _normalised(committed)
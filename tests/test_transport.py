@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import httpx
+
+from supabase import Client, ClientOptions
+
+from .conftest import KEY, URL, MockServer, mock_client
+
+
+def test_sub_clients_share_one_transport(mock_server: MockServer) -> None:
+    client = mock_client(mock_server)
+
+    client.table("countries").select("*").execute()
+    client.storage.list_buckets()
+    client.functions.invoke("hello")
+
+    assert [request.url.path for request in mock_server.requests] == [
+        "/rest/v1/countries",
+        "/storage/v1/bucket",
+        "/functions/v1/hello",
+    ]
+    assert client.postgrest.session._transport is client._transport
+    assert client.storage.session._transport is client._transport
+    assert client.functions._client._transport is client._transport
+    assert client.auth._http_client._transport is client._transport
+
+
+def test_closing_a_sub_client_keeps_the_pool_open(mock_server: MockServer) -> None:
+    client = mock_client(mock_server)
+
+    client.storage.aclose()
+    client.table("countries").select("*").execute()
+
+    assert len(mock_server.requests) == 1
+
+
+def test_default_transport_uses_configured_limits() -> None:
+    limits = httpx.Limits(max_connections=5, keepalive_expiry=30)
+    with Client(URL, KEY, ClientOptions(http_limits=limits)) as client:
+        pool = client._transport._transport._pool
+        assert pool._max_connections == 5
+        assert pool._keepalive_expiry == 30